@@ -0,0 +1,207 @@
+"""
+Alert engine, evaluated by the sampler each time a sensor reading is published.
+
+Every rule turns the latest readings into a condition, then a small state
+machine decides when the alert turns on or off:
+
+    debounce    the condition must hold for `on_delay` seconds before the alert
+                fires, and be gone for `off_delay` seconds before it clears
+    hysteresis  threshold rules fire above `above` and only clear below
+                `clear_below`, so a value hovering at the limit does not flap
+    min times   once switched, an alert stays on for at least `min_on` and off
+                for at least `min_off` seconds
+
+Only transitions have side effects: the buzzer pin is written when the set of
+active buzzer rules becomes empty or non-empty, and every on/off transition is
+queued to the alert_events table. start() drives the pin LOW once up front, so
+the first "off" state is real even though it is not a transition.
+
+Numeric settings can be overridden with SENSORS_ALERT_<RULE>_<KEY> environment
+variables (e.g. SENSORS_ALERT_LOUD_SOUND_ABOVE=70).
+"""
+import os
+import threading
+import time
+
+import buzzer
+from database import insert_alert_event
+
+# Edge activity needed within the event window to count as a detection
+RAIN_MIN_DUTY_CYCLE = 0.0   # any wet time at all
+SOUND_MIN_EVENTS = 1
+
+# Rule name -> settings. "kind" selects how the condition is computed:
+#   rain_and_sound  rain and sound both detected (edge activity counts when available)
+#   threshold       readings[sensor][field] above `above`, cleared below `clear_below`
+#                   (readings flagged "cached" are ignored)
+RULES = {
+    "rain_and_sound": {
+        "kind": "rain_and_sound",
+        "on_delay": 1.0, "off_delay": 2.0, "min_on": 3.0, "min_off": 2.0,
+        "buzzer": True,
+        "message": "⚠️ ALERT: Rain and Sound Detected!",
+    },
+    "loud_sound": {
+        "kind": "threshold", "sensor": "sound", "field": "percent", "above": 80.0, "clear_below": 60.0,
+        "on_delay": 2.0, "off_delay": 5.0, "min_on": 5.0, "min_off": 5.0,
+        "buzzer": False,
+        "message": "Sustained loud sound",
+    },
+    "high_temperature": {
+        "kind": "threshold", "sensor": "dht", "field": "temperature", "above": 35.0, "clear_below": 33.0,
+        "on_delay": 10.0, "off_delay": 30.0, "min_on": 60.0, "min_off": 60.0,
+        "buzzer": False,
+        "message": "High temperature",
+    },
+}
+for _name, _rule in RULES.items():
+    for _key, _default in _rule.items():
+        _env = os.environ.get(f"SENSORS_ALERT_{_name.upper()}_{_key.upper()}")
+        if _env is None or isinstance(_default, str):
+            continue
+        _rule[_key] = _env.lower() in ("1", "true", "yes") if isinstance(_default, bool) else float(_env)
+
+
+class _RuleState:
+    def __init__(self):
+        self.active = False
+        self.condition = False
+        self.condition_since = 0.0
+        self.changed_at = float("-inf")  # the first alert is not held back by min_off
+        self.value = None
+        self.transitions = 0
+
+
+_states = {name: _RuleState() for name in RULES}
+_lock = threading.Lock()
+_buzzer_on = False
+
+
+def _rain_and_sound(readings):
+    rain = readings.get("rain") or {}
+    sound = readings.get("sound") or {}
+    rain_detected = rain.get("rain_detected", False)
+    sound_detected = sound.get("sound_detected", False)
+    rain_edges = rain.get("edges")
+    sound_edges = sound.get("edges")
+    if rain_edges is not None:
+        rain_detected = rain_edges["active"] or rain_edges["duty_cycle"] > RAIN_MIN_DUTY_CYCLE
+    if sound_edges is not None:
+        # the analog channel can still flag sound the DO pin did not
+        sound_detected = sound_detected or sound_edges["events"] >= SOUND_MIN_EVENTS
+    return bool(rain_detected and sound_detected), None
+
+
+def _threshold(rule, readings, previous):
+    reading = readings.get(rule["sensor"]) or {}
+    value = reading.get(rule["field"])
+    if value is None or reading.get("cached"):
+        # no fresh reading (a cached or warm-started value is not new
+        # evidence): keep the current condition
+        return previous, None
+    if value > rule["above"]:
+        return True, value
+    if value < rule["clear_below"]:
+        return False, value
+    return previous, value
+
+
+def evaluate(readings, now=None):
+    """
+    Feed the latest readings ({"rain": ..., "sound": ..., "dht": ...}) to every
+    rule and return the alert summary published in the sampler snapshot.
+    """
+    global _buzzer_on
+    now = time.monotonic() if now is None else now
+    transitions = []
+    with _lock:
+        for name, rule in RULES.items():
+            state = _states[name]
+            if rule["kind"] == "rain_and_sound":
+                condition, value = _rain_and_sound(readings)
+            else:
+                condition, value = _threshold(rule, readings, state.condition)
+            if condition != state.condition:
+                state.condition = condition
+                state.condition_since = now
+            if value is not None:
+                state.value = value
+            held = now - state.condition_since
+            since_change = now - state.changed_at
+            if not state.active and condition and held >= rule["on_delay"] and since_change >= rule["min_off"]:
+                state.active = True
+            elif state.active and not condition and held >= rule["off_delay"] and since_change >= rule["min_on"]:
+                state.active = False
+            else:
+                continue
+            state.changed_at = now
+            state.transitions += 1
+            transitions.append((name, state.active, state.value))
+
+        buzzer_on = any(_states[name].active for name, rule in RULES.items() if rule["buzzer"])
+        if buzzer_on != _buzzer_on:
+            _buzzer_on = buzzer_on
+            buzzer.set_buzzer(buzzer_on)
+        summary = _summary(readings)
+
+    for name, active, value in transitions:
+        try:
+            insert_alert_event(name, "on" if active else "off", RULES[name]["message"], value)
+        except Exception as e:
+            print(f"Warning: failed to record alert event: {e}")
+    return summary
+
+
+def _summary(readings):
+    """Alert dict for the snapshot; keeps the fields the dashboard already reads."""
+    active = [name for name in RULES if _states[name].active]
+    alarms = [name for name in active if RULES[name]["buzzer"]]
+    result = {
+        "alert_active": bool(alarms),
+        "buzzer_on": _buzzer_on,
+        "message": RULES[alarms[0]]["message"] if alarms else "System Normal",
+        "active_rules": active,
+    }
+    rain_edges = (readings.get("rain") or {}).get("edges")
+    sound_edges = (readings.get("sound") or {}).get("edges")
+    if rain_edges is not None:
+        result["rain_events"] = rain_edges["events"]
+    if sound_edges is not None:
+        result["sound_events"] = sound_edges["events"]
+    return result
+
+
+def rule_states():
+    """Current state of every rule, for the /api/alerts endpoint."""
+    now = time.monotonic()
+    with _lock:
+        return {
+            name: {
+                "active": state.active,
+                "condition": state.condition,
+                "condition_for_s": round(now - state.condition_since, 3),
+                "value": state.value,
+                "transitions": state.transitions,
+                "settings": {k: v for k, v in RULES[name].items() if k != "kind"},
+            }
+            for name, state in _states.items()
+        }
+
+
+def start():
+    """Configure the buzzer pin and drive it LOW before the first evaluation."""
+    global _buzzer_on
+    with _lock:
+        buzzer.reset_buzzer()
+        _buzzer_on = False
+
+
+def reset():
+    """Clear every rule and switch the buzzer off (on shutdown or between tests)."""
+    global _buzzer_on
+    with _lock:
+        for name in RULES:
+            _states[name] = _RuleState()
+        if _buzzer_on:
+            buzzer.set_buzzer(False)
+        _buzzer_on = False
@@ -1,58 +1,139 @@
-from flask import Flask, render_template, jsonify
-from dht import read_dht
-from raindrop import read_raindrop
-from soundsensor import read_sound
-from buzzer import check_alert_conditions, cleanup as buzzer_cleanup
-import RPi.GPIO as GPIO
+from flask import Flask, Response, g, make_response, render_template, jsonify, request
+from werkzeug.http import is_resource_modified
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from buzzer import cleanup as buzzer_cleanup
+import assets
+import hal
+import i2c_bus
 import atexit
+import functools
+import json
+import os
+import threading
+import sampler
+from dht import read_dht
+import database
+import alerts
+import export
+import retention
+import metrics
+import stats
+import time
 from database import get_last_raindrops
-from database import insert_sound, get_last_sounds
+from database import get_last_sounds
+from database import get_history, get_series, HISTORY_SOURCES, HISTORY_TABLES, TIME_FORMATS
+from database import get_dht_history, get_dht_series
+from rollups import RESOLUTIONS, ROLLUP_SENSORS
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 app = Flask(__name__)
 app.config["TEMPLATES_AUTO_RELOAD"] = True
 
-def cleanup_gpio():
-    """Cleanup GPIO on application shutdown"""
-    buzzer_cleanup()
-    GPIO.cleanup()
-    print("\nGPIO cleanup completed.")
+# Seconds between SSE comments sent to idle /api/stream clients so proxies
+# and browsers keep the connection open.
+STREAM_KEEPALIVE = 15.0
+
+# Concurrent /api/stream clients served by this process. Each one holds a
+# server thread for as long as it stays connected, so the limit has to stay
+# below the server's thread count to leave threads for every other endpoint
+# (serve.py sets it from --max-streams); clients past it get a 503.
+MAX_STREAMS = int(os.environ.get("SENSORS_MAX_STREAMS", 4))
+
+# Where routes read sensor state from: the in-process sampler by default, or a
+# shared_state.SnapshotReader in HTTP worker processes started by serve.py.
+snapshot_source = sampler
+# False in worker processes, which must never touch GPIO or the I2C bus
+owns_hardware = True
+
+_started = False
+
+def start():
+    """
+    Bring the process up as the hardware owner. Importing this module has no
+    side effects; this runs init_db() synchronously first, so it blocks for
+    any pending migration (one may VACUUM the whole database), and checks the
+    static asset build. Sensors then initialize in parallel in their own
+    workers, so they do not delay the return and a failing sensor only
+    degrades itself.
+    """
+    global _started
+    if _started:
+        return
+    _started = True
+    atexit.register(stop)
+    database.init_db()
+    assets.check_build()
+    sampler.start()
+    retention.start()
+
+def use_shared_snapshot(path=None):
+    """Serve sensor state published by the hardware-owning process instead of sampling locally."""
+    global snapshot_source, owns_hardware
+    import shared_state
+    snapshot_source = shared_state.SnapshotReader(path)
+    owns_hardware = False
+    atexit.register(stop)
+
+def stop():
+    """Stop sampling, release GPIO and flush queued DB writes (also runs at exit)."""
+    global _started
+    atexit.unregister(stop)
+    if owns_hardware and _started:
+        _started = False
+        retention.stop()
+        sampler.stop()
+        try:
+            buzzer_cleanup()
+            hal.cleanup_if_started()
+            print("\nGPIO cleanup completed.")
+        except Exception as e:
+            # shutdown (and atexit) must go on to close the database
+            print(f"Warning: GPIO cleanup failed: {e}")
+    database.close()
+
+_request_seconds = metrics.histogram("http_request_seconds",
+                                     "Time to build a response (streamed bodies are not included).", ("endpoint",))
+_responses = metrics.counter("http_responses_total", "Responses by endpoint and status code.", ("endpoint", "status"))
+
+@app.before_request
+def _start_timer():
+    g.started = time.perf_counter()
 
-# Register cleanup function
-atexit.register(cleanup_gpio)
+@app.after_request
+def _record_request(response):
+    # unmatched URLs share one label so scanners cannot grow the series set
+    endpoint = request.endpoint or "unmatched"
+    started = g.get("started")
+    if started is not None:
+        _request_seconds.observe(time.perf_counter() - started, endpoint)
+    _responses.inc(endpoint, str(response.status_code))
+    return response
 
 @app.route('/')
 def index():
-    """Render the main dashboard page"""
-    return render_template('index.html')
+    """Render the main dashboard page (revalidated by ETag; the assets it links are cached for good)"""
+    response = make_response(render_template('index.html'))
+    response.cache_control.no_cache = True
+    response.add_etag()
+    return response.make_conditional(request)
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    """Fingerprinted static file from `python assets.py`, precompressed when the client accepts it"""
+    return assets.send(filename)
+
+app.add_template_global(assets.asset_url, "asset_url")
 
 @app.route('/api/sensors')
 def api_sensors():
-    """API endpoint to get all sensor data as JSON"""
+    """API endpoint to get all sensor data as JSON (served from the sampler snapshot)"""
     try:
-        dht_data = read_dht()
-        rain_data = read_raindrop()
-        sound_data = read_sound()
-        # store sound intensity percent to DB for history if available
-        try:
-            if sound_data and sound_data.get('percent') is not None:
-                insert_sound(sound_data.get('percent'))
-        except Exception as e:
-            # log but don't break API
-            print(f"Warning: failed to insert sound reading: {e}")
-        
-        # Check alert conditions (both rain and sound detected)
-        alert_data = check_alert_conditions(
-            rain_data.get("rain_detected", False),
-            sound_data.get("sound_detected", False)
-        )
-        
-        return jsonify({
-            "success": True,
-            "dht": dht_data,
-            "rain": rain_data,
-            "sound": sound_data,
-            "alert": alert_data
-        })
+        return jsonify(sampler.snapshot_to_dict(snapshot_source.get_snapshot()))
     except Exception as e:
         return jsonify({
             "success": False,
@@ -60,43 +141,485 @@ def api_sensors():
         }), 500
 
 
+# (version, encoded event) of the last snapshot sent on /api/stream. Every
+# subscriber reuses it, so each snapshot is serialized once, not per client.
+_stream_event = (None, None)
+
+_streams_open = 0
+_streams_lock = threading.Lock()
+metrics.gauge("http_streams_open", "Connected /api/stream clients.", lambda: _streams_open)
+_streams_rejected = metrics.counter("http_streams_rejected_total", "/api/stream clients turned away at MAX_STREAMS.")
+
+def _open_stream():
+    """Take a stream slot; returns a release function, or None when MAX_STREAMS are open."""
+    global _streams_open
+    with _streams_lock:
+        if _streams_open >= MAX_STREAMS:
+            return None
+        _streams_open += 1
+    released = []
+
+    def release():
+        global _streams_open
+        with _streams_lock:
+            if not released:
+                released.append(True)
+                _streams_open -= 1
+    return release
+
+def _encode_stream_event(snap):
+    global _stream_event
+    version, event = _stream_event
+    if version != snap.version:
+        body = json.dumps(sampler.snapshot_to_dict(snap), separators=(",", ":"))
+        event = f"id: {snap.version}\ndata: {body}\n\n"
+        _stream_event = (snap.version, event)
+    return event
+
+@app.route('/api/stream')
+def api_stream():
+    """
+    Server-Sent Events stream pushing every new sensor snapshot. At most
+    MAX_STREAMS clients per process; past that a 503 tells the page to poll
+    /api/dashboard instead.
+    """
+    release = _open_stream()
+    if release is None:
+        _streams_rejected.inc()
+        response = jsonify({"success": False, "error": "too many open streams, poll /api/dashboard instead"})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(int(STREAM_KEEPALIVE))
+        return response
+
+    def events():
+        version = None
+        yield "retry: 3000\n\n"
+        while True:
+            snap = snapshot_source.wait_for_update(version, timeout=STREAM_KEEPALIVE)
+            if snap.version == version:
+                yield ": keepalive\n\n"
+                continue
+            version = snap.version
+            yield _encode_stream_event(snap)
+
+    response = Response(events(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    # the server closes the response when the client goes away (noticed at the
+    # next event or keepalive write at the latest)
+    response.call_on_close(release)
+    return response
+
+
+def _since_id_arg(name='since_id'):
+    """Parse the optional ?since_id= cursor used for delta history fetches."""
+    try:
+        return int(request.args[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def _format_args():
+    """
+    Parse the history output options: ?ts=iso|epoch_ms and ?shape=rows|columns.
+    Returns (time_format, columnar); raises ValueError on unknown values.
+    """
+    time_format = request.args.get('ts', 'iso')
+    if time_format not in TIME_FORMATS:
+        raise ValueError(f"ts must be one of {list(TIME_FORMATS)}")
+    shape = request.args.get('shape', 'rows')
+    if shape not in ("rows", "columns"):
+        raise ValueError("shape must be one of ['rows', 'columns']")
+    return time_format, shape == "columns"
+
+def _history_body(data, columnar, **extra):
+    """Response body for history data: {"rows": [...]} or, columnar, {"columns": {...}}."""
+    return {"success": True, **extra, ("columns" if columnar else "rows"): data}
+
+
+# Rendered /api/raindrops and /api/sounds bodies: (table, n, since_id, since_ts, ts, shape)
+# -> (etag, body), least recently used first.
+HISTORY_CACHE_SIZE = 256
+_history_cache = OrderedDict()
+_history_cache_lock = threading.Lock()
+
+def _since_ts_arg(time_format, name='since_ts'):
+    """
+    Parse the optional ?since_ts= cursor of run-length deltas: the ts of the
+    newest point the client holds, in the response's ts format.
+    """
+    value = request.args.get(name)
+    if value is None or time_format == "iso":
+        return value
+    return int(value)
+
+def _cached_history(table, n, since_id, fetch, since_ts=False):
+    """
+    Serve a history listing with ETag/Last-Modified validators. A poll whose
+    If-None-Match still matches gets a 304 without touching the DB; otherwise
+    the body is rendered once per table version and shared by every client
+    asking for the same (table, n, since_id, since_ts, ts, shape). With
+    since_ts=True the ?since_ts= cursor is passed on to `fetch`.
+    """
+    try:
+        time_format, columnar = _format_args()
+        cursor_ts = _since_ts_arg(time_format) if since_ts else None
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    token, modified = database.table_version(table)
+    etag = f"{table}-{token}-{n}-{since_id}-{cursor_ts}-{time_format}-{int(columnar)}"
+    last_modified = datetime.utcfromtimestamp(int(modified))
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = Response(status=304)
+    else:
+        key = (table, n, since_id, cursor_ts, time_format, columnar)
+        with _history_cache_lock:
+            cached = _history_cache.get(key)
+            if cached is not None and cached[0] == etag:
+                _history_cache.move_to_end(key)
+        if cached is not None and cached[0] == etag:
+            body = cached[1]
+        else:
+            extra = {"since_ts": cursor_ts} if since_ts else {}
+            data = fetch(limit=n, since_id=since_id, time_format=time_format, columnar=columnar, **extra)
+            ids = data["id"] if columnar else [r["id"] for r in data[-1:]]
+            last_id = ids[-1] if ids else since_id
+            body = app.json.dumps(_history_body(data, columnar, last_id=last_id), separators=(",", ":"))
+            with _history_cache_lock:
+                _history_cache[key] = (etag, body)
+                _history_cache.move_to_end(key)
+                while len(_history_cache) > HISTORY_CACHE_SIZE:
+                    _history_cache.popitem(last=False)
+        response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # let browsers keep the body but revalidate on every poll
+    response.cache_control.no_cache = True
+    return response
+
+
 @app.route('/api/raindrops')
 def api_raindrops():
-    """Return last N raindrop readings from the DB (oldest->newest)."""
-    from flask import request
+    """
+    Return last N raindrop readings from the DB (oldest->newest), or only rows after ?since_id=.
+    ?ts=epoch_ms gives integer timestamps, ?shape=columns one array per field.
+    With ?since_ts= (the newest ts the client holds) a delta also carries the
+    new end point of run since_id while it keeps growing.
+    """
     try:
         n = int(request.args.get('n', 10))
     except Exception:
         n = 10
     n = max(1, min(100, n))
+    since_id = _since_id_arg()
     try:
-        rows = get_last_raindrops(limit=n)
-        return jsonify({"success": True, "rows": rows})
+        return _cached_history(HISTORY_TABLES["rain"], n, since_id, get_last_raindrops, since_ts=True)
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 
 @app.route('/api/sounds')
 def api_sounds():
-    """Return last N sound readings from the DB (oldest->newest)."""
-    from flask import request
+    """
+    Return last N sound readings from the DB (oldest->newest), or only rows after ?since_id=.
+    ?ts=epoch_ms gives integer timestamps, ?shape=columns one array per field.
+    """
     try:
         n = int(request.args.get('n', 10))
     except Exception:
         n = 10
     n = max(1, min(500, n))
+    since_id = _since_id_arg()
     try:
-        rows = get_last_sounds(limit=n)
-        return jsonify({"success": True, "rows": rows})
+        return _cached_history(HISTORY_TABLES["sound"], n, since_id, get_last_sounds)
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+def _rounded(value, digits):
+    return None if value is None else round(value, digits)
+
+def _dashboard_live(snap):
+    """
+    The fields the dashboard renders from a snapshot, flat, rounded to the
+    precision it displays and without the display strings (emoji status text,
+    diagnostics) or sample times /api/sensors carries. They change only when a
+    displayed value does, so the response can be revalidated by them.
+    """
+    dht, rain, sound, alert = snap.dht or {}, snap.rain or {}, snap.sound or {}, snap.alert or {}
+    return {
+        "temperature": _rounded(dht.get("temperature"), 1),
+        "humidity": _rounded(dht.get("humidity"), 1),
+        "dht_cached": dht.get("cached"),
+        "rain": rain.get("rain_detected"),
+        "rain_value": rain.get("value"),
+        "sound": sound.get("sound_detected"),
+        "sound_percent": _rounded(sound.get("percent"), 0),
+        "alert": alert.get("alert_active"),
+    }
+
+def _dashboard_series(fetch, n, since_id, time_format, **extra):
+    """{"last_id", "ts": [...], "value": [...]} of one history table."""
+    cols = fetch(limit=n, since_id=since_id, time_format=time_format, columnar=True, **extra)
+    ids = cols["id"]
+    return {"last_id": ids[-1] if ids else since_id, "ts": cols["ts"], "value": cols["value"]}
+
+@app.route('/api/dashboard')
+def api_dashboard():
+    """
+    Everything one dashboard refresh needs in a single response: the live
+    readings plus the rain and sound history as columns. Replaces fetching
+    /api/sensors, /api/raindrops and /api/sounds separately.
+
+    ?n= history points (1..100, default 10), ?rain_since= / ?sound_since= the
+    last_id cursors of a previous response, ?rain_since_ts= the newest rain ts
+    the client holds (see /api/raindrops' since_ts), ?ts=epoch_ms (default) or iso.
+    Sends MessagePack when the Accept header asks for application/msgpack
+    and the msgpack package is installed, JSON otherwise. The ETag is built
+    from the live values, the history table versions and the query, so a
+    poll while nothing displayed has changed costs a 304.
+    """
+    try:
+        n = max(1, min(100, int(request.args.get('n', 10))))
+    except ValueError:
+        n = 10
+    time_format = request.args.get('ts', 'epoch_ms')
+    if time_format not in TIME_FORMATS:
+        return jsonify({"success": False, "error": f"ts must be one of {list(TIME_FORMATS)}"}), 400
+    rain_since = _since_id_arg('rain_since')
+    sound_since = _since_id_arg('sound_since')
+    try:
+        rain_since_ts = _since_ts_arg(time_format, 'rain_since_ts')
+    except ValueError:
+        return jsonify({"success": False, "error": "rain_since_ts must match the ts format"}), 400
+    use_msgpack = msgpack is not None and request.accept_mimetypes.best_match(
+        ("application/json",) + MSGPACK_TYPES) in MSGPACK_TYPES
+    try:
+        live = _dashboard_live(snapshot_source.get_snapshot())
+        rain_token = database.table_version(HISTORY_TABLES["rain"])[0]
+        sound_token = database.table_version(HISTORY_TABLES["sound"])[0]
+        live_key = "-".join(str(value) for value in live.values())
+        etag = (f"dash-{live_key}-{rain_token}-{sound_token}-{n}-{rain_since}-{rain_since_ts}-{sound_since}"
+                f"-{time_format}-{int(use_msgpack)}")
+        if not is_resource_modified(request.environ, etag=etag):
+            response = Response(status=304)
+        else:
+            body = {
+                "success": True,
+                "live": live,
+                "rain": _dashboard_series(get_last_raindrops, n, rain_since, time_format, since_ts=rain_since_ts),
+                "sound": _dashboard_series(get_last_sounds, n, sound_since, time_format),
+            }
+            if use_msgpack:
+                response = Response(msgpack.packb(body), mimetype="application/msgpack")
+            else:
+                response = Response(app.json.dumps(body, separators=(",", ":")), mimetype="application/json")
+        response.set_etag(etag)
+        response.vary.add("Accept")
+        response.cache_control.no_cache = True
+        return response
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+_RELATIVE_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+def _parse_time(value):
+    """
+    Parse a from/to query value into a naive UTC datetime.
+    Accepts relative offsets ("-7d", "-30m"), epoch seconds or ISO8601.
+    """
+    if value is None or value == "":
+        return None
+    value = value.strip()
+    if value[0] == "-" and value[-1] in _RELATIVE_UNITS:
+        amount = float(value[1:-1])
+        return datetime.utcnow() - timedelta(**{_RELATIVE_UNITS[value[-1]]: amount})
+    try:
+        return datetime.utcfromtimestamp(float(value))
+    except ValueError:
+        pass
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if ts.tzinfo is not None:
+        ts = (ts - ts.utcoffset()).replace(tzinfo=None)
+    return ts
+
+@app.route('/api/history/<sensor>')
+def api_history(sensor):
+    """
+    Return readings for `sensor` between ?from= and ?to= (oldest->newest).
+
+    With ?limit= only, raw rows are returned. With ?points= (or for sensors
+    that have no raw table) the finest series that fits in that many points is
+    chosen from raw rows and the 1m/1h/1d rollups, e.g. ?from=-7d&points=300.
+    ?resolution=raw|1m|1h|1d forces a specific series.
+    ?ts=iso|epoch_ms and ?shape=rows|columns select the output format.
+    Sensor "dht" returns temperature and humidity together in each row.
+    """
+    if sensor == "dht":
+        has_raw, series, history = True, get_dht_series, get_dht_history
+    elif sensor in ROLLUP_SENSORS:
+        has_raw = sensor in HISTORY_SOURCES
+        series = functools.partial(get_series, sensor)
+        history = functools.partial(get_history, sensor)
+    else:
+        return jsonify({"success": False, "error": f"Unknown sensor '{sensor}'"}), 404
+    try:
+        start = _parse_time(request.args.get('from'))
+        end = _parse_time(request.args.get('to'))
+    except ValueError as e:
+        return jsonify({"success": False, "error": f"Invalid time range: {e}"}), 400
+    try:
+        time_format, columnar = _format_args()
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    resolution = request.args.get('resolution')
+    allowed = [name for name, _ in RESOLUTIONS] + (["raw"] if has_raw else [])
+    if resolution is not None and resolution not in allowed:
+        return jsonify({"success": False, "error": f"resolution must be one of {allowed}"}), 400
+    try:
+        if 'points' in request.args or resolution is not None or not has_raw:
+            try:
+                points = int(request.args.get('points', 300))
+            except Exception:
+                points = 300
+            points = max(1, min(5000, points))
+            resolution, rows = series(start, end, points, resolution, time_format, columnar)
+        else:
+            try:
+                limit = int(request.args.get('limit', 500))
+            except Exception:
+                limit = 500
+            limit = max(1, min(5000, limit))
+            resolution, rows = "raw", history(start, end, limit, time_format, columnar)
+        return jsonify(_history_body(rows, columnar, sensor=sensor, resolution=resolution))
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/dht/history')
+def api_dht_history():
+    """Temperature and humidity history: alias of /api/history/dht."""
+    return api_history("dht")
+
+@app.route('/api/export/<sensor>')
+def api_export(sensor):
+    """
+    Stream the full history of `sensor` (rain, sound, temperature, humidity or dht)
+    between ?from= and ?to= as a download: ?format=csv (default), ndjson or bin
+    (see export.py). ?ts=epoch_ms switches csv/ndjson timestamps to integers.
+    """
+    if sensor not in export.SOURCES:
+        return jsonify({"success": False, "error": f"Unknown sensor '{sensor}'"}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        return jsonify({"success": False, "error": f"format must be one of {list(export.FORMATS)}"}), 400
+    try:
+        start = _parse_time(request.args.get('from'))
+        end = _parse_time(request.args.get('to'))
+        time_format, _ = _format_args()
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    mimetype, extension = export.FORMATS[fmt]
+    return Response(export.stream(sensor, fmt, start, end, time_format), mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename={sensor}-history.{extension}",
+        "X-Accel-Buffering": "no",
+    })
+
+@app.route('/api/alerts')
+def api_alerts():
+    """
+    Current alert summary, per-rule engine state (only in the process running the
+    sampler) and the last ?n= recorded on/off transitions, optionally for one ?rule=.
+    """
+    try:
+        n = int(request.args.get('n', 50))
+    except Exception:
+        n = 50
+    n = max(1, min(1000, n))
+    rule = request.args.get('rule')
+    if rule is not None and rule not in alerts.RULES:
+        return jsonify({"success": False, "error": f"Unknown rule '{rule}'"}), 404
+    try:
+        return jsonify({
+            "success": True,
+            "alert": snapshot_source.get_snapshot().alert,
+            "rules": alerts.rule_states() if owns_hardware else None,
+            "events": database.get_alert_events(n, rule),
+        })
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/db/stats')
+def api_db_stats():
+    """
+    Database file size, page usage, per-table row counts and time ranges, and
+    retention status (only in the process running retention).
+    """
+    try:
+        return jsonify({"success": True, "db": database.get_db_stats(),
+                        "retention": retention.status() if owns_hardware else None})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/i2c')
+def api_i2c():
+    """Per-device I2C transaction, error, retry and coalescing counts (owner process only)."""
+    return jsonify({"success": True, "buses": i2c_bus.stats() if owns_hardware else None})
+
+@app.route('/api/stats/<sensor>')
+def api_stats(sensor):
+    """
+    Sliding-window statistics of one stream: count, mean, std, min/max and
+    quantiles. ?window= is one of stats.WINDOWS (default 5m).
+    """
+    if sensor not in stats.STREAMS:
+        return jsonify({"success": False, "error": f"Unknown sensor '{sensor}', expected one of {list(stats.STREAMS)}"}), 404
+    window = request.args.get("window", "5m")
+    if window not in stats.WINDOWS:
+        return jsonify({"success": False, "error": f"window must be one of {list(stats.WINDOWS)}"}), 400
+    try:
+        if owns_hardware:
+            summary = stats.summary(sensor, window)
+        else:
+            summary = ((snapshot_source.get_stats() or {}).get(sensor) or {}).get(window)
+            if summary is None:
+                return jsonify({"success": False, "error": "statistics not published yet"}), 503
+        body = {"success": True, "sensor": sensor, "window": window, "window_s": stats.WINDOWS[window], **summary}
+        if sensor in ("sound", "sound_raw"):
+            body["silence_baseline"] = (snapshot_source.get_snapshot().sound or {}).get("baseline")
+        return jsonify(body)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/metrics')
+def api_metrics():
+    """Counters and latency histograms of this process in the Prometheus text format."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+def _sensor_response(snap, field):
+    """Single-sensor response body with the snapshot timestamp and age."""
+    body = sampler.snapshot_to_dict(snap)
+    return {
+        "success": True,
+        "data": body[field],
+        "timestamp": body["timestamp"],
+        "age_ms": body["age_ms"],
+    }
+
 @app.route('/api/dht')
 def api_dht():
-    """API endpoint for DHT sensor only"""
+    """API endpoint for DHT sensor only (cached reading with sampled_at, age_ms and success_ratio)"""
     try:
-        data = read_dht()
-        return jsonify({"success": True, "data": data})
+        if not owns_hardware:
+            body = _sensor_response(snapshot_source.get_snapshot(), "dht")
+            data = body["data"]
+            if data and data.get("sampled_at"):
+                # age of the reading now, not when the owner process published it
+                sampled_at = datetime.fromisoformat(data["sampled_at"].rstrip("Z"))
+                body["data"] = dict(data, age_ms=int((datetime.utcnow() - sampled_at).total_seconds() * 1000))
+            return jsonify(body)
+        return jsonify({"success": True, "data": read_dht()})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -104,8 +627,7 @@ def api_dht():
 def api_rain():
     """API endpoint for rain sensor only"""
     try:
-        data = read_raindrop()
-        return jsonify({"success": True, "data": data})
+        return jsonify(_sensor_response(snapshot_source.get_snapshot(), "rain"))
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -113,13 +635,16 @@ def api_rain():
 def api_sound():
     """API endpoint for sound sensor only"""
     try:
-        data = read_sound()
-        return jsonify({"success": True, "data": data})
+        return jsonify(_sensor_response(snapshot_source.get_snapshot(), "sound"))
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 if __name__ == '__main__':
     try:
-        app.run(host='0.0.0.0', port=5000, debug=True, threaded=False)
+        # Sensors are polled by background workers, so requests never block on
+        # hardware and can be served concurrently. The reloader is disabled
+        # because it would start a second process competing for the GPIO pins.
+        start()
+        app.run(host='0.0.0.0', port=5000, debug=True, threaded=True, use_reloader=False)
     finally:
-        cleanup_gpio()
\ No newline at end of file
+        stop()
\ No newline at end of file
@@ -0,0 +1,283 @@
+"""
+Fingerprinted, precompressed static assets for the dashboard.
+
+    python assets.py            build static/dist and its manifest
+    python assets.py --check    exit 1 if the build is missing or stale
+
+build() copies every file under static/ to static/dist/ with a content hash
+in its name (css/style.css -> css/style.3f2a9c1b0d.css). Text assets also get
+.gz and, when the brotli package is installed, .br variants next to them.
+Images are downscaled to MAX_IMAGE_WIDTH and re-encoded when Pillow is
+installed; without it they are copied unchanged. url(...) references inside
+CSS are rewritten to the fingerprinted names, so a changed background image
+also changes the stylesheet's URL.
+
+A fingerprinted URL never changes content, so /assets/ responses for the
+files listed in the manifest carry
+"Cache-Control: public, max-age=31536000, immutable": after the first visit
+the browser loads them from its cache without asking the server. send()
+picks the precompressed variant from the manifest, so serving one costs no
+compression and no extra stat() calls.
+
+Templates call asset_url("css/style.css"). Without a build (or for a file
+that is not in it) it falls back to the plain /static/ URL. The build is made
+once, when installing or updating the app (`python assets.py`), never by the
+server: app.start() only runs check_build(), and a build older than its
+sources is ignored (plain /static/ URLs again) until it is rebuilt.
+"""
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import re
+import sys
+import threading
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+MANIFEST_VERSION = 1
+
+HASH_LENGTH = 10
+COMPRESSIBLE = {".css", ".js", ".svg", ".html", ".json", ".txt"}
+# Encoding name -> file suffix, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+# The kiosk screen is at most full HD; the source background is far larger
+MAX_IMAGE_WIDTH = int(os.environ.get("SENSORS_ASSET_IMAGE_WIDTH", 1920))
+JPEG_QUALITY = 82
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+_manifest = None
+_manifest_mtime = None
+_manifest_lock = threading.Lock()
+
+
+def _sources():
+    """Relative paths of the files under static/, excluding the build output."""
+    found = []
+    for root, dirs, files in os.walk(STATIC_DIR):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != DIST_DIR)
+        for name in sorted(files):
+            found.append(os.path.relpath(os.path.join(root, name), STATIC_DIR).replace(os.sep, "/"))
+    # stylesheets last, so the files their url()s point at are already named
+    return sorted(found, key=lambda name: (name.endswith(".css"), name))
+
+
+def _signature(name):
+    st = os.stat(os.path.join(STATIC_DIR, name))
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _optimize_image(name, data):
+    """Downscale and re-encode an image with Pillow; returns the original when that does not help."""
+    ext = os.path.splitext(name)[1].lower()
+    if Image is None or ext not in (".jpg", ".jpeg", ".png"):
+        return data
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            if img.width > MAX_IMAGE_WIDTH:
+                img = img.resize((MAX_IMAGE_WIDTH, round(img.height * MAX_IMAGE_WIDTH / img.width)), Image.LANCZOS)
+            out = io.BytesIO()
+            if img.format == "PNG" or ext == ".png":
+                img.save(out, "PNG", optimize=True)
+            else:
+                img.convert("RGB").save(out, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    except Exception as e:
+        print(f"Warning: could not optimize {name}: {e}")
+        return data
+    optimized = out.getvalue()
+    return optimized if len(optimized) < len(data) else data
+
+
+def _rewrite_css(name, text, files):
+    """Point url(...) references at the fingerprinted file names."""
+    base = os.path.dirname(name)
+
+    def replace(match):
+        quote, target = match.groups()
+        if ":" in target or target.startswith(("/", "#")):
+            return match.group(0)  # absolute, data: or external URL
+        resolved = os.path.normpath(os.path.join(base, target)).replace(os.sep, "/")
+        if resolved not in files:
+            return match.group(0)
+        relative = os.path.relpath(files[resolved], base or ".").replace(os.sep, "/")
+        return f"url({quote}{relative}{quote})"
+
+    return _CSS_URL.sub(replace, text)
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build(verbose=True):
+    """Write the fingerprinted and precompressed assets and the manifest; returns the manifest."""
+    files = {}
+    encodings = {}
+    sources = {}
+    written = {"manifest.json"}
+    for name in _sources():
+        with open(os.path.join(STATIC_DIR, name), "rb") as f:
+            original = f.read()
+        sources[name] = _signature(name)
+        ext = os.path.splitext(name)[1].lower()
+        data = original
+        if ext == ".css":
+            data = _rewrite_css(name, original.decode("utf-8"), files).encode("utf-8")
+        elif ext in (".jpg", ".jpeg", ".png"):
+            data = _optimize_image(name, original)
+
+        stem, suffix = os.path.splitext(name)
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        target = f"{stem}.{digest}{suffix}"
+        files[name] = target
+        _write(os.path.join(DIST_DIR, target), data)
+        written.add(target)
+
+        variants = []
+        if ext in COMPRESSIBLE:
+            compressed = {"gzip": gzip.compress(data, 9, mtime=0)}
+            if brotli is not None:
+                compressed["br"] = brotli.compress(data, quality=11)
+            for encoding, ext_suffix in ENCODINGS:
+                body = compressed.get(encoding)
+                if body is not None and len(body) < len(data):
+                    _write(os.path.join(DIST_DIR, target + ext_suffix), body)
+                    written.add(target + ext_suffix)
+                    variants.append(encoding)
+                    if verbose:
+                        print(f"  {target}{ext_suffix}: {len(body)} bytes")
+        encodings[target] = variants
+        if verbose:
+            print(f"{name} -> {target}: {len(original)} -> {len(data)} bytes")
+
+    manifest = {"version": MANIFEST_VERSION, "sources": sources, "files": files, "encodings": encodings}
+    _write(MANIFEST_PATH, json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"))
+
+    # drop the outputs of earlier builds
+    for root, dirs, names in os.walk(DIST_DIR):
+        for filename in names:
+            rel = os.path.relpath(os.path.join(root, filename), DIST_DIR).replace(os.sep, "/")
+            if rel not in written:
+                os.remove(os.path.join(root, filename))
+    return manifest
+
+
+def _read_manifest():
+    try:
+        with open(MANIFEST_PATH, "rb") as f:
+            manifest = json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+
+def is_stale(manifest=None):
+    """True if there is no build or a source file was added, removed or changed since it."""
+    manifest = manifest or _read_manifest()
+    if manifest is None:
+        return True
+    try:
+        return manifest["sources"] != {name: _signature(name) for name in _sources()}
+    except OSError:
+        return True
+
+
+def check_build():
+    """Startup check: True if the build is current; otherwise warn, and unversioned files are served."""
+    if manifest() is None:
+        print("Warning: static assets are not built or older than their sources, serving unversioned files "
+              "(run: python assets.py)")
+        return False
+    return True
+
+
+def manifest():
+    """
+    The current manifest, or None without a current build. Reloaded when the
+    file changes (e.g. after `python assets.py` while the server runs); a
+    manifest whose sources changed since is ignored.
+    """
+    global _manifest, _manifest_mtime
+    try:
+        mtime = os.stat(MANIFEST_PATH).st_mtime_ns
+    except OSError:
+        mtime = None
+    if mtime != _manifest_mtime:
+        with _manifest_lock:
+            loaded = _read_manifest() if mtime is not None else None
+            _manifest = None if loaded is None or is_stale(loaded) else loaded
+            _manifest_mtime = mtime
+    return _manifest
+
+
+def asset_url(name):
+    """URL of a static file: fingerprinted under /assets/ when built, else the plain /static/ URL."""
+    current = manifest()
+    target = current["files"].get(name) if current else None
+    if target is None:
+        return url_for("static", filename=name)
+    return url_for("asset", filename=target)
+
+
+def send(filename):
+    """Response for a fingerprinted file, precompressed when the client accepts it."""
+    current = manifest()
+    variants = current["encodings"].get(filename) if current else None
+    fingerprinted = variants is not None
+    if not fingerprinted:
+        # not (or no longer) part of the build, e.g. the manifest itself: let
+        # send_from_directory 404 or serve it plainly, without immutable caching
+        variants = []
+    path = filename
+    encoding = None
+    for name, suffix in ENCODINGS:
+        if name in variants and request.accept_encodings[name]:
+            path = filename + suffix
+            encoding = name
+            break
+    response = send_from_directory(DIST_DIR, path, mimetype=mimetypes.guess_type(filename)[0],
+                                   max_age=IMMUTABLE_MAX_AGE if fingerprinted else None)
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    if variants:
+        response.vary.add("Accept-Encoding")
+    if fingerprinted:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv[1:]:
+        stale = is_stale()
+        print("stale" if stale else "up to date")
+        sys.exit(1 if stale else 0)
+    if brotli is None:
+        print("brotli not installed: writing gzip variants only")
+    if Image is None:
+        print("Pillow not installed: copying images unchanged")
+    build()
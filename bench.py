@@ -0,0 +1,538 @@
+"""
+Reproducible benchmarks that run on any Linux box using the simulated backend.
+
+    python bench.py api              # /api/sensors, /api/sounds, /api/raindrops latency + throughput
+    python bench.py db               # DB insert rate
+    python bench.py history          # 10k-row history fetches: rows vs columns, ISO vs epoch ms
+    python bench.py export           # streaming export of --export-rows rows in csv / ndjson / bin
+    python bench.py loadtest         # serve.py throughput with 1, 2 and 4 worker processes
+    python bench.py metrics          # per-observation cost of the metrics layer (SENSORS_METRICS mode)
+    python bench.py startup          # import, app.start() and time-to-first-response of serve.py
+    python bench.py assets           # bytes and server time of first and repeat dashboard loads
+    python bench.py dashboard        # /api/dashboard vs /api/sensors + /api/raindrops + /api/sounds
+    python bench.py all
+
+Benchmarks run in-process through Flask's test client against a scratch
+database unless --url points at a running server. Simulator knobs can be set
+with SENSOR_SIM_* environment variables (see hal.py).
+"""
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+API_PATHS = ["/api/sensors", "/api/sounds?n=10", "/api/raindrops?n=10"]
+
+
+def _prepare_env():
+    """Select the simulated backend and a scratch DB before any app module is imported."""
+    os.environ.setdefault("SENSOR_BACKEND", "sim")
+    if "SENSORS_DB_PATH" not in os.environ:
+        scratch = tempfile.mkdtemp(prefix="sensors-bench-")
+        os.environ["SENSORS_DB_PATH"] = os.path.join(scratch, "sensors.db")
+
+
+def _percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, int(round(pct / 100.0 * (len(sorted_vals) - 1))))
+    return sorted_vals[idx]
+
+
+def report(name, latencies, elapsed):
+    """Print one result line. `latencies` are seconds per operation."""
+    vals = sorted(latencies)
+    n = len(vals)
+    mean = sum(vals) / n if n else 0.0
+    rate = n / elapsed if elapsed > 0 else 0.0
+    print(
+        f"{name:<32} n={n:<7} mean={mean * 1000:8.3f}ms p50={_percentile(vals, 50) * 1000:8.3f}ms "
+        f"p95={_percentile(vals, 95) * 1000:8.3f}ms p99={_percentile(vals, 99) * 1000:8.3f}ms "
+        f"rate={rate:10.1f}/s"
+    )
+    return {"name": name, "n": n, "mean": mean, "rate": rate,
+            "p50": _percentile(vals, 50), "p95": _percentile(vals, 95), "p99": _percentile(vals, 99)}
+
+
+def _make_requester(url):
+    """Return a function performing one GET against `url` or, if None, the in-process app."""
+    if url:
+        base = url.rstrip("/")
+
+        def get(path):
+            with urllib.request.urlopen(base + path) as resp:
+                resp.read()
+                return resp.status
+        return get
+
+    from app import app
+    client = app.test_client()
+
+    def get(path):
+        resp = client.get(path)
+        resp.get_data()
+        return resp.status_code
+    return get
+
+
+def measure_latency(path, requests, url=None):
+    get = _make_requester(url)
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        status = get(path)
+        latencies.append(time.perf_counter() - t0)
+        if status >= 400:
+            raise RuntimeError(f"GET {path} returned {status}")
+    return latencies, time.perf_counter() - started
+
+
+def measure_throughput(path, clients, duration, url=None):
+    """Hammer `path` from `clients` threads for `duration` seconds."""
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        get = _make_requester(url)
+        local = []
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            get(path)
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, time.perf_counter() - started
+
+
+def seed_history(rows):
+    """Fill the scratch DB with `rows` rain and sound readings."""
+    import database
+    for i in range(rows):
+        database.insert_sound(i % 100)
+        database.insert_raindrop(i % 2)
+    database.flush()
+
+
+def bench_api(args):
+    if not args.url:
+        import app
+        seed_history(args.seed_rows)
+        app.start()
+        time.sleep(0.2)  # let every worker publish once
+    print(f"-- API latency ({args.requests} sequential requests)")
+    for path in API_PATHS:
+        report(f"GET {path}", *measure_latency(path, args.requests, args.url))
+    print(f"-- API throughput ({args.clients} clients, {args.duration}s)")
+    for path in API_PATHS:
+        report(f"GET {path}", *measure_throughput(path, args.clients, args.duration, args.url))
+
+
+def bench_db(args):
+    import database
+    print(f"-- DB inserts ({args.rows} rows)")
+    for name, insert in (("insert_sound", database.insert_sound), ("insert_raindrop", database.insert_raindrop)):
+        latencies = []
+        started = time.perf_counter()
+        for i in range(args.rows):
+            t0 = time.perf_counter()
+            insert(i % 100)
+            latencies.append(time.perf_counter() - t0)
+        # rate includes the time to commit everything that was queued
+        database.flush()
+        report(name, latencies, time.perf_counter() - started)
+
+
+def seed_raw_history(rows):
+    """
+    Write `rows` stored sound and rain rows, 5 s apart and ending now. Values
+    jump past the sound deadband and rain flips every reading, so every
+    reading becomes a raw row (seed_history() mostly feeds the rollups).
+    """
+    import database
+    from datetime import datetime, timedelta
+    start = datetime.utcnow() - timedelta(seconds=5 * rows)
+    for i in range(rows):
+        ts = start + timedelta(seconds=5 * i)
+        database.insert_sound((i * 37) % 100, ts)
+        database.insert_raindrop(i % 2, ts)
+    database.flush(timeout=60)
+
+
+def bench_history(args):
+    import database
+    seed_raw_history(args.history_rows)
+    n = args.history_rows
+    print(f"-- History fetch + JSON encode ({n} rows, {args.history_repeat} runs each)")
+    for table in ("sound_readings", "raindrops"):
+        for time_format in ("iso", "epoch_ms"):
+            for columnar in (False, True):
+                latencies = []
+                started = time.perf_counter()
+                for _ in range(args.history_repeat):
+                    t0 = time.perf_counter()
+                    data = database.read_history(table, limit=n, time_format=time_format, columnar=columnar)
+                    json.dumps(data, separators=(",", ":"))
+                    latencies.append(time.perf_counter() - t0)
+                shape = "columns" if columnar else "rows"
+                report(f"{table} {time_format} {shape}", latencies, time.perf_counter() - started)
+
+
+def bench_export(args):
+    """Stream a large sound history through each export format; reports rows/s, MB/s and peak RSS."""
+    import resource
+    import database
+    import export
+    from datetime import datetime, timedelta
+    n = args.export_rows
+    # bulk-load directly: the insert path applies storage policies and rollups
+    start = datetime.utcnow() - timedelta(seconds=n)
+    database.init_db()
+    conn = database._get_writer()
+    with database._writer_lock:
+        conn.executemany("INSERT INTO sound_readings (value, ts) VALUES (?, ?)",
+                         ((i % 100, start + timedelta(seconds=i)) for i in range(n)))
+        conn.commit()
+    print(f"-- Export ({n} rows)")
+    for fmt in export.FORMATS:
+        started = time.perf_counter()
+        size = 0
+        for chunk in export.stream("sound", fmt):
+            size += len(chunk)
+        elapsed = time.perf_counter() - started
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"{'export ' + fmt:<32} {elapsed:8.2f}s rows/s={n / elapsed:10.0f} MB/s={size / elapsed / 1e6:7.1f} "
+              f"size={size / 1e6:7.1f}MB peak_rss={peak_mb:6.1f}MB")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_server(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url + "/api/sensors", timeout=1) as resp:
+                resp.read()
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not come up within {timeout}s")
+
+
+def _load_client(url, path, duration, results):
+    """One client process: sequential GETs for `duration` seconds, reports its latencies."""
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        with urllib.request.urlopen(url + path) as resp:
+            resp.read()
+        latencies.append(time.perf_counter() - t0)
+    results.put(latencies)
+
+
+def bench_loadtest(args):
+    """
+    Start serve.py with each --workers count and drive it from --clients
+    client processes (client threads would share one GIL and saturate
+    before the server does).
+    """
+    ctx = multiprocessing.get_context("spawn")
+    print(f"-- serve.py throughput ({args.clients} client processes, {args.duration}s, {os.cpu_count()} CPUs)")
+    baseline = None
+    for workers in args.workers:
+        port = _free_port()
+        url = f"http://127.0.0.1:{port}"
+        snapshot = os.path.join(os.path.dirname(os.environ["SENSORS_DB_PATH"]), f"snapshot-{port}")
+        server = subprocess.Popen(
+            [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(workers), "--threads", "8", "--snapshot-path", snapshot],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.DEVNULL,
+        )
+        try:
+            _wait_for_server(url)
+            results = ctx.Queue()
+            clients = [ctx.Process(target=_load_client, args=(url, "/api/sensors", args.duration, results))
+                       for _ in range(args.clients)]
+            for proc in clients:
+                proc.start()
+            latencies = []
+            for _ in clients:
+                latencies.extend(results.get())
+            for proc in clients:
+                proc.join()
+            # every client runs for --duration once started, so rate excludes process start-up
+            result = report(f"workers={workers} GET /api/sensors", latencies, args.duration)
+            baseline = baseline or result["rate"]
+            print(f"{'':<32} scaling x{result['rate'] / baseline:.2f} vs workers={args.workers[0]}")
+        finally:
+            server.terminate()
+            server.wait(timeout=15)
+
+
+def bench_metrics(args):
+    """Cost of one counter increment, histogram observation and timed block in the current mode."""
+    import metrics
+    counter = metrics.Counter("bench_total", "bench", ("label",))
+    hist = metrics.Histogram("bench_seconds", "bench", ("label",))
+    n = args.rows * 200
+    print(f"-- Metrics overhead (SENSORS_METRICS={metrics.MODE}, {n} operations)")
+    for name, op in (("counter.inc", lambda: counter.inc("a")),
+                     ("histogram.observe", lambda: hist.observe(0.003, "a")),
+                     ("histogram.time", lambda: hist.time("a").__enter__().__exit__(None, None, None))):
+        started = time.perf_counter()
+        for _ in range(n):
+            op()
+        elapsed = time.perf_counter() - started
+        print(f"{name:<32} {elapsed / n * 1e9:8.0f}ns/op")
+
+
+def _page_load(client, cache):
+    """
+    Load the dashboard like a browser with HTTP cache `cache` (url -> (validator,
+    immutable, linked urls)), following the page's and stylesheets' links.
+    Returns (requests, bytes received, seconds).
+    """
+    import posixpath
+    import re
+    requests = transferred = 0
+    started = time.perf_counter()
+    pending = ["/"]
+    while pending:
+        url = pending.pop(0)
+        validator, immutable, links = cache.get(url, (None, False, []))
+        if not immutable:
+            headers = {"Accept-Encoding": "gzip, br"}
+            if validator:
+                headers["If-None-Match"] = validator
+            resp = client.get(url, headers=headers)
+            requests += 1
+            transferred += len(resp.data)
+            if resp.status_code == 200:
+                body = resp.get_data()
+                if resp.content_encoding == "gzip":
+                    body = gzip.decompress(body)
+                text = body.decode("utf-8", "replace") if resp.mimetype in ("text/html", "text/css") else ""
+                links = re.findall(r'(?:href|src)="(/(?:static|assets)/[^"]+)"', text)
+                links += [posixpath.normpath(posixpath.join(posixpath.dirname(url), ref))
+                          for ref in re.findall(r"url\(['\"]?([^'\")]+)", text) if ":" not in ref]
+                cache[url] = (resp.headers.get("ETag"), "immutable" in resp.headers.get("Cache-Control", ""), links)
+        pending.extend(links)
+    return requests, transferred, time.perf_counter() - started
+
+
+def bench_assets(args):
+    """First and repeat dashboard loads with plain /static/ URLs and with the fingerprinted build."""
+    import assets
+    from app import app
+    client = app.test_client()
+    assets.build(verbose=False)
+    built_manifest = assets.MANIFEST_PATH
+    print("-- Dashboard page loads (requests, bytes on the wire, server time)")
+    for label, manifest_path in (("plain /static/", built_manifest + ".missing"), ("fingerprinted /assets/", built_manifest)):
+        assets.MANIFEST_PATH = manifest_path
+        cache = {}
+        for load in ("first", "repeat"):
+            requests, transferred, elapsed = _page_load(client, cache)
+            print(f"{label + ' ' + load:<32} requests={requests:<3} bytes={transferred:<9} time={elapsed * 1000:8.2f}ms")
+    assets.MANIFEST_PATH = built_manifest
+
+
+def bench_dashboard(args):
+    """
+    One dashboard refresh as three calls (/api/sensors, /api/raindrops,
+    /api/sounds) against one /api/dashboard call: requests, bytes and latency,
+    for the initial load and for a delta poll after new readings.
+    """
+    import app as webapp
+    from database import insert_raindrop, insert_sound, flush
+    seed_history(args.seed_rows)
+    webapp.start()
+    time.sleep(1.0)  # let every sensor publish a reading
+    client = webapp.app.test_client()
+    history = "n=10&shape=columns&ts=epoch_ms"
+    accepts = [("json", "application/json")]
+    if webapp.msgpack is not None:
+        accepts.append(("msgpack", "application/msgpack"))
+
+    def three_calls(since=None):
+        rain_cursor = "" if since is None else f"&since_id={since[0]}"
+        sound_cursor = "" if since is None else f"&since_id={since[1]}"
+        bodies = [client.get("/api/sensors").data,
+                  client.get(f"/api/raindrops?{history}{rain_cursor}").data,
+                  client.get(f"/api/sounds?{history}{sound_cursor}").data]
+        return 3, sum(len(b) for b in bodies), (json.loads(bodies[1])["last_id"], json.loads(bodies[2])["last_id"])
+
+    def one_call(accept, since=None):
+        query = "n=10" if since is None else f"n=10&rain_since={since[0]}&sound_since={since[1]}"
+        resp = client.get(f"/api/dashboard?{query}", headers={"Accept": accept})
+        if resp.mimetype == "application/json":
+            body = resp.get_json()
+            cursors = (body["rain"]["last_id"], body["sound"]["last_id"])
+        else:
+            body = webapp.msgpack.unpackb(resp.data)
+            cursors = (body["rain"]["last_id"], body["sound"]["last_id"])
+        return 1, len(resp.data), cursors
+
+    variants = [("3 calls", three_calls)] + [(f"/api/dashboard {name}", lambda since=None, a=accept: one_call(a, since))
+                                             for name, accept in accepts]
+    print(f"-- Dashboard refresh ({args.requests} repetitions)")
+    for label, refresh in variants:
+        for phase in ("initial", "poll"):
+            latencies = []
+            transferred = requests = 0
+            started = time.perf_counter()
+            for i in range(args.requests):
+                if phase == "initial":
+                    t0 = time.perf_counter()
+                    requests, transferred, _ = refresh()
+                else:
+                    _, _, cursors = refresh()
+                    insert_raindrop(i % 2)
+                    insert_sound(float(i % 100))
+                    flush()
+                    t0 = time.perf_counter()
+                    requests, transferred, _ = refresh(cursors)
+                latencies.append(time.perf_counter() - t0)
+            elapsed = time.perf_counter() - started
+            report(f"{label} {phase}", latencies, elapsed)
+            print(f"{'':<32} requests={requests} bytes={transferred}")
+
+
+def _poll_sensors(url):
+    """One GET /api/sensors; returns the decoded body or None while the server is not up."""
+    try:
+        with urllib.request.urlopen(url + "/api/sensors", timeout=1) as resp:
+            return json.loads(resp.read())
+    except OSError:
+        return None
+
+
+def bench_startup(args):
+    """
+    Time `import app` in a fresh interpreter (and check it leaves no DB file
+    behind), then app.start() on a new database (init_db, its migrations and
+    the asset check), then start serve.py and time the first HTTP response
+    and the first response carrying readings from every sensor.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    scratch = tempfile.mkdtemp(prefix="sensors-startup-")
+    env = dict(os.environ, SENSORS_DB_PATH=os.path.join(scratch, "import.db"))
+    code = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+    print(f"-- Startup ({args.startup_repeat} runs each)")
+    latencies = []
+    for _ in range(args.startup_repeat):
+        out = subprocess.run([sys.executable, "-c", code], cwd=here, env=env, check=True,
+                             capture_output=True, text=True).stdout
+        latencies.append(float(out.split()[-1]))
+    report("import app", latencies, sum(latencies))
+    touched = os.path.exists(env["SENSORS_DB_PATH"])
+    print(f"{'':<32} import created the database: {'yes' if touched else 'no'}")
+
+    # start() and stop() log to stdout too: the timing goes on its own tagged line
+    code = ("import time, app; t = time.perf_counter(); app.start(); "
+            "print('start_seconds', time.perf_counter() - t); app.stop()")
+    latencies = []
+    for run in range(args.startup_repeat):
+        run_env = dict(os.environ, SENSORS_DB_PATH=os.path.join(scratch, f"start-{run}.db"))
+        out = subprocess.run([sys.executable, "-c", code], cwd=here, env=run_env, check=True,
+                             capture_output=True, text=True).stdout
+        latencies.append(next(float(line.split()[1]) for line in out.splitlines()
+                              if line.startswith("start_seconds ")))
+    report("app.start()", latencies, sum(latencies))
+
+    for workers in args.startup_workers:
+        first_response, first_data = [], []
+        for run in range(args.startup_repeat):
+            port = _free_port()
+            url = f"http://127.0.0.1:{port}"
+            run_env = dict(os.environ, SENSORS_DB_PATH=os.path.join(scratch, f"serve-{port}.db"))
+            started = time.perf_counter()
+            server = subprocess.Popen(
+                [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers),
+                 "--snapshot-path", os.path.join(scratch, f"snapshot-{port}")],
+                cwd=here, env=run_env, stdout=subprocess.DEVNULL,
+            )
+            try:
+                deadline = started + 30.0
+                responded = None
+                while time.perf_counter() < deadline:
+                    body = _poll_sensors(url)
+                    now = time.perf_counter()
+                    if body is not None:
+                        responded = responded or now
+                        if all(body.get(name) is not None for name in ("dht", "rain", "sound")):
+                            first_response.append(responded - started)
+                            first_data.append(now - started)
+                            break
+                    time.sleep(0.01)
+                else:
+                    raise RuntimeError(f"serve.py --workers {workers} did not serve readings within 30s")
+            finally:
+                server.terminate()
+                server.wait(timeout=15)
+        report(f"workers={workers} first response", first_response, sum(first_response))
+        report(f"workers={workers} first readings", first_data, sum(first_data))
+
+
+BENCHMARKS = {
+    "api": bench_api,
+    "db": bench_db,
+    "history": bench_history,
+    "export": bench_export,
+    "loadtest": bench_loadtest,
+    "metrics": bench_metrics,
+    "startup": bench_startup,
+    "assets": bench_assets,
+    "dashboard": bench_dashboard,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sensor dashboard benchmarks (simulated hardware)")
+    parser.add_argument("suite", nargs="?", default="all", choices=sorted(BENCHMARKS) + ["all"])
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--requests", type=int, default=500, help="sequential requests per endpoint")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients for throughput runs")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per throughput run")
+    parser.add_argument("--rows", type=int, default=500, help="rows per DB insert benchmark")
+    parser.add_argument("--seed-rows", type=int, default=1000, help="history rows to preload")
+    parser.add_argument("--history-rows", type=int, default=10000, help="stored rows per table for the history suite")
+    parser.add_argument("--history-repeat", type=int, default=20, help="fetches per history variant")
+    parser.add_argument("--export-rows", type=int, default=1000000, help="rows loaded for the export suite")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="worker counts for the load test")
+    parser.add_argument("--startup-repeat", type=int, default=5, help="cold starts per startup measurement")
+    parser.add_argument("--startup-workers", type=int, nargs="+", default=[0, 2],
+                        help="serve.py worker counts for the startup suite")
+    args = parser.parse_args(argv)
+
+    _prepare_env()
+    print(f"backend={os.environ['SENSOR_BACKEND']} db={os.environ['SENSORS_DB_PATH']}")
+    suites = sorted(BENCHMARKS) if args.suite == "all" else [args.suite]
+    for name in suites:
+        BENCHMARKS[name](args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
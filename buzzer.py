@@ -1,4 +1,5 @@
-import RPi.GPIO as GPIO
+import hal
+import threading
 import time
 
 # GPIO Physical Pin 35 = BCM GPIO 19
@@ -6,57 +7,51 @@ BUZZER_PIN = 19
 
 # Initialize buzzer state
 buzzer_active = False
+_pin_ready = False
+_lock = threading.Lock()
 
 def setup_buzzer():
-    """Initialize buzzer GPIO"""
-    if GPIO.getmode() is None:
-        GPIO.setmode(GPIO.BCM)
-    GPIO.setup(BUZZER_PIN, GPIO.OUT)
-    GPIO.output(BUZZER_PIN, GPIO.LOW)
+    """Initialize buzzer GPIO (once; later calls are no-ops)"""
+    global _pin_ready
+    if not _pin_ready:
+        hal.get_backend().setup_output(BUZZER_PIN, hal.LOW)
+        _pin_ready = True
+
+def set_buzzer(on):
+    """Drive the buzzer pin, writing the GPIO only when the state actually changes"""
+    global buzzer_active
+    with _lock:
+        if _pin_ready and on == buzzer_active:
+            return
+        setup_buzzer()
+        hal.get_backend().output(BUZZER_PIN, hal.HIGH if on else hal.LOW)
+        buzzer_active = on
+
+def reset_buzzer():
+    """Configure the pin and drive it LOW, whatever state it was left in (at startup)"""
+    global buzzer_active
+    with _lock:
+        setup_buzzer()
+        hal.get_backend().output(BUZZER_PIN, hal.LOW)
+        buzzer_active = False
 
 def activate_buzzer():
     """Turn on the buzzer"""
-    global buzzer_active
-    setup_buzzer()
-    GPIO.output(BUZZER_PIN, GPIO.HIGH)
-    buzzer_active = True
+    set_buzzer(True)
 
 def deactivate_buzzer():
     """Turn off the buzzer"""
-    global buzzer_active
-    setup_buzzer()
-    GPIO.output(BUZZER_PIN, GPIO.LOW)
-    buzzer_active = False
-
-def check_alert_conditions(rain_detected, sound_detected):
-    """
-    Check if both rain and sound are detected
-    Activate/deactivate buzzer accordingly
-    
-    Returns:
-        Dictionary with alert status
-    """
-    alert_active = rain_detected and sound_detected
-    
-    if alert_active:
-        activate_buzzer()
-    else:
-        deactivate_buzzer()
-    
-    return {
-        "alert_active": alert_active,
-        "buzzer_on": buzzer_active,
-        "message": "⚠️ ALERT: Rain and Sound Detected!" if alert_active else "System Normal"
-    }
+    set_buzzer(False)
 
 def cleanup():
     """Clean up GPIO resources"""
-    deactivate_buzzer()
+    if _pin_ready:
+        deactivate_buzzer()
 
 if __name__ == "__main__":
     print("=== Buzzer Test ===")
     print("Testing buzzer for 2 seconds...")
-    
+
     try:
         setup_buzzer()
         print("Buzzer ON")
@@ -68,4 +63,4 @@ if __name__ == "__main__":
         print("\nExiting...")
     finally:
         cleanup()
-        GPIO.cleanup()
\ No newline at end of file
+        hal.get_backend().cleanup()
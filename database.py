@@ -1,110 +1,860 @@
-# ...existing code...
+import atexit
 import os
+import queue
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import metrics
+import rollups
+import spill
+import storage_policy
 
 BASE_DIR = os.path.dirname(__file__)
-DB_PATH = os.path.join(BASE_DIR, "sensors.db")
+# SENSORS_DB_PATH lets benchmarks and off-Pi runs use a scratch database
+DB_PATH = os.environ.get("SENSORS_DB_PATH", os.path.join(BASE_DIR, "sensors.db"))
+
+# SQLite tuning. WAL lets readers run while the writer commits, and
+# synchronous=NORMAL only fsyncs the WAL at checkpoints instead of per commit.
+SYNCHRONOUS = os.environ.get("SENSORS_DB_SYNCHRONOUS", "NORMAL").upper()
+BUSY_TIMEOUT_MS = 5000
+
+# Write-behind queue: readings are group-committed every BATCH_SIZE rows or
+# FLUSH_INTERVAL_MS milliseconds, whichever comes first.
+BATCH_SIZE = int(os.environ.get("SENSORS_DB_BATCH_SIZE", 50))
+FLUSH_INTERVAL_MS = int(os.environ.get("SENSORS_DB_FLUSH_MS", 1000))
+
+# Readings wait for their commit in a memory-mapped ring (see spill.py) and are
+# replayed from it after a crash; the file belongs to the database like -wal.
+# "memory" keeps the ring in RAM only.
+SPILL_PATH = os.environ.get("SENSORS_SPILL_PATH", DB_PATH + "-spill")
+# Readings committed per transaction when draining a backlog
+DRAIN_MAX = 5000
+# Longest wait between commit attempts while the database keeps failing
+RETRY_MAX_S = 30.0
+
+# Idle reader connections kept for reuse by request threads.
+READER_POOL_SIZE = 8
+
+# Sensor name -> single-value history table written by insert_raindrop/insert_sound.
+HISTORY_TABLES = {
+    "rain": "raindrops",
+    "sound": "sound_readings",
+}
+
+# Sensor name -> (table, value column) for raw history reads, as used by the
+# /api/history/<sensor> routes.
+HISTORY_SOURCES = {
+    "rain": ("raindrops", "value"),
+    "sound": ("sound_readings", "value"),
+    "temperature": ("dht_readings", "temperature"),
+    "humidity": ("dht_readings", "humidity"),
+}
+
+# Schema migrations, applied in order. PRAGMA user_version records how many
+# have already run, so each step executes exactly once per database file.
+MIGRATIONS = [
+    # 1: time indexes so "latest N" and range queries are index seeks
+    """
+    CREATE INDEX IF NOT EXISTS idx_raindrops_ts ON raindrops(ts);
+    CREATE INDEX IF NOT EXISTS idx_sound_readings_ts ON sound_readings(ts);
+    """,
+    # 2: 1m / 1h / 1d aggregate tables
+    rollups.SCHEMA,
+    # 3: raindrops become run-length rows [ts, end_ts] (see storage_policy)
+    """
+    ALTER TABLE raindrops ADD COLUMN end_ts DATETIME;
+    """,
+    # 4: temperature / humidity history
+    """
+    CREATE TABLE IF NOT EXISTS dht_readings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        temperature REAL NOT NULL,
+        humidity REAL NOT NULL,
+        ts DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_dht_readings_ts ON dht_readings(ts);
+    """,
+    # 5: let retention.py hand freed pages back with PRAGMA incremental_vacuum.
+    # Switching an existing file needs one full VACUUM, so this step may take a while once.
+    """
+    PRAGMA auto_vacuum=INCREMENTAL;
+    VACUUM;
+    """,
+    # 6: alert on/off transitions recorded by alerts.py
+    """
+    CREATE TABLE IF NOT EXISTS alert_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        rule TEXT NOT NULL,
+        state TEXT NOT NULL,
+        message TEXT,
+        value REAL,
+        ts DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_alert_events_ts ON alert_events(ts);
+    """,
+    # 7: sequence number of the last reading committed from the spill ring
+    """
+    CREATE TABLE IF NOT EXISTS spill_state (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        committed_seq INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO spill_state (id, committed_seq) VALUES (0, 0);
+    """,
+]
+
+# Spill ring codes for the sensor and storage action of each reading
+SPILL_SENSORS = ("rain", "sound", "dht", "temperature", "humidity")
+SPILL_ACTIONS = ("start", "insert", "extend", "rollup")
+_SPILL_SENSOR_IDS = {name: i for i, name in enumerate(SPILL_SENSORS)}
+_SPILL_ACTION_IDS = {name: i for i, name in enumerate(SPILL_ACTIONS)}
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Tables storing one row per run of an unchanged value rather than per reading
+RUN_LENGTH_TABLES = {"raindrops"}
+
+# Output name -> column of dht_readings
+DHT_COLUMNS = {"temperature": "temperature", "humidity": "humidity"}
+
+_FLUSH = object()
+_CALL = object()
+_DRAIN = object()
+_STOP = object()
 
-def _get_conn():
+_writer_conn = None
+_writer_thread = None
+_writer_lock = threading.Lock()
+_schema_ready = False
+_spill = None
+_write_queue = queue.Queue()
+_reader_pool = queue.LifoQueue(maxsize=READER_POOL_SIZE)
+
+# table -> (change counter, epoch of last change), bumped after each commit
+# that wrote rows to the table; see table_version().
+_table_versions = {}
+_started_at = time.time()
+# table -> (change stamp, (token, last_modified)) of the last table_version() read
+_version_cache = {}
+
+_commit_seconds = metrics.histogram("db_commit_seconds", "Write-behind batch commit latency.")
+_committed = metrics.counter("db_queued_writes_total", "Queued writes committed to the database.")
+_commit_errors = metrics.counter("db_commit_errors_total", "Batches rolled back after a write error.")
+_query_seconds = metrics.histogram("db_query_seconds", "History read latency.", ("table",))
+metrics.gauge("db_write_queue_depth", "Writes waiting in the write-behind queue.", lambda: _write_queue.qsize())
+metrics.gauge("db_spill_pending", "Readings in the spill ring waiting for a commit.",
+              lambda: None if _spill is None else _spill.pending())
+_spill_dropped = metrics.counter("db_spill_dropped_total", "Readings overwritten in a full spill ring.")
+# Connection used by table_version() for PRAGMA data_version and its version reads
+_probe_conn = None
+_probe_lock = threading.Lock()
+
+
+def _connect():
     conn = sqlite3.connect(DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
     return conn
 
+
+def _get_writer():
+    """Return the single long-lived writer connection."""
+    global _writer_conn
+    if _writer_conn is None:
+        with _writer_lock:
+            if _writer_conn is None:
+                _writer_conn = _connect()
+    return _writer_conn
+
+
+@contextmanager
+def _reader():
+    """Borrow a pooled read connection for the duration of a query."""
+    if not _schema_ready:
+        init_db()
+    try:
+        conn = _reader_pool.get_nowait()
+    except queue.Empty:
+        conn = _connect()
+    try:
+        yield conn
+    finally:
+        try:
+            _reader_pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
 def init_db():
-    conn = _get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS raindrops (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            value REAL NOT NULL,
-            ts DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    # Create table for sound intensity history
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS sound_readings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            value REAL NOT NULL,
-            ts DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    conn.commit()
-    conn.close()
+    """
+    Create missing tables and apply pending migrations. Importing this module
+    does not touch the database: init_db() runs on the first read or write,
+    or explicitly from app.start(). Later calls are no-ops.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    conn = _get_writer()
+    with _writer_lock:
+        if _schema_ready:
+            return
+        cur = conn.cursor()
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS raindrops (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                value REAL NOT NULL,
+                ts DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Create table for sound intensity history
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS sound_readings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                value REAL NOT NULL,
+                ts DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.commit()
+        _migrate(conn)
+        _schema_ready = True
 
-def insert_raindrop(value, ts=None):
-    """Insert a raindrop reading. ts can be a datetime or None."""
+
+def _migrate(conn):
+    """Apply any MIGRATIONS newer than the database's user_version."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+        conn.executescript(script)
+        conn.execute(f"PRAGMA user_version={number}")
+        conn.commit()
+
+
+def _apply_run(conn, table, action, value, ts):
+    """Run-length write: close/extend the open run, then start a new one if the state changed."""
+    if action in ("insert", "extend"):
+        conn.execute(f"UPDATE {table} SET end_ts = ? WHERE id = (SELECT MAX(id) FROM {table})", (ts,))
+    if action in ("start", "insert"):
+        conn.execute(f"INSERT INTO {table} (value, ts, end_ts) VALUES (?, ?, ?)", (value, ts, ts))
+
+
+def _commit_batch(batch, spill_seq=None):
+    """
+    Write a batch of (sensor, value, ts, action) readings and their rollups in
+    one transaction, together with spill_seq, the last spill ring sequence
+    number it covers. Returns False if the transaction was rolled back.
+    """
+    conn = _get_writer()
+    started = time.perf_counter()
+    with _writer_lock:
+        try:
+            by_table = {}
+            dht_rows = []
+            alert_rows = []
+            samples = []
+            open_ends = {}  # run-length table -> ts of its latest "extend" in this batch
+            for sensor, value, ts, action in batch:
+                if sensor == "alert":
+                    # value is a (rule, state, message, value) tuple
+                    alert_rows.append((*value, ts))
+                    continue
+                if sensor == "dht":
+                    # value is a (temperature, humidity) pair
+                    dht_rows.append((value[0], value[1], ts))
+                    samples.append(("temperature", value[0], ts))
+                    samples.append(("humidity", value[1], ts))
+                    continue
+                samples.append((sensor, value, ts))
+                table = HISTORY_TABLES.get(sensor)
+                if table is None or action == "rollup":
+                    continue
+                if table in RUN_LENGTH_TABLES:
+                    if action == "extend":
+                        # only the newest end matters: one UPDATE per batch, not per reading
+                        open_ends[table] = ts
+                        continue
+                    # a state change closes the open run at its own ts, which supersedes the extends before it
+                    open_ends.pop(table, None)
+                    _apply_run(conn, table, action, value, ts)
+                else:
+                    by_table.setdefault(table, []).append((value, ts))
+            for table, ts in open_ends.items():
+                _apply_run(conn, table, "extend", None, ts)
+            for table, rows in by_table.items():
+                conn.executemany(f"INSERT INTO {table} (value, ts) VALUES (?, ?)", rows)
+            if dht_rows:
+                conn.executemany("INSERT INTO dht_readings (temperature, humidity, ts) VALUES (?, ?, ?)", dht_rows)
+            if alert_rows:
+                conn.executemany("INSERT INTO alert_events (rule, state, message, value, ts) VALUES (?, ?, ?, ?, ?)",
+                                 alert_rows)
+            rollups.apply(conn, samples)
+            if spill_seq is not None:
+                conn.execute("UPDATE spill_state SET committed_seq = ? WHERE id = 0", (spill_seq,))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            _commit_errors.inc()
+            print(f"Warning: failed to write {len(batch)} readings to DB, will retry: {e}")
+            return False
+    _commit_seconds.observe(time.perf_counter() - started)
+    _committed.inc(amount=len(batch))
+    touched = set(by_table)
+    touched.update(HISTORY_TABLES[sensor] for sensor, _, _, action in batch
+                   if sensor in HISTORY_TABLES and action != "rollup")
+    if dht_rows:
+        touched.add("dht_readings")
+    if alert_rows:
+        touched.add("alert_events")
+    _bump_versions(touched)
+    return True
+
+
+def _bump_versions(tables):
+    now = time.time()
+    for table in tables:
+        count = _table_versions.get(table, (0, None))[0]
+        _table_versions[table] = (count + 1, now)
+
+
+def _run_call(fn, tables, done, result):
+    """Execute a run_on_writer() job: fn(conn) in its own transaction."""
+    conn = _get_writer()
+    with _writer_lock:
+        try:
+            result.append(fn(conn))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            result.append(e)
+            done.set()
+            return
+    _bump_versions(tables)
+    done.set()
+
+
+def _decode_spilled(record):
+    """Spill ring record -> (sensor, value, ts, action) batch item."""
+    _, ts_us, sensor_id, action_id, value, value2 = record
+    sensor = SPILL_SENSORS[sensor_id]
+    ts = _EPOCH + timedelta(microseconds=ts_us)
+    return sensor, (value, value2) if sensor == "dht" else value, ts, SPILL_ACTIONS[action_id]
+
+
+def _drain(events):
+    """
+    Commit every reading waiting in the spill ring, plus the queued `events`
+    (alert rows, removed from the list once committed), DRAIN_MAX readings per
+    transaction. Returns False, leaving the rest in the ring, if a commit fails.
+    """
+    while True:
+        records, dropped, last = _spill.read(DRAIN_MAX)
+        if dropped:
+            _spill_dropped.inc(amount=dropped)
+            print(f"Warning: spill ring overflowed, {dropped} readings were lost")
+        batch = [_decode_spilled(r) for r in records] + events
+        if records:
+            # put the ring on disk before the commit: with synchronous=NORMAL a
+            # power cut can lose the last commits, which are then replayed from it
+            _spill.sync()
+        if (batch or dropped) and not _commit_batch(batch, last if _spill.persistent else None):
+            return False
+        del events[:]
+        _spill.mark_committed(last)
+        if _spill.pending() == 0:
+            return True
+
+
+def _writer_loop():
+    """
+    Group-commit readings from the spill ring every FLUSH_INTERVAL_MS (sooner
+    once BATCH_SIZE are waiting), with the alert rows from the write queue,
+    and serve flush and run_on_writer() requests in between. A failed commit
+    leaves the readings in the ring and is retried with exponential backoff
+    (up to RETRY_MAX_S).
+    """
+    interval = FLUSH_INTERVAL_MS / 1000.0
+    events = []
+    failures = 0
+    next_drain = time.monotonic() + interval
+    while True:
+        try:
+            item = _write_queue.get(timeout=max(0.0, next_drain - time.monotonic()))
+        except queue.Empty:
+            item = None
+
+        control = item is _STOP or (item is not None and item[0] in (_FLUSH, _CALL, _DRAIN))
+        if item is not None and not control:
+            events.append(item)
+        if control or time.monotonic() >= next_drain:
+            if _drain(events):
+                failures = 0
+                next_drain = time.monotonic() + interval
+            else:
+                failures += 1
+                next_drain = time.monotonic() + min(RETRY_MAX_S, interval * 2 ** failures)
+
+        if item is _STOP:
+            return
+        if item is not None and item[0] is _CALL:
+            _run_call(*item[1:])
+        elif item is not None and item[0] is _FLUSH:
+            item[1].set()
+
+
+def _start_writer():
+    global _writer_thread
+    global _spill
+    if _writer_thread is None:
+        init_db()
+        # after a close() the schema is known but the connection is gone
+        conn = _get_writer()
+        with _writer_lock:
+            if _writer_thread is None:
+                if _spill is None:
+                    _spill = spill.SpillRing(None if SPILL_PATH == "memory" else SPILL_PATH)
+                    committed = conn.execute("SELECT committed_seq FROM spill_state").fetchone()[0]
+                    replay = _spill.recover(committed) if _spill.persistent else 0
+                    if replay:
+                        print(f"Replaying {replay} readings left in {_spill.path}")
+                _writer_thread = threading.Thread(target=_writer_loop, name="db-writer", daemon=True)
+                _writer_thread.start()
+                # queued writes must reach the file even if nobody calls close()
+                atexit.unregister(close)
+                atexit.register(close)
+
+
+def _enqueue(sensor, value, ts, action=None, value2=0.0):
+    """Append a reading to the spill ring; the writer commits it with the next batch."""
+    _start_writer()
     if ts is None:
         ts = datetime.utcnow()
-    conn = _get_conn()
-    cur = conn.cursor()
-    cur.execute("INSERT INTO raindrops (value, ts) VALUES (?, ?)", (float(value), ts))
-    conn.commit()
-    last_id = cur.lastrowid
-    conn.close()
-    return last_id
+    value = float(value)
+    if action is None:
+        action = storage_policy.decide(sensor, value, ts)
+    waiting = _spill.append((ts - _EPOCH) // _MICROSECOND, _SPILL_SENSOR_IDS[sensor], _SPILL_ACTION_IDS[action],
+                            value, value2)
+    if waiting == BATCH_SIZE:
+        _write_queue.put((_DRAIN,))
+
+
+def _read_version(conn, table):
+    """(token, last_modified epoch) computed from the rows of `table` themselves."""
+    end = "julianday(end_ts)" if table in RUN_LENGTH_TABLES else "NULL"
+    newest = conn.execute(
+        f"SELECT id, julianday(ts), {end} FROM {table} ORDER BY id DESC LIMIT 1").fetchone()
+    if newest is None:
+        return "0.0.0", _started_at
+    oldest = conn.execute(f"SELECT MIN(id) FROM {table}").fetchone()[0]
+    newest_id, started, ended = newest
+    latest = max(started or 0.0, ended or 0.0)
+    modified = (latest - 2440587.5) * 86400.0 if latest else _started_at
+    # oldest id: retention pruning; newest id: new rows; latest time: a growing run
+    return f"{oldest}.{newest_id}.{int(modified * 1000)}", modified
+
+
+def table_version(table):
+    """
+    Return (token, last_modified epoch) identifying the current rows of `table`.
+
+    The token is derived from the data (oldest and newest id, and the newest
+    row's time including a run's end), so it only changes when `table` does
+    and every process, the owner and each serve.py worker, computes the same
+    one: ETags built from it validate on whichever worker answers.
+
+    It is recomputed only when something may have changed. In the process that
+    writes, that is after a commit touching `table`; in read-only processes
+    it is whenever PRAGMA data_version moves, which any commit does, but
+    commits to other tables leave the token as it was.
+    """
+    global _probe_conn
+    with _probe_lock:
+        if _probe_conn is None:
+            _probe_conn = _connect()
+        if _writer_thread is not None:
+            stamp = _table_versions.get(table, (0, None))[0]
+        else:
+            stamp = ("d", _probe_conn.execute("PRAGMA data_version").fetchone()[0])
+        cached = _version_cache.get(table)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        version = _read_version(_probe_conn, table)
+        _version_cache[table] = (stamp, version)
+        return version
+
+
+def run_on_writer(fn, tables=(), timeout=30.0):
+    """
+    Run fn(conn) on the writer thread, between group commits, and return its result.
+
+    Maintenance such as retention pruning goes through here so it is serialized
+    with the queued inserts instead of competing with them for the write lock.
+    The job is committed on success and rolled back if fn raises, in which case
+    the exception is re-raised here. `tables` are marked changed for table_version().
+    """
+    _start_writer()
+    done = threading.Event()
+    result = []
+    _write_queue.put((_CALL, fn, tables, done, result))
+    if not done.wait(timeout):
+        raise TimeoutError("database writer did not run the job in time")
+    if isinstance(result[0], Exception):
+        raise result[0]
+    return result[0]
+
+
+def flush(timeout=5.0):
+    """
+    Commit every queued reading now. Returns False if the writer did not finish
+    in time or the commit failed (the readings then stay in the spill ring).
+    """
+    if _writer_thread is None:
+        return True
+    done = threading.Event()
+    _write_queue.put((_FLUSH, done))
+    return done.wait(timeout) and _spill.pending() == 0
+
+
+def close():
+    """Flush pending writes and close all connections (called on shutdown)."""
+    global _writer_conn, _writer_thread, _probe_conn, _spill
+    if _writer_thread is not None:
+        _write_queue.put(_STOP)
+        _writer_thread.join(5.0)
+        if _writer_thread.is_alive():
+            print("Warning: database writer did not stop in time")
+            return
+        _writer_thread = None
+    if _spill is not None:
+        # readings that could not be committed stay in the file for the next start
+        _spill.close()
+        _spill = None
+    while True:
+        try:
+            _reader_pool.get_nowait().close()
+        except queue.Empty:
+            break
+    if _writer_conn is not None:
+        _writer_conn.close()
+        _writer_conn = None
+    with _probe_lock:
+        if _probe_conn is not None:
+            _probe_conn.close()
+            _probe_conn = None
+        _version_cache.clear()
+
+
+def insert_raindrop(value, ts=None):
+    """
+    Queue a raindrop reading for the next group commit. ts can be a datetime or None.
+    Only state changes start a new row; see storage_policy.
+    """
+    _enqueue("rain", value, ts)
+
 
 def insert_sound(value, ts=None):
-    """Insert a sound intensity reading. ts can be a datetime or None."""
+    """
+    Queue a sound intensity reading for the next group commit. ts can be a datetime or None.
+    Readings inside the storage_policy deadband only update the rollups.
+    """
+    _enqueue("sound", value, ts)
+
+
+def insert_dht(temperature, humidity, ts=None):
+    """Queue a temperature/humidity reading for the next group commit. ts can be a datetime or None."""
+    _enqueue("dht", temperature, ts, "insert", float(humidity))
+
+
+def insert_alert_event(rule, state, message=None, value=None, ts=None):
+    """Queue an alert transition (state "on" or "off") for the next group commit."""
+    _start_writer()
     if ts is None:
         ts = datetime.utcnow()
-    conn = _get_conn()
-    cur = conn.cursor()
-    cur.execute("INSERT INTO sound_readings (value, ts) VALUES (?, ?)", (float(value), ts))
-    conn.commit()
-    last_id = cur.lastrowid
-    conn.close()
-    return last_id
-
-def get_last_raindrops(limit=10):
-    """Return the last `limit` readings ordered oldest->newest as list of dicts."""
-    conn = _get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT id, value, ts FROM raindrops ORDER BY ts DESC LIMIT ?", (int(limit),))
-    rows = cur.fetchall()
-    conn.close()
-    # rows are newest first; reverse to oldest->newest
-    rows = list(reversed(rows))
+    _write_queue.put(("alert", (rule, state, message, value), ts, "insert"))
 
-    out = []
-    for r in rows:
-        ts = r["ts"]
-        # Normalize timestamp to ISO8601 (UTC). DB may return datetime or string 'YYYY-MM-DD HH:MM:SS'
-        if isinstance(ts, datetime):
-            ts_iso = ts.isoformat() + "Z"
-        else:
-            s = str(ts) if ts is not None else ""
-            # convert "YYYY-MM-DD HH:MM:SS" -> "YYYY-MM-DDTHH:MM:SSZ"
-            if s and "T" not in s:
-                ts_iso = s.replace(" ", "T") + "Z"
-            else:
-                ts_iso = s
-        out.append({"id": r["id"], "value": r["value"], "ts": ts_iso})
-    return out
 
-def get_last_sounds(limit=10):
-    """Return the last `limit` sound readings ordered oldest->newest as list of dicts."""
-    conn = _get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT id, value, ts FROM sound_readings ORDER BY ts DESC LIMIT ?", (int(limit),))
-    rows = cur.fetchall()
-    conn.close()
-    rows = list(reversed(rows))
+def get_alert_events(limit=50, rule=None, time_format="iso"):
+    """Return the last `limit` alert transitions (optionally of one rule), oldest->newest."""
+    fmt = TIME_FORMATS[time_format].format(col="ts")
+    where, params = ("WHERE rule = ?", [rule]) if rule is not None else ("", [])
+    params.append(int(limit))
+    with _reader() as conn:
+        cur = conn.cursor()
+        cur.row_factory = None
+        rows = cur.execute(
+            f"SELECT {fmt}, id, rule, state, message, value FROM alert_events {where} ORDER BY ts DESC LIMIT ?", params
+        ).fetchall()
+    rows.reverse()
+    return [{"ts": ts, "id": i, "rule": r, "state": st, "message": m, "value": v} for ts, i, r, st, m, v in rows]
+
+
+def record_sample(sensor, value, ts=None):
+    """Queue a reading that only feeds the rollups (e.g. temperature, humidity)."""
+    if sensor not in rollups.ROLLUP_SENSORS:
+        raise ValueError(f"No rollups for sensor '{sensor}'")
+    _enqueue(sensor, value, ts, action="rollup")
+
+# SQL expressions rendering a stored ts column ("YYYY-MM-DD HH:MM:SS[.ffffff]")
+# in each supported output format.
+TIME_FORMATS = {
+    "iso": "replace({col}, ' ', 'T') || 'Z'",
+    "epoch_ms": "CAST(round((julianday({col}) - 2440587.5) * 86400000) AS INTEGER)",
+}
+
+# SQL conditions "end_ts is later than the client-supplied ts ?", compared in
+# the output format so a point the client already holds never counts as newer.
+_END_AFTER = {
+    "iso": "julianday(end_ts) > julianday(?)",
+    "epoch_ms": TIME_FORMATS["epoch_ms"].format(col="end_ts") + " > ?",
+}
+
+def read_history(table, columns=None, start=None, end=None, limit=500, since_id=None,
+                 time_format="iso", columnar=False, since_ts=None):
+    """
+    Generic raw history reader behind get_last_*, get_history and get_dht_history.
 
+    Returns up to `limit` rows of `table` with start <= ts <= end (or id > since_id),
+    oldest->newest, keeping the most recent when more match. `columns` maps output
+    names to table columns (default {"value": "value"}). SQLite filters, formats
+    the timestamps and walks the index newest-first, so Python only reverses the
+    result tuples and zips them into {id, <columns>, ts} dicts or, with
+    columnar=True, into {"id": [...], <column>: [...], "ts": [...]}.
+    time_format is "iso" or "epoch_ms" (integer milliseconds since the epoch).
+    Run-length tables (see RUN_LENGTH_TABLES) yield a start and an end point per run.
+    The newest run keeps growing after a client has seen it, so a delta read
+    with since_id and since_ts (the ts of the newest point the client holds)
+    first repeats run `since_id`'s end point if it moved past since_ts.
+    """
+    if columns is None:
+        columns = {"value": "value"}
+    fmt = TIME_FORMATS[time_format]
+    names = ["ts", "id", *columns]
+    select = ", ".join([fmt.format(col="ts"), "id", *columns.values()])
+    runs = table in RUN_LENGTH_TABLES
+    if runs:
+        select += _run_end_column(fmt)
+    where, params = _range_clause(start, end)
+    if since_id is not None:
+        where = f"{where} AND id > ?" if where else "WHERE id > ?"
+        params.append(int(since_id))
+    order = "id" if since_id is not None else "ts"
+    params.append(int(limit))
+
+    with _query_seconds.time(table), _reader() as conn:
+        cur = conn.cursor()
+        cur.row_factory = None  # plain tuples
+        rows = cur.execute(f"SELECT {select} FROM {table} {where} ORDER BY {order} DESC LIMIT ?", params).fetchall()
+        if runs and start is not None and len(rows) < limit:
+            # include the run that was already in progress at `start`: the last
+            # run starting before it, if it lasted until start. end_ts has no
+            # index, so it is checked on that one row instead of in the WHERE
+            previous = cur.execute(
+                f"SELECT {select}, end_ts >= ? FROM {table} WHERE ts < ? ORDER BY ts DESC LIMIT 1", (start, start)
+            ).fetchone()
+            if previous is not None and previous[-1]:
+                rows.append(previous[:-1])
+        moved = []
+        if runs and since_id is not None and since_ts is not None:
+            end_select = ", ".join([fmt.format(col="end_ts"), "id", *columns.values()])
+            moved = cur.execute(
+                f"SELECT {end_select} FROM {table} WHERE id = ? AND end_ts != ts AND {_END_AFTER[time_format]}",
+                (int(since_id), since_ts),
+            ).fetchall()
+    rows.reverse()
+    if runs:
+        rows = moved + _expand_runs(rows)
+    if columnar:
+        cols = list(zip(*rows)) or [()] * len(names)
+        return {name: list(col) for name, col in zip(names, cols)}
+    if len(names) == 3:
+        # ts, id, value: a dict literal is several times faster than dict(zip()) per row
+        a, b, c = names
+        return [{a: x, b: y, c: z} for x, y, z in rows]
+    return [dict(zip(names, r)) for r in rows]
+
+def _run_end_column(fmt):
+    """Extra select column for run-length tables: the formatted end_ts, or NULL if the run has no extent."""
+    return f", CASE WHEN end_ts IS NOT NULL AND end_ts != ts THEN {fmt.format(col='end_ts')} END"
+
+def _expand_runs(rows):
+    """Expand run-length tuples (ts, *fields, end_ts or None) into (ts, *fields) start and end points."""
     out = []
+    append = out.append
     for r in rows:
-        ts = r["ts"]
-        if isinstance(ts, datetime):
-            ts_iso = ts.isoformat() + "Z"
-        else:
-            s = str(ts) if ts is not None else ""
-            if s and "T" not in s:
-                ts_iso = s.replace(" ", "T") + "Z"
-            else:
-                ts_iso = s
-        out.append({"id": r["id"], "value": r["value"], "ts": ts_iso})
+        append(r[:-1])
+        if r[-1] is not None:
+            append((r[-1],) + r[1:-1])
     return out
 
-# Initialize DB on import
-init_db()
-# ...existing code...
\ No newline at end of file
+def iter_history(table, columns=None, start=None, end=None, time_format="iso", batch_size=1000, as_json=False):
+    """
+    Stream every row of `table` with start <= ts <= end, oldest->newest, as lists
+    of up to `batch_size` (ts, *values) tuples fetched from one server-side cursor,
+    so memory use does not grow with the range. `columns` is as for read_history().
+    With as_json=True each tuple holds one NDJSON text rendered by SQLite's
+    json_object() (two lines for a run-length row with an extent).
+    A pooled reader, and so one consistent snapshot, is held until the generator
+    is exhausted or closed.
+    """
+    if columns is None:
+        columns = {"value": "value"}
+    fmt = TIME_FORMATS[time_format]
+    runs = table in RUN_LENGTH_TABLES
+    if as_json:
+        def obj(ts_col):
+            pairs = ", ".join([f"'ts', {fmt.format(col=ts_col)}", *(f"'{name}', {col}" for name, col in columns.items())])
+            return f"json_object({pairs})"
+        select = obj("ts")
+        if runs:
+            select += f" || CASE WHEN end_ts IS NOT NULL AND end_ts != ts THEN char(10) || {obj('end_ts')} ELSE '' END"
+    else:
+        select = ", ".join([fmt.format(col="ts"), *columns.values()])
+        if runs:
+            select += _run_end_column(fmt)
+    where, params = _range_clause(start, end)
+    with _reader() as conn:
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute(f"SELECT {select} FROM {table} {where} ORDER BY ts", params)
+        try:
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield _expand_runs(rows) if runs and not as_json else rows
+        finally:
+            cur.close()
+
+def get_last_raindrops(limit=10, since_id=None, time_format="iso", columnar=False, since_ts=None):
+    """Return the last `limit` readings ordered oldest->newest as list of dicts.
+    With `since_id`, only rows newer than that id are returned (at most `limit`, newest kept).
+    Rows are runs of an unchanged value; each run is expanded into its start
+    and end points so charts draw the same steps as per-reading rows. Pass
+    `since_ts` with `since_id` to also get the moved end of run `since_id`.
+    """
+    return read_history("raindrops", limit=limit, since_id=since_id, time_format=time_format, columnar=columnar,
+                        since_ts=since_ts)
+
+def get_last_sounds(limit=10, since_id=None, time_format="iso", columnar=False):
+    """Return the last `limit` sound readings ordered oldest->newest as list of dicts.
+    With `since_id`, only rows newer than that id are returned (at most `limit`, newest kept).
+    """
+    return read_history("sound_readings", limit=limit, since_id=since_id, time_format=time_format, columnar=columnar)
+
+def get_last_dht():
+    """Return the newest stored DHT reading as {id, temperature, humidity, ts} or None."""
+    rows = read_history("dht_readings", DHT_COLUMNS, limit=1)
+    return rows[0] if rows else None
+
+def get_dht_history(start=None, end=None, limit=500, time_format="iso", columnar=False):
+    """Return up to `limit` DHT readings with start <= ts <= end, oldest->newest (most recent kept)."""
+    return read_history("dht_readings", DHT_COLUMNS, start, end, limit, time_format=time_format, columnar=columnar)
+
+# Fields of rollup rows, as returned by rollups.query()
+SERIES_FIELDS = ("ts", "value", "min", "max", "count")
+DHT_SERIES_FIELDS = ("ts", "temperature", "temperature_min", "temperature_max",
+                     "humidity", "humidity_min", "humidity_max")
+
+def _to_columns(rows, fields):
+    """Turn row dicts into {field: [values...]} (the columnar shape of read_history)."""
+    return {field: [r.get(field) for r in rows] for field in fields}
+
+def get_dht_series(start=None, end=None, points=300, resolution=None, time_format="iso", columnar=False):
+    """
+    Return (resolution, rows) for temperature and humidity like get_series(),
+    with both sensors merged per timestamp into {ts, temperature, humidity, ...} rows.
+    """
+    if resolution is None:
+        if end is None:
+            end = datetime.utcnow()
+        if start is None:
+            start = end - timedelta(days=1)
+        resolution = rollups.choose_resolution((end - start).total_seconds(), points)
+    if resolution == "raw":
+        return resolution, get_dht_history(start, end, limit=points, time_format=time_format, columnar=columnar)
+    merged = {}
+    for sensor in ("temperature", "humidity"):
+        for r in get_series(sensor, start, end, points, resolution, time_format)[1]:
+            row = merged.setdefault(r["ts"], {"ts": r["ts"]})
+            row[sensor] = r["value"]
+            row[f"{sensor}_min"] = r["min"]
+            row[f"{sensor}_max"] = r["max"]
+    rows = [merged[ts] for ts in sorted(merged)]
+    return resolution, _to_columns(rows, DHT_SERIES_FIELDS) if columnar else rows
+
+def _range_clause(start, end):
+    """WHERE clause and params for start <= ts <= end (either bound may be None)."""
+    clauses = []
+    params = []
+    if start is not None:
+        clauses.append("ts >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("ts <= ?")
+        params.append(end)
+    return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+def get_history(sensor, start=None, end=None, limit=500, time_format="iso", columnar=False):
+    """
+    Return up to `limit` readings for `sensor` with start <= ts <= end, ordered
+    oldest->newest. When the range holds more rows, the most recent are kept.
+    start/end are naive UTC datetimes or None for an open bound.
+    """
+    table, column = HISTORY_SOURCES[sensor]
+    return read_history(table, {"value": column}, start, end, limit, time_format=time_format, columnar=columnar)
+
+def get_series(sensor, start=None, end=None, points=300, resolution=None, time_format="iso", columnar=False):
+    """
+    Return (resolution, rows) covering start..end with about `points` rows,
+    served from the raw table when it is fine enough and from the coarsest
+    needed rollup otherwise. `resolution` forces "raw" or a rollup name.
+    A missing start defaults to 24 hours before end.
+    """
+    if end is None:
+        end = datetime.utcnow()
+    if start is None:
+        start = end - timedelta(days=1)
+    has_raw = sensor in HISTORY_SOURCES
+    if resolution is None:
+        resolution = rollups.choose_resolution((end - start).total_seconds(), points, has_raw)
+    if resolution == "raw":
+        return resolution, get_history(sensor, start, end, limit=points, time_format=time_format, columnar=columnar)
+    with _reader() as conn:
+        rows = rollups.query(conn, sensor, resolution, start, end, time_format)
+    return resolution, _to_columns(rows, SERIES_FIELDS) if columnar else rows
+
+def get_db_stats():
+    """
+    Size and contents of the database: file sizes, page usage and, per table,
+    the row count and covered time range (epoch seconds for rollup buckets).
+    """
+    def size(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    with _reader() as conn:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        tables = {}
+        iso = TIME_FORMATS["iso"]
+        for table in (*HISTORY_TABLES.values(), "dht_readings", "alert_events"):
+            count, oldest, newest = conn.execute(
+                f"SELECT COUNT(*), {iso.format(col='MIN(ts)')}, {iso.format(col='MAX(ts)')} FROM {table}"
+            ).fetchone()
+            tables[table] = {"rows": count, "oldest": oldest, "newest": newest}
+        for name, _ in rollups.RESOLUTIONS:
+            count, oldest, newest = conn.execute(f"SELECT COUNT(*), MIN(bucket), MAX(bucket) FROM rollup_{name}").fetchone()
+            tables[f"rollup_{name}"] = {"rows": count, "oldest": oldest, "newest": newest}
+    return {
+        "path": DB_PATH,
+        "file_bytes": size(DB_PATH),
+        "wal_bytes": size(DB_PATH + "-wal"),
+        "page_size": page_size,
+        "page_count": page_count,
+        "free_pages": freelist,
+        "tables": tables,
+    }
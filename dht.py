@@ -1,12 +1,22 @@
-import RPi.GPIO as GPIO
-import dht11
+import hal
+import database
+import metrics
+import threading
 import time
+from collections import deque
+from datetime import datetime, timezone
 
 # DHT11 sensor on GPIO 37 = BCM 26
 DHT_PIN = 26
 
-# Initialize GPIO
-GPIO.setwarnings(False)
+# The DHT11 datasheet asks for at least 2 seconds between reads
+MIN_INTERVAL = 2.0
+# Backoff ceiling while the sensor keeps failing
+MAX_INTERVAL = 30.0
+# Number of recent reads used for the rolling success ratio
+STATS_WINDOW = 20
+# Reads at MIN_INTERVAL a mostly-healthy sensor gets before backing off
+HEALTHY_RETRIES = 3
 
 # Cache for last valid reading
 last_valid_reading = {
@@ -16,57 +26,142 @@ last_valid_reading = {
     "attempts": 0
 }
 
-def setup_dht():
-    """Initialize DHT sensor GPIO"""
-    if GPIO.getmode() is None:
-        GPIO.setmode(GPIO.BCM)
+_outcomes = deque(maxlen=STATS_WINDOW)  # True/False per hardware read
+_stats = {"reads": 0, "failures": 0, "consecutive_failures": 0}
+_sampled_at = None     # epoch time of the last valid read
+_last_attempt = None   # monotonic time of the last hardware read
+_lock = threading.Lock()
 
-# Create DHT11 instance
-setup_dht()
-instance = dht11.DHT11(pin=DHT_PIN)
+_read_seconds = metrics.histogram("sensor_dht_read_seconds", "DHT11 hardware read latency.")
+_reads = metrics.counter("sensor_dht_reads_total", "DHT11 hardware reads by outcome.", ("result",))
+_fallbacks = metrics.counter("sensor_dht_fallbacks_total",
+                             "Failed DHT11 reads, by what is served instead: the stored reading from "
+                             "warm_start(), the last live reading, or nothing.", ("reason",))
 
-def read_dht(retries=5, delay=0.5):
-    global last_valid_reading
-    
-    for attempt in range(retries):
-        result = instance.read()
-        
-        if result.is_valid():
-            # Update cache with new valid reading
-            last_valid_reading = {
-                "temperature": result.temperature,
-                "humidity": result.humidity,
-                "error": None,
-                "attempts": attempt + 1
-            }
-            return last_valid_reading.copy()
-        
-        # Wait before retry (DHT11 needs ~2 seconds between reads)
-        if attempt < retries - 1:
-            time.sleep(delay)
-    
-    # All retries failed - return last valid reading if available
-    if last_valid_reading["temperature"] is not None:
-        return {
-            "temperature": last_valid_reading["temperature"],
-            "humidity": last_valid_reading["humidity"],
-            "error": "Using cached data (sensor read failed)",
-            "attempts": retries,
-            "cached": True
-        }
-    else:
-        # No previous valid reading exists
-        return {
-            "temperature": None,
-            "humidity": None,
-            "error": "No data available yet",
-            "attempts": retries,
-            "cached": False
+def warm_start():
+    """
+    Seed the cache from the newest stored reading so the dashboard has data
+    before the first live read. Returns True if a reading was restored.
+    """
+    global last_valid_reading, _sampled_at
+    try:
+        row = database.get_last_dht()
+    except Exception as e:
+        print(f"Warning: could not load last DHT reading: {e}")
+        return False
+    if row is None or last_valid_reading["temperature"] is not None:
+        return False
+    with _lock:
+        _sampled_at = datetime.fromisoformat(row["ts"].rstrip("Z")).replace(tzinfo=timezone.utc).timestamp()
+        last_valid_reading = {
+            "temperature": row["temperature"],
+            "humidity": row["humidity"],
+            "error": None,
+            "attempts": 0,
+            "restored": True
         }
+    return True
+
+def success_ratio():
+    """Fraction of the last STATS_WINDOW hardware reads that were valid (None before any read)."""
+    outcomes = list(_outcomes)
+    if not outcomes:
+        return None
+    return sum(outcomes) / len(outcomes)
+
+def next_interval():
+    """
+    Seconds until the DHT worker should read again. Never below MIN_INTERVAL;
+    after repeated failures it backs off exponentially up to MAX_INTERVAL.
+    A sensor with a good recent success ratio gets a few quick retries first.
+    """
+    failures = _stats["consecutive_failures"]
+    ratio = success_ratio()
+    # too few reads to judge yet counts as healthy
+    healthy = len(_outcomes) < HEALTHY_RETRIES + 2 or ratio >= 0.5
+    allowed = HEALTHY_RETRIES if healthy else 0
+    if failures <= allowed:
+        return MIN_INTERVAL
+    return min(MAX_INTERVAL, MIN_INTERVAL * 2 ** (failures - allowed))
+
+def sample_dht():
+    """
+    Perform one hardware read (no retries, no sleeping) and return read_dht().
+    Calls closer than MIN_INTERVAL to the previous read return the cache instead.
+    Meant to be driven by the sampler's DHT worker only.
+    """
+    global last_valid_reading, _sampled_at, _last_attempt
+    with _lock:
+        now = time.monotonic()
+        if _last_attempt is None or now - _last_attempt >= MIN_INTERVAL:
+            _last_attempt = now
+            with _read_seconds.time():
+                result = hal.get_backend().read_dht(DHT_PIN)
+            valid = result.is_valid()
+            _reads.inc("ok" if valid else "failed")
+            _outcomes.append(valid)
+            _stats["reads"] += 1
+            if valid:
+                _stats["consecutive_failures"] = 0
+                _sampled_at = time.time()
+                # Update cache with new valid reading
+                last_valid_reading = {
+                    "temperature": result.temperature,
+                    "humidity": result.humidity,
+                    "error": None,
+                    "attempts": 1
+                }
+            else:
+                _stats["failures"] += 1
+                _stats["consecutive_failures"] += 1
+                if last_valid_reading.get("restored"):
+                    _fallbacks.inc("restored")
+                elif last_valid_reading["temperature"] is not None:
+                    _fallbacks.inc("read_failed")
+                else:
+                    _fallbacks.inc("no_data")
+    return read_dht()
+
+def read_dht():
+    """
+    Return the latest cached reading with staleness metadata: sampled_at (time of
+    the last valid read), age_ms and the rolling success_ratio. Never touches the
+    hardware, so it is safe to call from request handlers.
+    """
+    reading = last_valid_reading
+    failures = _stats["consecutive_failures"]
+    data = {
+        "temperature": reading["temperature"],
+        "humidity": reading["humidity"],
+        "error": reading["error"],
+        "attempts": failures + 1 if failures else reading["attempts"],
+        "cached": False,
+    }
+    if reading.get("restored"):
+        # warm-started from the DB, no live read has succeeded yet
+        data["error"] = "Using stored reading (waiting for sensor)"
+        data["cached"] = True
+    elif failures:
+        if reading["temperature"] is not None:
+            # Current reads fail - return last valid reading
+            data["error"] = "Using cached data (sensor read failed)"
+            data["cached"] = True
+        else:
+            # No previous valid reading exists
+            data["error"] = "No data available yet"
+
+    sampled_at = _sampled_at
+    ratio = success_ratio()
+    data["sampled_at"] = None if sampled_at is None else datetime.utcfromtimestamp(sampled_at).isoformat() + "Z"
+    data["age_ms"] = None if sampled_at is None else int((time.time() - sampled_at) * 1000)
+    data["success_ratio"] = None if ratio is None else round(ratio, 3)
+    data["reads"] = _stats["reads"]
+    data["failures"] = _stats["failures"]
+    return data
 
 def read_dht_console():
     """Console version with print statements"""
-    data = read_dht()
+    data = sample_dht()
     
     if data.get("cached"):
         print(f"⚠️  Using cached data (current read failed)")
@@ -96,4 +191,4 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         print("\nExiting...")
     finally:
-        GPIO.cleanup()
\ No newline at end of file
+        hal.get_backend().cleanup()
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+Interrupt-driven edge tracking for digital sensor pins.
+
+The GPIO edge callback only appends (timestamp, level) to a deque, which is
+atomic in CPython, so the interrupt thread never waits on a lock. Consumers
+drain that queue when they ask for stats and keep their own short history to
+count events and compute the duty cycle over a sliding window.
+"""
+import threading
+import time
+from collections import deque
+
+import hal
+
+# Default window (seconds) for event counts and duty cycle
+EVENT_WINDOW = 5.0
+# Debounce passed to the GPIO driver, in milliseconds
+BOUNCE_MS = 5
+# Edges buffered between two consumer polls before the oldest are dropped
+QUEUE_SIZE = 4096
+
+
+class EdgeMonitor:
+    """Counts transitions of one input pin from GPIO edge callbacks."""
+
+    def __init__(self, pin, active_low=True, window=EVENT_WINDOW):
+        self.pin = pin
+        self.active_level = hal.LOW if active_low else hal.HIGH
+        self.window = window
+        self.running = False
+        self._queue = deque(maxlen=QUEUE_SIZE)
+        self._lock = threading.Lock()          # consumer side only
+        self._history = deque()                # (t, level) transitions inside the window
+        self._level = None                     # level before the oldest entry in _history
+        self._last_event = None
+        self._total_events = 0
+
+    def _on_edge(self, pin, level):
+        # runs on the GPIO interrupt thread: keep it to one atomic append
+        self._queue.append((time.monotonic(), level))
+
+    def start(self):
+        """Register the edge callback. Returns False if the backend refused it."""
+        if self.running:
+            return True
+        backend = hal.get_backend()
+        try:
+            self._level = backend.input(self.pin)
+            backend.add_event_detect(self.pin, self._on_edge, bouncetime=BOUNCE_MS)
+        except Exception as e:
+            print(f"Warning: edge detection unavailable on pin {self.pin}: {e}")
+            return False
+        self.running = True
+        return True
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        try:
+            hal.get_backend().remove_event_detect(self.pin)
+        except Exception:
+            pass
+
+    def _drain(self, now):
+        queue = self._queue
+        history = self._history
+        while queue:
+            t, level = queue.popleft()
+            current = history[-1][1] if history else self._level
+            if level == current:
+                continue  # bounce / duplicate edge, level did not change
+            history.append((t, level))
+            if level == self.active_level:
+                self._total_events += 1
+                self._last_event = t
+        horizon = now - self.window
+        while history and history[0][0] < horizon:
+            self._level = history.popleft()[1]
+
+    def stats(self, window=None):
+        """
+        Summarize the pin over the last `window` seconds (at most the monitor window):
+        activations, duty cycle (fraction of time active), current state and last event time.
+        """
+        window = self.window if window is None else min(window, self.window)
+        now = time.monotonic()
+        with self._lock:
+            self._drain(now)
+            start = now - window
+            level = self._level
+            events = 0
+            active_time = 0.0
+            since = start
+            for t, new_level in self._history:
+                if t < start:
+                    level = new_level
+                    continue
+                if level == self.active_level:
+                    active_time += t - since
+                if new_level == self.active_level:
+                    events += 1
+                level = new_level
+                since = t
+            if level == self.active_level:
+                active_time += now - since
+            last_event = self._last_event
+            total = self._total_events
+        offset = time.time() - now
+        return {
+            "active": level == self.active_level,
+            "events": events,
+            "duty_cycle": round(active_time / window, 3) if window > 0 else 0.0,
+            "last_event": None if last_event is None else last_event + offset,
+            "total_events": total,
+            "window_s": window,
+        }
@@ -0,0 +1,122 @@
+"""
+Streaming bulk export of sensor history.
+
+Rows come from a server-side SQLite cursor (database.iter_history) in batches
+of BATCH_SIZE and are encoded one batch at a time, so memory use stays flat
+whatever the length of the range.
+
+    csv     "ts,<columns>" header, then one line per reading
+    ndjson  one JSON object per line, rendered by SQLite's json_object()
+    bin     compact columnar binary, below
+
+Binary layout (little endian):
+
+    b"SNSX"  magic, then uint8 format version (1)
+    uint32   header length, then UTF-8 JSON {"sensor", "columns": [...]}
+    blocks   uint32 row count n, int64[n] epoch milliseconds, then float32[n] per column
+    uint32   0 (end of stream)
+"""
+import csv
+import io
+import json
+import struct
+import sys
+from array import array
+
+import database
+
+# Rows fetched from the cursor and encoded per chunk
+BATCH_SIZE = 5000
+
+BINARY_MAGIC = b"SNSX"
+BINARY_VERSION = 1
+
+# Export name -> (table, {output column: table column})
+SOURCES = {
+    sensor: (table, {"value": column}) for sensor, (table, column) in database.HISTORY_SOURCES.items()
+}
+SOURCES["dht"] = ("dht_readings", database.DHT_COLUMNS)
+
+# Format -> (mimetype, file extension)
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "bin": ("application/octet-stream", "bin"),
+}
+
+
+def _csv_chunks(table, columns, start, end, time_format):
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(["ts", *columns])
+    for rows in database.iter_history(table, columns, start, end, time_format, BATCH_SIZE):
+        writer.writerows(rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    yield buf.getvalue()
+
+
+def _ndjson_chunks(table, columns, start, end, time_format):
+    for rows in database.iter_history(table, columns, start, end, time_format, BATCH_SIZE, as_json=True):
+        yield "\n".join([r[0] for r in rows]) + "\n"
+
+
+def _packed(typecode, values):
+    arr = array(typecode, values)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _binary_chunks(sensor, table, columns, start, end):
+    header = json.dumps({"sensor": sensor, "columns": list(columns)}).encode()
+    yield BINARY_MAGIC + struct.pack("<BI", BINARY_VERSION, len(header)) + header
+    for rows in database.iter_history(table, columns, start, end, "epoch_ms", BATCH_SIZE):
+        cols = list(zip(*rows))
+        parts = [struct.pack("<I", len(rows)), _packed("q", cols[0])]
+        parts += [_packed("f", col) for col in cols[1:]]
+        yield b"".join(parts)
+    yield struct.pack("<I", 0)
+
+
+def stream(sensor, fmt, start=None, end=None, time_format="iso"):
+    """
+    Return a generator of encoded chunks exporting `sensor` (a SOURCES key)
+    between start and end in `fmt` (a FORMATS key). time_format applies to
+    csv and ndjson; the binary format always carries epoch milliseconds.
+    """
+    table, columns = SOURCES[sensor]
+    if fmt == "csv":
+        return _csv_chunks(table, columns, start, end, time_format)
+    if fmt == "ndjson":
+        return _ndjson_chunks(table, columns, start, end, time_format)
+    if fmt == "bin":
+        return _binary_chunks(sensor, table, columns, start, end)
+    raise ValueError(f"format must be one of {list(FORMATS)}")
+
+
+def read_binary(data):
+    """Decode a bin export back into (header dict, {"ts": [...], <column>: [...]}) for scripts consuming bin exports."""
+    if data[:4] != BINARY_MAGIC:
+        raise ValueError("not a sensor export")
+    version, length = struct.unpack_from("<BI", data, 4)
+    if version != BINARY_VERSION:
+        raise ValueError(f"unsupported export version {version}")
+    pos = 9
+    header = json.loads(data[pos:pos + length])
+    pos += length
+    out = {"ts": array("q"), **{name: array("f") for name in header["columns"]}}
+    while True:
+        (n,) = struct.unpack_from("<I", data, pos)
+        pos += 4
+        if n == 0:
+            break
+        for name, typecode, size in [("ts", "q", 8)] + [(c, "f", 4) for c in header["columns"]]:
+            arr = array(typecode)
+            arr.frombytes(data[pos:pos + n * size])
+            if sys.byteorder != "little":
+                arr.byteswap()
+            out[name].extend(arr)
+            pos += n * size
+    return header, {name: list(arr) for name, arr in out.items()}
@@ -0,0 +1,308 @@
+"""
+Hardware abstraction layer for the sensor modules.
+
+Sensor code talks to a backend object instead of importing RPi.GPIO, dht11 and
+smbus2 directly, so the app can be imported, profiled and load-tested off the
+Pi. The backend is chosen with the SENSOR_BACKEND environment variable:
+
+    SENSOR_BACKEND=pi   real hardware (default)
+    SENSOR_BACKEND=sim  deterministic simulated sensors
+
+Simulator latencies and failure rates come from SIM_DEFAULTS and can be
+overridden with SENSOR_SIM_<NAME> environment variables (e.g.
+SENSOR_SIM_DHT_FAILURE_RATE=0.5) or by passing keyword arguments to SimBackend.
+"""
+import os
+import random
+import threading
+import time
+
+HIGH = 1
+LOW = 0
+
+SIM_DEFAULTS = {
+    "seed": 1234,
+    "gpio_latency": 0.00001,     # seconds per GPIO call
+    "dht_latency": 0.025,        # a real DHT11 read bit-bangs for ~20-25 ms
+    "dht_failure_rate": 0.3,     # fraction of DHT reads with a bad checksum
+    "i2c_latency": 0.0002,       # seconds per SMBus transaction
+    "i2c_failure_rate": 0.0,     # fraction of SMBus transactions raising EIO
+    "rain_probability": 0.2,     # chance the rain pin reads "wet" at any sample
+    "sound_probability": 0.1,    # chance the sound DO pin reads "loud"
+    "adc_baseline": 128,         # idle ADC level of the microphone
+    "adc_noise": 6,              # +/- idle noise around the baseline
+    "adc_burst_probability": 0.0005,  # chance any ADC sample is part of a loud event
+    "edge_tick": 0.01,           # seconds between simulated level checks on watched pins
+    "edge_redraw_probability": 0.02,  # chance per tick that a watched pin re-draws its level
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+class DHTResult:
+    """Result of one DHT read, mirroring dht11.DHT11Result."""
+
+    def __init__(self, valid, temperature=None, humidity=None):
+        self.valid = valid
+        self.temperature = temperature
+        self.humidity = humidity
+
+    def is_valid(self):
+        return self.valid
+
+
+class PiBackend:
+    """Real hardware: RPi.GPIO, the dht11 driver and smbus2."""
+
+    name = "pi"
+
+    def __init__(self):
+        import RPi.GPIO as GPIO
+        import dht11
+        from smbus2 import SMBus
+        self._GPIO = GPIO
+        self._dht11 = dht11
+        self._SMBus = SMBus
+        self._dht = {}
+        GPIO.setwarnings(False)
+        if GPIO.getmode() is None:
+            GPIO.setmode(GPIO.BCM)
+
+    def setup_input(self, pin, pull_up=False, label=None):
+        GPIO = self._GPIO
+        if pull_up:
+            try:
+                GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+                return
+            except TypeError:
+                # Some RPi.GPIO versions/platforms use a different signature; fallback:
+                pass
+        GPIO.setup(pin, GPIO.IN)
+
+    def setup_output(self, pin, initial=LOW):
+        self._GPIO.setup(pin, self._GPIO.OUT)
+        self._GPIO.output(pin, initial)
+
+    def input(self, pin):
+        return self._GPIO.input(pin)
+
+    def output(self, pin, value):
+        self._GPIO.output(pin, value)
+
+    def add_event_detect(self, pin, callback, bouncetime=None):
+        """Call callback(pin, level) on every rising or falling edge."""
+        GPIO = self._GPIO
+        kwargs = {"bouncetime": bouncetime} if bouncetime else {}
+        GPIO.add_event_detect(pin, GPIO.BOTH, callback=lambda channel: callback(channel, GPIO.input(channel)), **kwargs)
+
+    def remove_event_detect(self, pin):
+        self._GPIO.remove_event_detect(pin)
+
+    def read_dht(self, pin):
+        if pin not in self._dht:
+            self._dht[pin] = self._dht11.DHT11(pin=pin)
+        result = self._dht[pin].read()
+        return DHTResult(result.is_valid(), result.temperature, result.humidity)
+
+    def open_smbus(self, bus):
+        return self._SMBus(bus)
+
+    def cleanup(self):
+        self._GPIO.cleanup()
+
+
+class SimBus:
+    """Simulated SMBus exposing a PCF8591 whose analog inputs carry microphone noise."""
+
+    def __init__(self, backend, bus):
+        self._backend = backend
+        self.bus = bus
+        self._control = 0x40
+        self._channel = 0
+        self._last = 0x80  # conversion held in the data register
+        self.closed = False
+
+    def _transaction(self):
+        if self.closed:
+            raise OSError(9, "Bad file descriptor")
+        b = self._backend
+        b._sleep(b.config["i2c_latency"])
+        if b._chance("i2c", b.config["i2c_failure_rate"]):
+            raise OSError(5, "Input/output error")
+
+    def _convert(self):
+        # Like the real chip, each byte read returns the previous conversion
+        # and starts the next one; with the auto-increment flag (0x04) set the
+        # channel advances after every conversion.
+        value = self._last
+        self._last = self._backend._adc_sample(self._channel)
+        if self._control & 0x04:
+            self._channel = (self._channel + 1) & 0x03
+        return value
+
+    def write_byte(self, addr, value):
+        self._transaction()
+        self._control = value
+        self._channel = value & 0x03
+
+    def read_byte(self, addr):
+        self._transaction()
+        return self._convert()
+
+    def read_i2c_block_data(self, addr, register, length):
+        # The PCF8591 treats the command byte as its control byte.
+        self._transaction()
+        self._control = register
+        self._channel = register & 0x03
+        return [self._convert() for _ in range(length)]
+
+    def close(self):
+        self.closed = True
+
+
+class SimBackend:
+    """
+    Deterministic simulated hardware.
+
+    Every signal source has its own seeded random stream, so the sequence of
+    values each sensor sees does not depend on how threads interleave.
+    """
+
+    name = "sim"
+
+    def __init__(self, **overrides):
+        config = dict(SIM_DEFAULTS)
+        for key, default in SIM_DEFAULTS.items():
+            env = os.environ.get(f"SENSOR_SIM_{key.upper()}")
+            if env is not None:
+                config[key] = type(default)(env)
+        config.update(overrides)
+        self.config = config
+        self._rngs = {}
+        self._lock = threading.Lock()
+        self._pins = {}
+        self._outputs = {}
+        self._levels = {}
+        self._watchers = {}
+
+    def _rng(self, stream):
+        with self._lock:
+            rng = self._rngs.get(stream)
+            if rng is None:
+                # str hashes are randomized per process, so derive the seed by hand
+                offset = sum(ord(c) for c in stream)
+                rng = self._rngs[stream] = random.Random(self.config["seed"] * 1000 + offset)
+            return rng
+
+    def _chance(self, stream, probability):
+        return probability > 0 and self._rng(stream).random() < probability
+
+    def _sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def _adc_sample(self, channel):
+        rng = self._rng(f"adc{channel}")
+        level = self.config["adc_baseline"] + rng.randint(-self.config["adc_noise"], self.config["adc_noise"])
+        if rng.random() < self.config["adc_burst_probability"]:
+            level += rng.randint(20, 120)
+        return max(0, min(255, level))
+
+    def setup_input(self, pin, pull_up=False, label=None):
+        self._sleep(self.config["gpio_latency"])
+        self._pins[pin] = label
+
+    def setup_output(self, pin, initial=LOW):
+        self._sleep(self.config["gpio_latency"])
+        self._pins[pin] = "out"
+        self._outputs[pin] = initial
+
+    def input(self, pin):
+        self._sleep(self.config["gpio_latency"])
+        if pin in self._outputs:
+            return self._outputs[pin]
+        if pin in self._levels:
+            return self._levels[pin]
+        # Sensor inputs are active-low: LOW means rain / sound detected.
+        # The label given to setup_input() selects the "<label>_probability" knob.
+        probability = self.config.get(f"{self._pins.get(pin)}_probability", 0.0)
+        return LOW if self._chance(f"gpio{pin}", probability) else HIGH
+
+    def output(self, pin, value):
+        self._sleep(self.config["gpio_latency"])
+        self._outputs[pin] = value
+
+    def add_event_detect(self, pin, callback, bouncetime=None):
+        """Drive the pin from a background thread and report each level change."""
+        if pin in self._watchers:
+            raise RuntimeError(f"Conflicting edge detection already enabled for pin {pin}")
+        stop = threading.Event()
+        probability = self.config.get(f"{self._pins.get(pin)}_probability", 0.0)
+        self._levels[pin] = HIGH
+
+        def drive():
+            while not stop.wait(self.config["edge_tick"]):
+                if not self._chance(f"edges{pin}", self.config["edge_redraw_probability"]):
+                    continue
+                level = LOW if self._chance(f"gpio{pin}", probability) else HIGH
+                if level != self._levels.get(pin):
+                    self._levels[pin] = level
+                    callback(pin, level)
+
+        self._watchers[pin] = stop
+        threading.Thread(target=drive, name=f"sim-edges-{pin}", daemon=True).start()
+
+    def remove_event_detect(self, pin):
+        stop = self._watchers.pop(pin, None)
+        if stop is not None:
+            stop.set()
+        self._levels.pop(pin, None)
+
+    def read_dht(self, pin):
+        self._sleep(self.config["dht_latency"])
+        rng = self._rng(f"dht{pin}")
+        if rng.random() < self.config["dht_failure_rate"]:
+            return DHTResult(False)
+        return DHTResult(True, rng.randint(24, 30), rng.randint(55, 75))
+
+    def open_smbus(self, bus):
+        return SimBus(self, bus)
+
+    def cleanup(self):
+        for pin in list(self._watchers):
+            self.remove_event_detect(pin)
+        self._pins.clear()
+        self._outputs.clear()
+
+
+def get_backend():
+    """Return the process-wide backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = os.environ.get("SENSOR_BACKEND", "pi").lower()
+                if name == "sim":
+                    _backend = SimBackend()
+                elif name == "pi":
+                    _backend = PiBackend()
+                else:
+                    raise ValueError(f"Unknown SENSOR_BACKEND {name!r} (expected 'pi' or 'sim')")
+    return _backend
+
+
+def cleanup_if_started():
+    """Release the backend's resources if one was created; never creates (or imports) one."""
+    with _backend_lock:
+        backend = _backend
+    if backend is not None:
+        backend.cleanup()
+
+
+def use_backend(backend):
+    """Install a specific backend instance (e.g. a tuned SimBackend for benchmarks)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+    return backend
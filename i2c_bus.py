@@ -0,0 +1,247 @@
+"""
+Single-owner I2C bus scheduler.
+
+One BusManager thread per bus number owns the SMBus handle; no other code
+touches it. Consumers hand it work in two ways:
+
+    request(addr, key, fn)    run fn(bus) once and wait for the result.
+                              Requests with the same key that are still queued
+                              share one transaction (coalescing).
+    stream(addr, fn, interval, on_data)
+                              run fn(bus) every `interval` seconds on the
+                              manager thread and pass the result to
+                              on_data(result), e.g. continuous ADC acquisition.
+
+Transactions are serialized, so consumers never interleave a control write and
+its reads. On an error the handle is closed and reopened before the next
+transaction; requests are retried up to RETRIES times, streams simply run
+again on their next tick. Per-device counts of transactions, errors, retries
+and coalesced requests are kept for stats() and /api/metrics.
+"""
+import queue
+import threading
+import time
+
+import hal
+import metrics
+
+# Retries of a failed request (after reopening the bus)
+RETRIES = 1
+# Pause before reopening the bus after an error
+REOPEN_DELAY = 0.005
+# Seconds a request waits for its transaction by default
+REQUEST_TIMEOUT = 2.0
+
+_seconds = metrics.histogram("i2c_transaction_seconds", "I2C transaction latency.", ("device",))
+_errors = metrics.counter("i2c_errors_total", "Failed I2C transactions.", ("device",))
+_reopens = metrics.counter("i2c_bus_reopens_total", "Times an I2C bus handle was reopened after an error.")
+
+
+class _Request:
+    __slots__ = ("addr", "key", "fn", "done", "result", "error")
+
+    def __init__(self, addr, key, fn):
+        self.addr = addr
+        self.key = key
+        self.fn = fn
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Stream:
+    __slots__ = ("addr", "fn", "interval", "on_data", "next_run", "failing")
+
+    def __init__(self, addr, fn, interval, on_data):
+        self.addr = addr
+        self.fn = fn
+        self.interval = interval
+        self.on_data = on_data
+        self.next_run = time.monotonic()
+        self.failing = False
+
+
+class BusManager:
+    def __init__(self, bus_number):
+        self.bus_number = bus_number
+        self._bus = None
+        self._queue = queue.Queue()
+        self._pending = {}  # key -> queued _Request, for coalescing
+        self._lock = threading.Lock()
+        self._streams = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._devices = {}
+        self._reopens = 0
+
+    def _device(self, addr):
+        stats = self._devices.get(addr)
+        if stats is None:
+            stats = self._devices.setdefault(addr, {
+                "transactions": 0, "errors": 0, "retries": 0, "coalesced": 0,
+                "last_error": None, "last_error_at": None,
+            })
+        return stats
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._loop, name=f"i2c-{self.bus_number}", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def request(self, addr, key, fn, timeout=REQUEST_TIMEOUT):
+        """Run fn(bus) on the manager thread and return its result (or raise its error)."""
+        self.start()
+        with self._lock:
+            req = self._pending.get(key) if key is not None else None
+            if req is not None:
+                self._device(addr)["coalesced"] += 1
+            else:
+                req = _Request(addr, key, fn)
+                if key is not None:
+                    self._pending[key] = req
+                self._queue.put(req)
+        if not req.done.wait(timeout):
+            raise TimeoutError(f"I2C bus {self.bus_number} did not run the transaction in time")
+        if req.error is not None:
+            raise req.error
+        return req.result
+
+    def stream(self, name, addr, fn, interval, on_data):
+        """Register (or replace) a periodic transaction; on_data(result) runs on the manager thread."""
+        self._streams[name] = _Stream(addr, fn, interval, on_data)
+        self.start()
+        self._queue.put(None)  # wake the loop so the new schedule applies
+
+    def unstream(self, name):
+        self._streams.pop(name, None)
+
+    def _close_bus(self):
+        if self._bus is not None:
+            try:
+                self._bus.close()
+            except Exception:
+                pass
+            self._bus = None
+
+    def _transact(self, addr, fn):
+        device = self._device(addr)
+        label = f"0x{addr:02x}"
+        if self._bus is None:
+            self._bus = hal.get_backend().open_smbus(self.bus_number)
+        device["transactions"] += 1
+        try:
+            with _seconds.time(label):
+                return fn(self._bus)
+        except Exception as e:
+            device["errors"] += 1
+            device["last_error"] = repr(e)
+            device["last_error_at"] = time.time()
+            _errors.inc(label)
+            # a wedged handle is the usual cause of EIO here: start from a fresh one
+            self._close_bus()
+            self._reopens += 1
+            _reopens.inc()
+            raise
+
+    def _run_request(self, req):
+        with self._lock:
+            if self._pending.get(req.key) is req:
+                del self._pending[req.key]
+        for attempt in range(RETRIES + 1):
+            try:
+                req.result = self._transact(req.addr, req.fn)
+                req.error = None
+                break
+            except Exception as e:
+                req.error = e
+                if attempt < RETRIES:
+                    self._device(req.addr)["retries"] += 1
+                    self._stop_event.wait(REOPEN_DELAY)
+        req.done.set()
+
+    def _run_stream(self, name, s):
+        try:
+            data = self._transact(s.addr, s.fn)
+        except Exception as e:
+            # log once per failure streak, then keep trying on the next ticks
+            if not s.failing:
+                print(f"I2C stream {name} error: {e!r}")
+                s.failing = True
+            return
+        s.failing = False
+        try:
+            s.on_data(data)
+        except Exception as e:
+            print(f"Warning: I2C stream {name} consumer failed: {e}")
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            wait = None
+            for name, s in list(self._streams.items()):
+                if now >= s.next_run:
+                    self._run_stream(name, s)
+                    # after a failure back off a little instead of hammering the bus
+                    s.next_run = now + (max(s.interval, 0.05) if s.failing else s.interval)
+                delay = s.next_run - time.monotonic()
+                wait = delay if wait is None else min(wait, delay)
+            try:
+                req = self._queue.get(timeout=None if wait is None else max(0.0, wait))
+            except queue.Empty:
+                continue
+            if req is not None:
+                self._run_request(req)
+        self._close_bus()
+        # fail whatever is still queued instead of leaving callers waiting
+        while True:
+            try:
+                req = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if req is not None:
+                req.error = RuntimeError(f"I2C bus {self.bus_number} manager stopped")
+                req.done.set()
+
+    def stats(self):
+        return {
+            "bus": self.bus_number,
+            "open": self._bus is not None,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "reopens": self._reopens,
+            "streams": sorted(self._streams),
+            "queued": self._queue.qsize(),
+            "devices": {f"0x{addr:02x}": dict(d) for addr, d in sorted(self._devices.items())},
+        }
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_manager(bus_number):
+    """Return the process-wide manager of `bus_number`, creating it on first use."""
+    with _managers_lock:
+        manager = _managers.get(bus_number)
+        if manager is None:
+            manager = _managers[bus_number] = BusManager(bus_number)
+        return manager
+
+
+def stats():
+    """stats() of every bus manager."""
+    return [manager.stats() for _, manager in sorted(_managers.items())]
+
+
+def stop_all():
+    for manager in list(_managers.values()):
+        manager.stop()
@@ -0,0 +1,200 @@
+"""
+In-process runtime metrics, rendered in the Prometheus text format at /api/metrics.
+
+    counter("name", "help", ("label",))     monotonically increasing totals
+    histogram("name", "help", ("label",))   latency distribution in fixed buckets
+    gauge("name", "help", fn)               value computed by fn() at scrape time
+
+Every histogram series is a fixed array of bucket counts plus a sum, so memory
+use does not grow with traffic; labels are only ever filled with values chosen
+by the code (endpoint names, sensor names), never with request data.
+
+Updates take no lock. Under the GIL a concurrent += can very rarely lose one
+increment, which is an acceptable error for monitoring and keeps an observation
+to a perf_counter() pair, a bisect and two additions.
+
+SENSORS_METRICS selects the mode:
+
+    full    counters and bucketed histograms (default)
+    basic   counters; histograms keep only their count and sum
+    off     every update is a no-op and /api/metrics is empty
+
+In serve.py worker mode each process keeps its own metrics: sensor and database
+writer metrics live in the owner process, request metrics in whichever worker
+answered the scrape.
+"""
+import os
+import time
+from bisect import bisect_left
+
+MODE = os.environ.get("SENSORS_METRICS", "full").lower()
+ENABLED = MODE != "off"
+BUCKETED = MODE == "full"
+
+# Latency bucket upper bounds in seconds (the +Inf bucket is implicit)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_registry = []
+
+
+def _label_text(names, values, extra=None):
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._cells = {}
+
+    def inc(self, *values, amount=1):
+        if not ENABLED:
+            return
+        cell = self._cells.get(values)
+        if cell is None:
+            cell = self._cells.setdefault(values, [0])
+        cell[0] += amount
+
+    def value(self, *values):
+        cell = self._cells.get(values)
+        return cell[0] if cell else 0
+
+    def samples(self):
+        for values, cell in sorted(dict(self._cells).items()):
+            yield f"{self.name}{_label_text(self.labels, values)} {cell[0]}"
+
+
+class _Timer:
+    __slots__ = ("_hist", "_values", "_started")
+
+    def __init__(self, hist, values):
+        self._hist = hist
+        self._values = values
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._hist.observe(time.perf_counter() - self._started, *self._values)
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._cells = {}
+
+    def _cell(self, values):
+        cell = self._cells.get(values)
+        if cell is None:
+            # [per-bucket counts (last one is +Inf), count, sum]
+            cell = self._cells.setdefault(values, [[0] * (len(self.buckets) + 1), 0, 0.0])
+        return cell
+
+    def observe(self, value, *values):
+        if not ENABLED:
+            return
+        cell = self._cell(values)
+        if BUCKETED:
+            cell[0][bisect_left(self.buckets, value)] += 1
+        cell[1] += 1
+        cell[2] += value
+
+    def time(self, *values):
+        """Context manager observing the duration of its block."""
+        return _Timer(self, values) if ENABLED else _NULL_TIMER
+
+    def count(self, *values):
+        cell = self._cells.get(values)
+        return cell[1] if cell else 0
+
+    def samples(self):
+        for values, (counts, count, total) in sorted(dict(self._cells).items()):
+            if BUCKETED:
+                cumulative = 0
+                for bound, n in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += n
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                    yield f"{self.name}_bucket{_label_text(self.labels, values, le)} {cumulative}"
+            labels = _label_text(self.labels, values)
+            yield f"{self.name}_count{labels} {count}"
+            yield f"{self.name}_sum{labels} {total:.6f}"
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, help, fn):
+        self.name = name
+        self.help = help
+        self._fn = fn
+
+    def samples(self):
+        try:
+            value = self._fn()
+        except Exception:
+            return
+        if value is not None:
+            yield f"{self.name} {value}"
+
+
+def counter(name, help, labels=()):
+    metric = Counter(name, help, labels)
+    _registry.append(metric)
+    return metric
+
+
+def histogram(name, help, labels=(), buckets=LATENCY_BUCKETS):
+    metric = Histogram(name, help, labels, buckets)
+    _registry.append(metric)
+    return metric
+
+
+def gauge(name, help, fn):
+    metric = Gauge(name, help, fn)
+    _registry.append(metric)
+    return metric
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format (version 0.0.4)."""
+    if not ENABLED:
+        return ""
+    lines = []
+    for metric in _registry:
+        samples = list(metric.samples())
+        if not samples:
+            continue
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+_started = time.time()
+gauge("process_start_time_seconds", "Start time of the process since the unix epoch in seconds.",
+      lambda: round(_started, 3))
@@ -1,20 +1,43 @@
-import RPi.GPIO as GPIO
-import time
+import hal
 import time
+from edges import EdgeMonitor
 
 # GPIO pin configuration
 RAIN_PIN = 13  # Change this to your actual rain sensor digital pin
 
-# GPIO setup
-GPIO.setmode(GPIO.BCM)
-GPIO.setup(RAIN_PIN, GPIO.IN)
 from database import insert_raindrop
 
+_pin_ready = False
+
+def setup_raindrop():
+    """Configure the rain pin on first use, so importing this module never touches GPIO."""
+    global _pin_ready
+    if not _pin_ready:
+        hal.get_backend().setup_input(RAIN_PIN, label="rain")
+        _pin_ready = True
+
+# Edge tracking on the rain pin (LOW = rain), used once start_edge_detection() succeeds
+_edges = EdgeMonitor(RAIN_PIN, active_low=True)
+
+def start_edge_detection():
+    """Track rain pin transitions via GPIO edge callbacks instead of sampling the level."""
+    setup_raindrop()
+    return _edges.start()
+
+def stop_edge_detection():
+    _edges.stop()
+
 def read_raindrop():
-    value = None
     try:
-        # Read digital pin (LOW = rain detected, HIGH = no rain)
-        rain_detected = GPIO.input(RAIN_PIN) == GPIO.LOW
+        if _edges.running:
+            # wet at any point in the event window, not only at this instant
+            edges = _edges.stats()
+            rain_detected = edges["duty_cycle"] > 0 or edges["active"]
+        else:
+            edges = None
+            setup_raindrop()
+            # Read digital pin (LOW = rain detected, HIGH = no rain)
+            rain_detected = hal.get_backend().input(RAIN_PIN) == hal.LOW
 
         # numeric value for history: 1.0 = rain, 0.0 = no rain
         numeric = 1.0 if rain_detected else 0.0
@@ -24,21 +47,26 @@ def read_raindrop():
             # don't break sensor reading loop for DB errors
             print(f"Warning: failed to insert raindrop into DB: {e}")
 
-        return {
+        result = {
             "rain_detected": rain_detected,
             "value": numeric,
             "status": "🌧️ Rain detected" if rain_detected else "☀️ Sunny"
         }
+        if edges is not None:
+            result["edges"] = edges
+        return result
     except Exception as e:
-        print(f"Error reading raindrop sensor: {e}")
+        # the sampler logs it (rate-limited) and marks the sensor degraded
         return {
             "rain_detected": None,
-            "status": f"Error: {str(e)}"
+            "status": f"Error: {str(e)}",
+            "error": str(e)
         }
 
 def cleanup():
     """Clean up GPIO resources"""
-    GPIO.cleanup()
+    stop_edge_detection()
+    hal.get_backend().cleanup()
 
 if __name__ == "__main__":
     print("Testing Raindrop Sensor (Press Ctrl+C to exit)")
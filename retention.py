@@ -0,0 +1,168 @@
+"""
+Retention and compaction for sensors.db.
+
+POLICIES sets how long each table keeps its rows. A background thread prunes
+expired rows every PRUNE_INTERVAL seconds in batches of at most BATCH_ROWS.
+Each batch is a short transaction run on the database writer thread (see
+database.run_on_writer), so queued sensor inserts wait behind at most one
+small delete. After pruning, up to VACUUM_PAGES free pages are handed back to
+the filesystem with PRAGMA incremental_vacuum and the WAL gets a passive
+checkpoint, which never waits for readers.
+
+Retention can be changed per table with SENSORS_RETAIN_<TABLE>_DAYS
+(e.g. SENSORS_RETAIN_SOUND_READINGS_DAYS=30, or "forever").
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import database
+import rollups
+
+DAY = 86400
+
+# Table -> seconds of history kept (None keeps everything)
+POLICIES = {
+    "raindrops": 7 * DAY,
+    "sound_readings": 7 * DAY,
+    "dht_readings": 7 * DAY,
+    "alert_events": 90 * DAY,
+    "rollup_1m": 90 * DAY,
+    "rollup_1h": None,
+    "rollup_1d": None,
+}
+for _table in POLICIES:
+    _env = os.environ.get(f"SENSORS_RETAIN_{_table.upper()}_DAYS")
+    if _env is not None:
+        POLICIES[_table] = None if _env.lower() == "forever" else float(_env) * DAY
+
+PRUNE_INTERVAL = 3600.0
+# Delay before the first pass, so start-up is not slowed down
+START_DELAY = 30.0
+# Rows deleted per writer transaction, and the pause between two of them
+BATCH_ROWS = 500
+BATCH_PAUSE = 0.05
+# Free pages released per incremental_vacuum
+VACUUM_PAGES = 512
+
+_stop_event = threading.Event()
+_thread = None
+_status = {"last_run": None, "duration_s": None, "deleted": {}, "free_pages_before": None, "checkpoint": None}
+
+
+def _delete_batch(table, cutoff):
+    """Delete up to BATCH_ROWS expired rows of `table` on the writer thread; returns the count."""
+    if table.startswith("rollup_"):
+        bucket = int(rollups.to_epoch(cutoff))
+
+        def job(conn):
+            deleted = 0
+            for sensor in rollups.ROLLUP_SENSORS:
+                deleted += conn.execute(
+                    f"DELETE FROM {table} WHERE sensor = ? AND bucket IN ("
+                    f"SELECT bucket FROM {table} WHERE sensor = ? AND bucket < ? ORDER BY bucket LIMIT ?)",
+                    (sensor, sensor, bucket, BATCH_ROWS),
+                ).rowcount
+            return deleted
+    else:
+        # a run-length row is only expired once its run has ended before the cutoff
+        ended = " AND COALESCE(end_ts, ts) < :cutoff" if table in database.RUN_LENGTH_TABLES else ""
+
+        def job(conn):
+            return conn.execute(
+                f"DELETE FROM {table} WHERE id IN ("
+                f"SELECT id FROM {table} WHERE ts < :cutoff{ended} ORDER BY ts LIMIT :limit)",
+                {"cutoff": cutoff, "limit": BATCH_ROWS},
+            ).rowcount
+    return database.run_on_writer(job, tables=(table,))
+
+
+def prune(now=None):
+    """Delete every row older than its table's policy. Returns {table: rows deleted}."""
+    now = now or datetime.utcnow()
+    deleted = {}
+    for table, keep in POLICIES.items():
+        if keep is None:
+            continue
+        cutoff = now - timedelta(seconds=keep)
+        total = 0
+        while not _stop_event.is_set():
+            n = _delete_batch(table, cutoff)
+            total += n
+            if n < BATCH_ROWS:
+                break
+            time.sleep(BATCH_PAUSE)
+        deleted[table] = total
+    return deleted
+
+
+def _vacuum_step(conn):
+    # incremental_vacuum frees one page per VM step and conn.execute() only steps
+    # once, so run it through executescript(), which runs statements to completion
+    conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES});")
+    return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def compact():
+    """
+    Release free pages VACUUM_PAGES at a time, then checkpoint the WAL.
+    Returns (busy, wal frames, checkpointed frames) from the checkpoint.
+    """
+    while not _stop_event.is_set() and database.run_on_writer(_vacuum_step):
+        time.sleep(BATCH_PAUSE)
+    return tuple(database.run_on_writer(lambda conn: conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()))
+
+
+def run_once(now=None):
+    """One prune + compact pass; updates and returns status()."""
+    started = time.monotonic()
+    free_before = database.get_db_stats()["free_pages"]
+    deleted = prune(now)
+    checkpoint = compact()
+    _status.update(
+        last_run=datetime.utcnow().isoformat() + "Z",
+        duration_s=round(time.monotonic() - started, 3),
+        deleted=deleted,
+        free_pages_before=free_before,
+        checkpoint=checkpoint,
+    )
+    return status()
+
+
+def status():
+    """Retention policies (in days) and the outcome of the last pass."""
+    return {
+        "policies_days": {table: None if keep is None else keep / DAY for table, keep in POLICIES.items()},
+        **_status,
+    }
+
+
+def _loop():
+    if _stop_event.wait(START_DELAY):
+        return
+    while True:
+        try:
+            run_once()
+        except Exception as e:
+            print(f"Warning: retention pass failed: {e}")
+        if _stop_event.wait(PRUNE_INTERVAL):
+            return
+
+
+def start():
+    """Start the background retention thread (in the process that owns the database writer)."""
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return
+    _stop_event.clear()
+    _thread = threading.Thread(target=_loop, name="db-retention", daemon=True)
+    _thread.start()
+
+
+def stop(timeout=5.0):
+    global _thread
+    _stop_event.set()
+    if _thread is not None:
+        _thread.join(timeout)
+        _thread = None
@@ -0,0 +1,119 @@
+"""
+Incremental min/max/mean/count rollups for long-range history charts.
+
+Every reading written through database.py is also folded into per-bucket
+aggregates at 1 minute, 1 hour and 1 day resolution. The functions here take
+an open connection and are driven by the database writer thread, so rollups
+commit in the same transaction as the raw rows.
+"""
+import calendar
+from datetime import datetime
+
+# (name, bucket width in seconds), finest first
+RESOLUTIONS = [
+    ("1m", 60),
+    ("1h", 3600),
+    ("1d", 86400),
+]
+
+# Sensors that get rollups (rain is a 0/1 signal, so its mean is the rain fraction)
+ROLLUP_SENSORS = ("sound", "rain", "temperature", "humidity")
+
+# Raw readings arrive about once a second, so a raw series over `window`
+# seconds holds roughly `window / RAW_SPACING` points.
+RAW_SPACING = 1.0
+
+SCHEMA = "".join(f"""
+    CREATE TABLE IF NOT EXISTS rollup_{name} (
+        sensor TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        sum REAL NOT NULL,
+        min REAL NOT NULL,
+        max REAL NOT NULL,
+        PRIMARY KEY (sensor, bucket)
+    ) WITHOUT ROWID;
+""" for name, _ in RESOLUTIONS)
+
+
+def to_epoch(ts):
+    """Naive UTC datetime -> epoch seconds."""
+    return calendar.timegm(ts.utctimetuple()) + ts.microsecond / 1e6
+
+
+def aggregate(samples, width):
+    """Fold (sensor, value, ts) samples into {(sensor, bucket): [count, sum, min, max]}."""
+    buckets = {}
+    for sensor, value, ts in samples:
+        bucket = int(to_epoch(ts) // width) * width
+        agg = buckets.get((sensor, bucket))
+        if agg is None:
+            buckets[(sensor, bucket)] = [1, value, value, value]
+        else:
+            agg[0] += 1
+            agg[1] += value
+            if value < agg[2]:
+                agg[2] = value
+            if value > agg[3]:
+                agg[3] = value
+    return buckets
+
+
+def apply(conn, samples):
+    """Merge a batch of (sensor, value, ts) samples into every rollup table."""
+    samples = [s for s in samples if s[0] in ROLLUP_SENSORS]
+    if not samples:
+        return
+    for name, width in RESOLUTIONS:
+        rows = [(sensor, bucket, c, total, lo, hi)
+                for (sensor, bucket), (c, total, lo, hi) in aggregate(samples, width).items()]
+        conn.executemany(f"""
+            INSERT INTO rollup_{name} (sensor, bucket, count, sum, min, max) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(sensor, bucket) DO UPDATE SET
+                count = count + excluded.count,
+                sum = sum + excluded.sum,
+                min = MIN(min, excluded.min),
+                max = MAX(max, excluded.max)
+        """, rows)
+
+
+def choose_resolution(window_seconds, points, has_raw=True):
+    """
+    Pick the series to serve for a window: the finest resolution whose number
+    of points over the window fits within `points`, falling back to 1d.
+    Returns "raw" or one of the RESOLUTIONS names.
+    """
+    if has_raw and window_seconds / RAW_SPACING <= points:
+        return "raw"
+    for name, width in RESOLUTIONS:
+        if window_seconds / width <= points:
+            return name
+    return RESOLUTIONS[-1][0]
+
+
+def query(conn, sensor, resolution, start, end, time_format="iso"):
+    """
+    Return rollup buckets for start <= bucket <= end (naive UTC datetimes), oldest->newest.
+    Bucket times are ISO8601 strings, or epoch milliseconds with time_format="epoch_ms".
+    """
+    width = dict(RESOLUTIONS)[resolution]
+    lo = int(to_epoch(start) // width) * width
+    hi = int(to_epoch(end))
+    rows = conn.execute(
+        f"SELECT bucket, count, sum, min, max FROM rollup_{resolution} "
+        "WHERE sensor = ? AND bucket BETWEEN ? AND ? ORDER BY bucket",
+        (sensor, lo, hi),
+    ).fetchall()
+    if time_format == "epoch_ms":
+        def fmt(bucket):
+            return bucket * 1000
+    else:
+        def fmt(bucket):
+            return datetime.utcfromtimestamp(bucket).isoformat() + "Z"
+    return [{
+        "ts": fmt(r[0]),
+        "value": r[2] / r[1],
+        "min": r[3],
+        "max": r[4],
+        "count": r[1],
+    } for r in rows]
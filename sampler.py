@@ -0,0 +1,280 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import dht
+import hal
+import i2c_bus
+from raindrop import read_raindrop
+import raindrop
+import soundsensor
+from soundsensor import read_sound
+import alerts
+import metrics
+import stats
+from database import insert_sound, insert_dht
+
+# Poll interval per sensor, in seconds. The DHT worker follows
+# dht.next_interval(), which never goes below the DHT11's 2 s minimum and
+# backs off while reads keep failing.
+RAIN_INTERVAL = 1.0
+SOUND_INTERVAL = 1.0
+
+# Consecutive failed job runs after which a worker reports "degraded"
+FAILURES_TO_DEGRADE = 3
+# While a job keeps failing its interval doubles per failure up to this many
+# seconds, and the failure is logged again at most once per FAILURE_LOG_INTERVAL
+MAX_FAILURE_BACKOFF = 30.0
+FAILURE_LOG_INTERVAL = 60.0
+
+# Immutable snapshot of the latest readings. Workers never mutate a published
+# snapshot, they build a new one with _replace() and swap the module reference,
+# so request handlers can read it without taking a lock.
+Snapshot = namedtuple("Snapshot", ["dht", "rain", "sound", "alert", "status", "updated_at", "version"])
+
+_snapshot = Snapshot(dht=None, rain=None, sound=None, alert=None, status=None, updated_at=None, version=0)
+_publish_lock = threading.Lock()
+# Signalled on every publish so push subscribers (/api/stream) can wake up.
+_updated = threading.Condition(_publish_lock)
+_stop_event = threading.Event()
+_threads = []
+_last_dht_sample = None
+
+_job_seconds = metrics.histogram("sampler_job_seconds", "Time per sampler job run (read, store, publish).", ("job",))
+_job_errors = metrics.counter("sampler_job_errors_total", "Sampler job runs that raised.", ("job",))
+
+
+def iso_timestamp(t):
+    """Format an epoch timestamp as ISO8601 UTC, matching the DB history format."""
+    return datetime.utcfromtimestamp(t).isoformat() + "Z"
+
+
+def get_snapshot():
+    """Return the latest published snapshot (never touches hardware)."""
+    return _snapshot
+
+
+def wait_for_update(version, timeout=None):
+    """
+    Block until a snapshot newer than `version` is published or `timeout`
+    seconds pass, then return the latest snapshot.
+    """
+    with _updated:
+        _updated.wait_for(lambda: _snapshot.version != version, timeout)
+        return _snapshot
+
+
+def snapshot_to_dict(snap, now=None):
+    """Build the /api/sensors response body for a snapshot."""
+    if now is None:
+        now = time.time()
+    return {
+        "success": True,
+        "dht": snap.dht,
+        "rain": snap.rain,
+        "sound": snap.sound,
+        "alert": snap.alert,
+        "sensor_status": snap.status,
+        "timestamp": None if snap.updated_at is None else iso_timestamp(snap.updated_at),
+        "age_ms": None if snap.updated_at is None else int((now - snap.updated_at) * 1000),
+    }
+
+
+def _publish(**changes):
+    """Swap in a new snapshot with the given fields replaced. Caller holds _publish_lock."""
+    global _snapshot
+    now = time.time()
+    _snapshot = _snapshot._replace(updated_at=now, version=_snapshot.version + 1, **changes)
+    _updated.notify_all()
+
+
+def _stamp(data):
+    """Return a copy of a reading dict with its sample time attached (unless it has its own)."""
+    return dict({"sampled_at": iso_timestamp(time.time())}, **data)
+
+
+def _evaluate_alert(**changed):
+    """Run the alert rules on the latest readings with `changed` applied. Caller holds _publish_lock."""
+    readings = {"dht": _snapshot.dht, "rain": _snapshot.rain, "sound": _snapshot.sound}
+    readings.update(changed)
+    return alerts.evaluate(readings)
+
+
+def _sample_dht():
+    global _last_dht_sample
+    # One attempt per tick; a failed read simply waits for the next interval
+    # instead of sleeping inside the worker.
+    data = dht.sample_dht()
+    # feed the temperature/humidity rollups with fresh (non-cached) readings only
+    if data.get("error") is None and data["sampled_at"] != _last_dht_sample:
+        _last_dht_sample = data["sampled_at"]
+        stats.observe("temperature", data["temperature"])
+        stats.observe("humidity", data["humidity"])
+        try:
+            insert_dht(data["temperature"], data["humidity"])
+        except Exception as e:
+            print(f"Warning: failed to record DHT reading: {e}")
+    with _publish_lock:
+        _publish(dht=data, alert=_evaluate_alert(dht=data))
+
+
+def _sample_rain():
+    data = _stamp(read_raindrop())
+    stats.observe("rain", data.get("value"))
+    with _publish_lock:
+        _publish(rain=data, alert=_evaluate_alert(rain=data))
+    if data.get("error"):
+        raise RuntimeError(data["error"])
+
+
+def _sample_sound():
+    data = _stamp(read_sound())
+    stats.observe("sound", data.get("percent"))
+    stats.observe("sound_raw", data.get("raw"))
+    # store sound intensity percent to DB for history if available
+    try:
+        if data.get("percent") is not None:
+            insert_sound(data.get("percent"))
+    except Exception as e:
+        print(f"Warning: failed to insert sound reading: {e}")
+    with _publish_lock:
+        _publish(sound=data, alert=_evaluate_alert(sound=data))
+    if data.get("error"):
+        raise RuntimeError(data["error"])
+
+
+def _init_dht():
+    # serve the last stored temperature/humidity until the first live read
+    dht.warm_start()
+    # without a usable backend every read would fail: say so instead of "ready"
+    try:
+        hal.get_backend()
+    except Exception as e:
+        return f"GPIO backend unavailable ({e}), serving stored readings"
+
+
+def _init_rain():
+    # count rain pin transitions from interrupts instead of sampling levels
+    if not raindrop.start_edge_detection():
+        return "edge detection unavailable, polling the pin"
+
+
+def _init_sound():
+    notes = []
+    if soundsensor.setup_sound_sensor():
+        # stream the microphone continuously so read_sound() returns window features instantly
+        soundsensor.start_acquisition()
+    else:
+        notes.append("PCF8591 unavailable, no analog readings")
+    if not soundsensor.start_edge_detection():
+        notes.append("edge detection unavailable, polling the pin")
+    return "; ".join(notes) or None
+
+
+# name -> (init, job, interval). Each sensor is initialized at the start of its
+# own worker thread, so sensors come up in parallel, start() returns at once,
+# and a sensor whose init fails only degrades itself.
+SENSORS = {
+    "dht": (_init_dht, _sample_dht, dht.next_interval),
+    "rain": (_init_rain, _sample_rain, RAIN_INTERVAL),
+    "sound": (_init_sound, _sample_sound, SOUND_INTERVAL),
+}
+
+# name -> {"state": "starting" | "ready" | "degraded" | "stopped", "detail", "init_ms"}
+_status = {name: {"state": "stopped", "detail": None, "init_ms": None} for name in SENSORS}
+
+
+def status():
+    """Initialization state of every sensor worker."""
+    return {name: dict(info) for name, info in _status.items()}
+
+
+def _set_status(name, **changes):
+    _status[name] = dict(_status[name], **changes)
+    with _publish_lock:
+        _publish(status=status())
+
+
+def _run(name, init, job, interval):
+    """Worker loop: initialize the sensor, then run `job` every `interval` seconds (a number or a callable) until stopped."""
+    started = time.monotonic()
+    try:
+        detail = init()
+    except Exception as e:
+        detail = f"init failed: {e}"
+    _status[name] = {
+        "state": "degraded" if detail else "ready",
+        "detail": detail,
+        "init_ms": round((time.monotonic() - started) * 1000, 1),
+    }
+    if detail:
+        print(f"Warning: {name} sensor degraded: {detail}")
+    with _publish_lock:
+        _publish(status=status())
+    init_status = dict(_status[name])
+    failures = 0
+    logged_at = None
+    suppressed = 0
+    while not _stop_event.is_set():
+        started = time.monotonic()
+        try:
+            with _job_seconds.time(name):
+                job()
+        except Exception as e:
+            _job_errors.inc(name)
+            failures += 1
+            if logged_at is None or started - logged_at >= FAILURE_LOG_INTERVAL:
+                more = f" ({suppressed} more failures since the last warning)" if suppressed else ""
+                print(f"Warning: {name} sampler failed: {e}{more}")
+                logged_at = started
+                suppressed = 0
+            else:
+                suppressed += 1
+            if failures == FAILURES_TO_DEGRADE:
+                note = f"{failures} consecutive job failures: {e}"
+                if init_status["detail"]:
+                    note = f"{init_status['detail']}; {note}"
+                _set_status(name, state="degraded", detail=note)
+        else:
+            if failures >= FAILURES_TO_DEGRADE:
+                print(f"{name} sampler recovered after {failures} failures")
+                _set_status(name, state=init_status["state"], detail=init_status["detail"])
+            failures = 0
+            logged_at = None
+            suppressed = 0
+        delay = interval() if callable(interval) else interval
+        if failures:
+            delay = max(delay, min(MAX_FAILURE_BACKOFF, delay * 2 ** (failures - 1)))
+        _stop_event.wait(max(0.0, delay - (time.monotonic() - started)))
+
+
+def start():
+    """Start one background worker per sensor. Returns immediately; safe to call more than once."""
+    if _threads:
+        return
+    _stop_event.clear()
+    try:
+        # evaluate() only writes the buzzer pin on transitions: start from a known LOW
+        alerts.start()
+    except Exception as e:
+        print(f"Warning: could not initialize the buzzer: {e}")
+    for name, (init, job, interval) in SENSORS.items():
+        _status[name] = {"state": "starting", "detail": None, "init_ms": None}
+        t = threading.Thread(target=_run, args=(name, init, job, interval), name=f"sampler-{name}", daemon=True)
+        t.start()
+        _threads.append(t)
+
+
+def stop(timeout=5.0):
+    """Stop the sampler workers and wait for them to exit."""
+    _stop_event.set()
+    for t in _threads:
+        t.join(timeout)
+    del _threads[:]
+    soundsensor.stop_acquisition()
+    soundsensor.stop_edge_detection()
+    raindrop.stop_edge_detection()
+    i2c_bus.stop_all()
+    for name in SENSORS:
+        _status[name] = {"state": "stopped", "detail": None, "init_ms": None}
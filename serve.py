@@ -0,0 +1,127 @@
+"""
+Production entry point: one process owns the hardware, HTTP workers serve the API.
+
+    python serve.py                          # 2 worker processes x 8 threads on :5000
+    python serve.py --workers 4 --threads 4
+    python serve.py --workers 0              # waitress threads inside the owner process
+
+The owner process initializes the database, runs the sampler and publishes
+every snapshot into shared memory (see shared_state.py). Worker processes
+import the Flask app, switch it to the shared snapshot and serve it with
+waitress. Each worker binds its own socket on the same port with SO_REUSEPORT,
+so the kernel spreads connections between them. Workers never touch GPIO or
+I2C; history endpoints read SQLite directly (WAL allows concurrent readers).
+
+Thread sizing: every open /api/stream (Server-Sent Events) client holds one
+waitress thread for as long as its dashboard tab stays open. --max-streams
+caps them per process (default: half of --threads) so the other threads keep
+serving the JSON endpoints; a client past the cap gets a 503 and the page falls
+back to polling /api/dashboard. With many dashboards open, raise --threads and
+--max-streams together, keeping a few threads per process for everything else.
+"""
+import argparse
+import multiprocessing
+import signal
+import socket
+import sys
+import time
+
+# Seconds between checks that every worker is still alive
+MONITOR_INTERVAL = 1.0
+
+
+def _listen(host, port, reuse_port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    return sock
+
+
+def _exit_on_signal(signum, frame):
+    # turn SIGTERM into SystemExit so atexit handlers (DB close) still run
+    raise SystemExit(0)
+
+
+def _worker(host, port, threads, max_streams, snapshot_path):
+    """Entry point of one HTTP worker process."""
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the owner stops us on Ctrl+C
+    from waitress import serve
+    import app as webapp
+    webapp.MAX_STREAMS = max_streams
+    webapp.use_shared_snapshot(snapshot_path)
+    sock = _listen(host, port, reuse_port=True)
+    serve(webapp.app, sockets=[sock], threads=threads, ident="sensors")
+
+
+def _spawn(ctx, args, snapshot_path):
+    proc = ctx.Process(target=_worker, args=(args.host, args.port, args.threads, args.max_streams, snapshot_path), daemon=True)
+    proc.start()
+    return proc
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the sensor dashboard with waitress")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=2, help="HTTP worker processes (0 = serve in the owner process)")
+    parser.add_argument("--threads", type=int, default=8,
+                        help="waitress threads per process; every open /api/stream client holds one")
+    parser.add_argument("--max-streams", type=int,
+                        help="concurrent /api/stream clients per process (default: half of --threads); "
+                             "must be below --threads, further clients get a 503 and poll instead")
+    parser.add_argument("--snapshot-path", help="shared snapshot file (default: /dev/shm/sensors-snapshot)")
+    args = parser.parse_args(argv)
+    if args.max_streams is None:
+        args.max_streams = args.threads // 2
+    if not 0 <= args.max_streams < args.threads:
+        parser.error("--max-streams must leave at least one of --threads for other requests")
+
+    if args.workers > 0 and not hasattr(socket, "SO_REUSEPORT"):
+        parser.error("SO_REUSEPORT is not available on this platform; use --workers 0")
+
+    import shared_state
+    import app as webapp
+
+    webapp.start()  # registers webapp.stop() with atexit
+
+    if args.workers == 0:
+        from waitress import serve
+        webapp.MAX_STREAMS = args.max_streams
+        serve(webapp.app, host=args.host, port=args.port, threads=args.threads, ident="sensors")
+        return 0
+
+    writer, publisher_stop = shared_state.start_publisher(args.snapshot_path)
+    ctx = multiprocessing.get_context("spawn")
+    workers = [_spawn(ctx, args, writer.path) for _ in range(args.workers)]
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} workers x {args.threads} threads")
+
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    try:
+        while not stopping:
+            time.sleep(MONITOR_INTERVAL)
+            for i, proc in enumerate(workers):
+                if not proc.is_alive() and not stopping:
+                    print(f"Worker {proc.pid} exited with {proc.exitcode}, restarting")
+                    workers[i] = _spawn(ctx, args, writer.path)
+    finally:
+        for proc in workers:
+            proc.terminate()
+        for proc in workers:
+            proc.join(timeout=5)
+        publisher_stop.set()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
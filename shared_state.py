@@ -0,0 +1,173 @@
+"""
+Share the sampler snapshot between the hardware-owning process and HTTP workers.
+
+The owner process runs the sampler and a publisher thread that writes every new
+snapshot, JSON-encoded, into a memory-mapped file (on /dev/shm where available).
+Worker processes map the same file read-only and never touch GPIO or I2C.
+
+File layout (little endian):
+
+    0   uint64  sequence   odd while a write is in progress (seqlock)
+    8   uint64  version    sampler snapshot version
+    16  uint32  length     payload length in bytes
+    20  ...     payload    JSON: {"dht", "rain", "sound", "alert", "status", "updated_at", "stats"}
+
+"stats" carries stats.summaries(), refreshed every stats.PUBLISH_INTERVAL.
+
+Readers retry until they see the same even sequence before and after copying
+the payload, so they never observe a half-written snapshot and never block the
+writer.
+"""
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from sampler import Snapshot
+
+HEADER = struct.Struct("<QQI")
+SIZE = 64 * 1024
+
+# How often workers check the sequence number while waiting for an update
+POLL_INTERVAL = 0.05
+
+
+def default_path():
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "sensors-snapshot")
+
+
+class SnapshotWriter:
+    """Owner side: publishes snapshots into the shared file."""
+
+    def __init__(self, path=None):
+        self.path = path or default_path()
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, SIZE)
+            self._map = mmap.mmap(fd, SIZE)
+        finally:
+            os.close(fd)
+        self._seq = HEADER.unpack_from(self._map, 0)[0]
+        if self._seq % 2:
+            self._seq += 1  # previous owner died mid-write
+
+    def write(self, snap, stats=None):
+        payload = json.dumps({
+            "dht": snap.dht,
+            "rain": snap.rain,
+            "sound": snap.sound,
+            "alert": snap.alert,
+            "status": snap.status,
+            "updated_at": snap.updated_at,
+            "stats": stats,
+        }, separators=(",", ":")).encode()
+        if HEADER.size + len(payload) > SIZE:
+            raise ValueError(f"snapshot of {len(payload)} bytes does not fit in {SIZE}")
+        m = self._map
+        struct.pack_into("<Q", m, 0, self._seq + 1)
+        struct.pack_into("<QI", m, 8, snap.version, len(payload))
+        m[HEADER.size:HEADER.size + len(payload)] = payload
+        self._seq += 2
+        struct.pack_into("<Q", m, 0, self._seq)
+
+    def close(self):
+        self._map.close()
+
+
+def publish_forever(writer, stop_event):
+    """Copy every new sampler snapshot into `writer` until `stop_event` is set."""
+    import sampler
+    import stats
+    version = None
+    summaries, summarized = None, None
+    while not stop_event.is_set():
+        snap = sampler.wait_for_update(version, timeout=1.0)
+        if snap.version == version:
+            continue
+        version = snap.version
+        try:
+            now = time.monotonic()
+            if summarized is None or now - summarized >= stats.PUBLISH_INTERVAL:
+                summaries, summarized = stats.summaries(), now
+            writer.write(snap, summaries)
+        except Exception as e:
+            print(f"Warning: failed to publish shared snapshot: {e}")
+
+
+def start_publisher(path=None):
+    """Start the owner-side publisher thread. Returns (writer, stop_event)."""
+    writer = SnapshotWriter(path)
+    stop_event = threading.Event()
+    threading.Thread(target=publish_forever, args=(writer, stop_event), name="snapshot-publisher", daemon=True).start()
+    return writer, stop_event
+
+
+class SnapshotReader:
+    """
+    Worker side: drop-in replacement for the sampler's get_snapshot() and
+    wait_for_update(), backed by the shared file.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_path()
+        self._map = None
+        # (sequence, Snapshot, stats) swapped as one reference so request
+        # threads never pair a sequence number with another snapshot
+        self._cache = (None, Snapshot(dht=None, rain=None, sound=None, alert=None, status=None, updated_at=None, version=0),
+                       None)
+
+    def _open(self):
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            return False
+        try:
+            if os.fstat(fd).st_size < SIZE:
+                return False
+            self._map = mmap.mmap(fd, SIZE, prot=mmap.PROT_READ)
+        finally:
+            os.close(fd)
+        return True
+
+    def get_snapshot(self):
+        return self._read()[1]
+
+    def get_stats(self):
+        """The owner's stats.summaries() as of its last publish, or None."""
+        return self._read()[2]
+
+    def _read(self):
+        cached = self._cache
+        if self._map is None and not self._open():
+            return cached
+        m = self._map
+        for _ in range(100):
+            seq, version, length = HEADER.unpack_from(m, 0)
+            if seq == cached[0]:
+                return cached
+            if seq % 2:
+                continue
+            payload = m[HEADER.size:HEADER.size + length]
+            if struct.unpack_from("<Q", m, 0)[0] != seq:
+                continue
+            if length == 0:
+                return cached
+            data = json.loads(payload)
+            summaries = data.pop("stats", None)
+            self._cache = (seq, Snapshot(version=version, **data), summaries)
+            return self._cache
+        return cached
+
+    def wait_for_update(self, version, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snap = self.get_snapshot()
+            if snap.version != version:
+                return snap
+            if deadline is not None and time.monotonic() >= deadline:
+                return snap
+            time.sleep(POLL_INTERVAL)
@@ -1,6 +1,10 @@
+import math
 import time
-import RPi.GPIO as GPIO
-from smbus2 import SMBus
+import os
+import hal
+import i2c_bus
+import stats
+from edges import EdgeMonitor
 
 # GPIO Physical Pin 31 = BCM GPIO 6
 # Use a clear name for the digital output (DO) pin from KY-037
@@ -13,6 +17,14 @@ PCF8591_I2C_ADDR = 0x48  # change if A0-A2 are set differently
 PCF8591_I2C_BUS = 1
 PCF8591_CHANNEL = 0  # use AIN0 (connect KY-037 AO here)
 
+# All PCF8591 inputs to sample, channel -> name. Extra inputs (e.g. an LDR on
+# AIN1) ride along in the same block transfers as the microphone and show up
+# in read_sound()["channels"]. SENSORS_PCF8591_CHANNELS="0:sound,1:light".
+PCF8591_CHANNELS = {PCF8591_CHANNEL: "sound"}
+if os.environ.get("SENSORS_PCF8591_CHANNELS"):
+    PCF8591_CHANNELS = {int(ch): name for ch, name in
+                        (item.split(":", 1) for item in os.environ["SENSORS_PCF8591_CHANNELS"].split(","))}
+    PCF8591_CHANNELS.setdefault(PCF8591_CHANNEL, "sound")
 
 # ADC reference voltage (PCF8591 powered from 3.3V)
 VREF = 3.3
@@ -23,80 +35,247 @@ SAMPLE_DELAY = 0.008  # seconds between raw reads
 
 # Calibration: baseline (silence) value to subtract from raw readings
 # This allows readings to go down to 0% when silent
-SILENCE_BASELINE = 128  # Adjust this based on your sensor's idle reading
+SILENCE_BASELINE = 128  # starting point until enough readings are seen
 
-_bus = None
+# Auto-calibration: the baseline follows a low quantile of the raw level over
+# BASELINE_WINDOW (see stats.py), so it adapts to the module and the room
+# without a manual recalibration pass. SENSORS_SOUND_BASELINE=<0..255> pins it.
+BASELINE_QUANTILE = 0.1
+BASELINE_WINDOW = "15m"
+BASELINE_MIN_SAMPLES = 60
+BASELINE_REFRESH = 30.0  # seconds between re-estimates
+BASELINE_MAX = 250.0     # keeps some range for the percent scale
+_baseline_env = os.environ.get("SENSORS_SOUND_BASELINE", "auto").lower()
+BASELINE_AUTO = _baseline_env == "auto"
+if not BASELINE_AUTO:
+    SILENCE_BASELINE = float(_baseline_env)
+
+# Continuous acquisition: the I2C bus manager (i2c_bus.py) streams PCF8591
+# conversions in block reads of up to 32 bytes (the SMBus maximum) into a
+# preallocated ring buffer, and features are published for every WINDOW_SIZE
+# samples. With more than one channel configured the ADC runs in
+# auto-increment mode, so one block carries interleaved samples of all four
+# inputs and the block length keeps each channel at the same phase.
+BLOCK_SIZE = 32 if len(PCF8591_CHANNELS) == 1 else 29
+AUTO_INCREMENT = 0x04
+RING_SIZE = 4096
+WINDOW_SIZE = 256
+BLOCK_INTERVAL = 0.002  # seconds between block reads, leaves the bus free for others
+FEATURES_MAX_AGE = 2.0  # seconds before read_sound() falls back to on-demand sampling
+
+_ring = bytearray(RING_SIZE)
+_ring_pos = 0
+_features = None
+_window_since = 0       # samples since the last published window
+_window_started = None  # monotonic time the current window began
+_streaming = False
+_i2c_ready = False
+# extra channel -> [sum, count] since the last window, and their published means
+_channel_sums = {}
+_channel_levels = {}
+
+# Lookup table so window features are computed by C-level sum()/translate()
+# over the raw bytes instead of a Python loop per sample.
+_SQUARES = [i * i for i in range(256)]
+
+
+# Edge tracking on the DO pin, used once start_edge_detection() succeeds
+_edges = EdgeMonitor(SOUND_DO_PIN, active_low=SOUND_DO_ACTIVE_LOW)
+
+
+def start_edge_detection():
+    """Count DO pin transitions via GPIO edge callbacks instead of sampling the level."""
+    setup_sound_sensor()
+    return _edges.start()
+
+
+def stop_edge_detection():
+    _edges.stop()
+
+
+_baseline = float(SILENCE_BASELINE)
+_baseline_checked = None  # monotonic time of the last estimate
+_exceed_cache = (None, None)  # (baseline, table)
+
+
+def silence_baseline():
+    """Current silence baseline: a low quantile of recent raw readings, or SILENCE_BASELINE."""
+    global _baseline, _baseline_checked
+    if not BASELINE_AUTO:
+        return _baseline
+    now = time.monotonic()
+    if _baseline_checked is None or now - _baseline_checked >= BASELINE_REFRESH:
+        _baseline_checked = now
+        if stats.count("sound_raw", BASELINE_WINDOW) >= BASELINE_MIN_SAMPLES:
+            _baseline = min(BASELINE_MAX, stats.quantile("sound_raw", BASELINE_WINDOW, BASELINE_QUANTILE))
+    return _baseline
+
+
+def _exceed_table():
+    """bytes.translate table mapping raw values at/above the analog threshold to 1, others to 0."""
+    global _exceed_cache
+    baseline = silence_baseline()
+    cached, table = _exceed_cache
+    if cached != baseline:
+        limit = baseline + ANALOG_DETECT_THRESHOLD / 100.0 * (255.0 - baseline)
+        table = bytes(1 if i >= limit else 0 for i in range(256))
+        _exceed_cache = (baseline, table)
+    return table
+
+
+def _manager():
+    return i2c_bus.get_manager(PCF8591_I2C_BUS)
 
 
 def setup_sound_sensor():
-    """Initialize DO GPIO and I2C bus for PCF8591."""
-    global _bus
-    if GPIO.getmode() is None:
-        GPIO.setmode(GPIO.BCM)
+    """
+    Initialize DO GPIO and check the PCF8591 answers on its I2C bus. Returns
+    False if it does not: the DO pin still works and analog reads retry the bus.
+    """
+    global _i2c_ready
     # Use internal pull-up so the DO pin has a defined idle state.
     # Many KY-037 modules drive DO LOW when sound is detected (active-low).
     # The pull-up prevents floating reads when module is disconnected or noisy.
-    try:
-        GPIO.setup(SOUND_DO_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-    except TypeError:
-        # Some RPi.GPIO versions/platforms use a different signature; fallback:
-        GPIO.setup(SOUND_DO_PIN, GPIO.IN)
-    if _bus is None:
-        _bus = SMBus(PCF8591_I2C_BUS)
+    hal.get_backend().setup_input(SOUND_DO_PIN, pull_up=True, label="sound")
+    if not _i2c_ready:
+        try:
+            _manager().request(PCF8591_I2C_ADDR, ("pcf8591", "probe"),
+                               lambda bus: bus.read_byte(PCF8591_I2C_ADDR))
+            _i2c_ready = True
+        except Exception as e:
+            print(f"PCF8591: no response on I2C bus {PCF8591_I2C_BUS}: {e}")
+            return False
+    return True
 
 def read_pcf8591_channel(channel=0, samples=DEFAULT_SAMPLES, delay=SAMPLE_DELAY):
     """
     Read a PCF8591 analog channel, returning the averaged raw 0..255 value.
-    PCF8591 requires a dummy read: write control byte then discard first read.
-    """
-    global _bus
 
-    # Try the I2C read with one retry. Some I2C errors (Errno 5) are transient
-    # and can be resolved by reopening the bus once.
-    attempts = 2
+    The samples come from one block transfer through the bus manager (at most
+    BLOCK_SIZE - 1 of them): the first byte of a read is the previous, stale
+    conversion and is skipped. Concurrent callers asking for the same channel
+    and sample count share the transfer. `delay` is kept for compatibility;
+    back-to-back conversions need no pause.
+    """
+    samples = max(1, min(samples, BLOCK_SIZE - 1))
     control = 0x40 | (channel & 0x03)  # enable analog input, select channel
+    try:
+        block = _manager().request(
+            PCF8591_I2C_ADDR, ("pcf8591", channel, samples),
+            lambda bus: bus.read_i2c_block_data(PCF8591_I2C_ADDR, control, samples + 1))
+    except Exception as e:
+        print(f"PCF8591 read error: {repr(e)}")
+        return None
+    vals = block[1:]
+    if not vals:
+        return None
+    return sum(vals) / len(vals)
 
-    for attempt in range(1, attempts + 1):
-        if _bus is None:
-            try:
-                _bus = SMBus(PCF8591_I2C_BUS)
-            except Exception as e:
-                print(f"PCF8591: failed to open I2C bus {PCF8591_I2C_BUS}: {e}")
-                # if we can't open the bus, no point in retrying complex read
-                return None
+def window_features(window):
+    """Mean, AC RMS, peak and exceed-threshold count of a bytes window of raw ADC values."""
+    n = len(window)
+    mean = sum(window) / n
+    mean_sq = sum(map(_SQUARES.__getitem__, window)) / n
+    return {
+        "mean": mean,
+        "rms": math.sqrt(max(0.0, mean_sq - mean * mean)),
+        "peak": max(window),
+        "exceed_count": window.translate(_exceed_table()).count(1),
+        "samples": n,
+    }
+
+
+def _last_window():
+    """Copy the newest WINDOW_SIZE samples out of the ring buffer."""
+    end = _ring_pos % RING_SIZE
+    start = end - WINDOW_SIZE
+    if start >= 0:
+        return bytes(_ring[start:end])
+    return bytes(_ring[start:]) + bytes(_ring[:end])
+
+
+def _stream_control():
+    if len(PCF8591_CHANNELS) == 1:
+        return 0x40 | (PCF8591_CHANNEL & 0x03)
+    # auto-increment from AIN0: data byte i is a conversion of channel i % 4
+    return 0x40 | AUTO_INCREMENT
+
+
+def _read_block(bus):
+    return bus.read_i2c_block_data(PCF8591_I2C_ADDR, _stream_control(), BLOCK_SIZE)
+
+
+def _on_block(block):
+    """Append one streamed block to the ring (runs on the bus manager thread)."""
+    global _ring_pos, _features, _channel_levels, _window_since, _window_started
+    # the first byte of each read is the previous (stale) conversion
+    data = bytes(block[1:])
+    if len(PCF8591_CHANNELS) > 1:
+        for channel in PCF8591_CHANNELS:
+            if channel != PCF8591_CHANNEL:
+                samples = data[channel::4]
+                acc = _channel_sums.setdefault(channel, [0, 0])
+                acc[0] += sum(samples)
+                acc[1] += len(samples)
+        data = data[PCF8591_CHANNEL::4]
+
+    pos = _ring_pos % RING_SIZE
+    head = min(len(data), RING_SIZE - pos)
+    _ring[pos:pos + head] = data[:head]
+    _ring[:len(data) - head] = data[head:]
+    _ring_pos += len(data)
+
+    if _window_started is None:
+        _window_started = time.monotonic()
+    _window_since += len(data)
+    if _window_since >= WINDOW_SIZE:
+        now = time.monotonic()
+        features = window_features(_last_window())
+        features["window_ms"] = round((now - _window_started) * 1000.0 * WINDOW_SIZE / _window_since, 1)
+        features["updated"] = now
+        _features = features
+        if _channel_sums:
+            _channel_levels = {channel: total / n for channel, (total, n) in _channel_sums.items() if n}
+            _channel_sums.clear()
+        _window_since = 0
+        _window_started = now
+
+
+def start_acquisition():
+    """Start streaming PCF8591 conversions through the I2C bus manager."""
+    global _streaming, _window_since, _window_started
+    if _streaming:
+        return
+    _window_since = 0
+    _window_started = None
+    _manager().stream("pcf8591", PCF8591_I2C_ADDR, _read_block, BLOCK_INTERVAL, _on_block)
+    _streaming = True
+
+
+def stop_acquisition():
+    """Stop streaming; read_sound() falls back to on-demand sampling."""
+    global _streaming, _features, _channel_levels
+    if _streaming:
+        _manager().unstream("pcf8591")
+        _streaming = False
+    _features = None
+    _channel_levels = {}
+
+
+def analog_levels():
+    """Mean raw level and voltage of every extra PCF8591 channel over the last window."""
+    levels = _channel_levels
+    return {name: {"raw": round(levels[channel], 1), "voltage": round(levels[channel] / 255.0 * VREF, 3)}
+            for channel, name in sorted(PCF8591_CHANNELS.items()) if channel in levels}
+
+
+def latest_features():
+    """Features of the newest acquisition window, or None if streaming is off or stale."""
+    features = _features
+    if features is None or time.monotonic() - features["updated"] > FEATURES_MAX_AGE:
+        return None
+    return features
 
-        vals = []
-        try:
-            for _ in range(samples):
-                # Write control byte to select channel
-                _bus.write_byte(PCF8591_I2C_ADDR, control)
-                # First read is a dummy; second read returns valid data
-                _bus.read_byte(PCF8591_I2C_ADDR)  # discard
-                raw = _bus.read_byte(PCF8591_I2C_ADDR)
-                vals.append(raw)
-                time.sleep(delay)
-            if not vals:
-                return None
-            return sum(vals) / len(vals)
-        except Exception as e:
-            # Log full exception and attempt one reopen/retry
-            print(f"PCF8591 read error on attempt {attempt}: {repr(e)}")
-            try:
-                # try to recover by closing and reopening the bus once
-                if _bus is not None:
-                    try:
-                        _bus.close()
-                    except Exception:
-                        pass
-                    _bus = None
-                # small pause before reopening
-                time.sleep(0.05)
-                if attempt == attempts:
-                    # final failure
-                    return None
-                # otherwise loop will try to reopen and read again
-            except Exception:
-                return None
 
 def read_sound(samples=DEFAULT_SAMPLES):
     """
@@ -104,16 +283,28 @@ def read_sound(samples=DEFAULT_SAMPLES):
     ...
     """
     try:
-        setup_sound_sensor()
-        # digital DO reading (boolean)
-        raw_digital = GPIO.input(SOUND_DO_PIN)
-        if SOUND_DO_ACTIVE_LOW:
-            sound_digital = (raw_digital == GPIO.LOW)
+        if _edges.running:
+            # any DO activation within the event window counts, so claps
+            # between polls are not missed
+            edges = _edges.stats()
+            sound_digital = edges["events"] > 0 or edges["active"]
         else:
-            sound_digital = (raw_digital == GPIO.HIGH)
+            edges = None
+            setup_sound_sensor()
+            # digital DO reading (boolean)
+            raw_digital = hal.get_backend().input(SOUND_DO_PIN)
+            if SOUND_DO_ACTIVE_LOW:
+                sound_digital = (raw_digital == hal.LOW)
+            else:
+                sound_digital = (raw_digital == hal.HIGH)
 
-        # analog reading via PCF8591
-        raw = read_pcf8591_channel(PCF8591_CHANNEL, samples=samples)
+        # analog reading via PCF8591: latest streamed window if available,
+        # otherwise sample on demand
+        features = latest_features()
+        if features is not None:
+            raw = features["mean"]
+        else:
+            raw = read_pcf8591_channel(PCF8591_CHANNEL, samples=samples)
         if raw is None:
             voltage = None
             percent = None
@@ -121,14 +312,21 @@ def read_sound(samples=DEFAULT_SAMPLES):
             # PCF8591 output is 0..255
             voltage = (raw / 255.0) * VREF
             # Subtract baseline for calibrated reading (0 = silence, 255 = max noise)
-            calibrated_raw = max(0, raw - SILENCE_BASELINE)
-            percent = (calibrated_raw / (255.0 - SILENCE_BASELINE)) * 100.0
+            baseline = silence_baseline()
+            calibrated_raw = max(0, raw - baseline)
+            percent = (calibrated_raw / (255.0 - baseline)) * 100.0
             percent = min(100.0, max(0, percent))  # Clamp to 0-100%
 
         # combine signals: prefer digital, but use analog if digital is ambiguous
         detected = sound_digital
         detected_by = "digital" if sound_digital else "none"
-        if not detected and percent is not None and percent >= ANALOG_DETECT_THRESHOLD:
+        if features is not None:
+            # any sample in the window above the threshold counts, so short
+            # loud events between polls are not averaged away
+            analog_detected = features["exceed_count"] > 0
+        else:
+            analog_detected = percent is not None and percent >= ANALOG_DETECT_THRESHOLD
+        if not detected and analog_detected:
             detected = True
             detected_by = "analog"
 
@@ -138,36 +336,47 @@ def read_sound(samples=DEFAULT_SAMPLES):
         else:
             status = "No data"
 
-        return {
+        result = {
             "sound_detected": detected,
             "detected_by": detected_by,
             "raw": None if raw is None else float(raw),
             "voltage": None if voltage is None else round(voltage, 3),
             "percent": None if percent is None else round(percent, 1),
+            "baseline": round(silence_baseline(), 1),
             "status": status
         }
+        if features is not None:
+            result["rms"] = round(features["rms"], 2)
+            result["peak"] = features["peak"]
+            result["exceed_count"] = features["exceed_count"]
+            result["window_ms"] = features["window_ms"]
+            channels = analog_levels()
+            if channels:
+                result["channels"] = channels
+        if edges is not None:
+            result["edges"] = edges
+        return result
     except Exception as e:
-        print(f"Error reading sound sensor: {e}")
+        # the sampler logs it (rate-limited) and marks the sensor degraded
         return {
             "sound_detected": None,
             "raw": None,
             "voltage": None,
             "percent": None,
-            "status": f"Error: {e}"
+            "status": f"Error: {e}",
+            "error": str(e)
         }
 
 
 def cleanup():
     """Close I2C bus and cleanup GPIO."""
-    global _bus
-    try:
-        if _bus is not None:
-            _bus.close()
-            _bus = None
-    except Exception:
-        pass
+    global _i2c_ready
+    stop_acquisition()
+    stop_edge_detection()
+    _manager().stop()
+    _i2c_ready = False
     try:
-        GPIO.cleanup()
+        hal.get_backend().cleanup()
     except Exception:
         pass
 
@@ -179,7 +388,7 @@ if __name__ == "__main__":
         while True:
             data = read_sound()
             # Also read raw digital numeric state for clarity
-            raw_digital = GPIO.input(SOUND_DO_PIN)
+            raw_digital = hal.get_backend().input(SOUND_DO_PIN)
             print(
                 f"DO raw: {raw_digital}  | digital_detected: {data['sound_detected']} "
                 f"(by={data.get('detected_by')}) | Raw(AO avg): {data['raw']} "
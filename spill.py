@@ -0,0 +1,158 @@
+"""
+Crash-safe ring buffer of pending sensor readings, backed by a memory-mapped file.
+
+database._enqueue() appends one fixed-size record per reading; the database
+writer thread drains the ring into SQLite and records the sequence number of
+the last committed reading in the same transaction. Readings therefore stay in
+the ring until a commit that contains them succeeds: a locked database or a
+stalled SD card delays them instead of dropping them, and readings still in
+the ring when the process dies are replayed on the next start (recover()).
+
+File layout (little endian):
+
+    0   4s   magic b"SNSP"
+    4   u16  format version (1)
+    6   u16  record size (32)
+    8   u32  capacity in records
+    64  ...  capacity records of RECORD
+
+Record: u32 low bits of the sequence number, i64 timestamp in microseconds
+since the epoch (naive UTC), u8 sensor id, u8 action id, 2 pad bytes, f64 value,
+f64 second value (humidity of a DHT reading). Records are 32 bytes so none
+straddles a page. A slot only counts as the record for sequence `seq` if its
+sequence field matches, so stale or overwritten slots are recognized without
+a separate head pointer: recover() finds the newest record by scanning the
+slots once at start-up.
+
+Appending is a struct.pack_into() on the mapping under a thread lock: no
+syscall on the hot path. The writer msyncs the file once per drain, before
+the commit that empties it, so the readings of a tick are on disk before
+SQLite (synchronous=NORMAL) may hold them only in an unsynced WAL: after a
+power cut they are replayed from the ring. The cost is one msync of the few
+dirty pages per group commit, on the writer thread.
+
+When the ring is full the oldest pending readings are overwritten and counted
+as dropped. Only one process may own the file (flock); a second process, or
+SENSORS_SPILL_PATH=memory, gets an anonymous in-memory ring with the same
+behaviour minus crash recovery.
+"""
+import fcntl
+import mmap
+import os
+import struct
+import threading
+
+MAGIC = b"SNSP"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+HEADER_SIZE = 64
+RECORD = struct.Struct("<IqBBxxdd")
+CAPACITY = int(os.environ.get("SENSORS_SPILL_RECORDS", 65536))
+
+_SEQ_MASK = 0xFFFFFFFF
+
+
+class SpillRing:
+    def __init__(self, path=None, capacity=CAPACITY):
+        """Map `path` (created if needed) or, with path None, an anonymous in-memory ring."""
+        self.capacity = capacity
+        self.size = HEADER_SIZE + capacity * RECORD.size
+        self.path = None
+        self._fd = None
+        self._lock = threading.Lock()
+        if path is not None:
+            self._open_file(path)
+        if self.path is None:
+            self._map = mmap.mmap(-1, self.size)
+        self.committed = 0  # last sequence number stored in the database
+        self.head = 1       # next sequence number to write
+
+    @property
+    def persistent(self):
+        return self.path is not None
+
+    def _open_file(self, path):
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            print(f"Warning: {path} is used by another process, buffering readings in memory only")
+            return
+        if os.fstat(fd).st_size < self.size:
+            os.ftruncate(fd, self.size)
+        self._map = mmap.mmap(fd, self.size)
+        magic, version, record_size, capacity = HEADER.unpack_from(self._map, 0)
+        if (magic, version, record_size, capacity) != (MAGIC, VERSION, RECORD.size, self.capacity):
+            if magic == MAGIC:
+                print(f"Warning: {path} has a different layout, pending readings in it are skipped")
+            HEADER.pack_into(self._map, 0, MAGIC, VERSION, RECORD.size, self.capacity)
+        self._fd = fd
+        self.path = path
+
+    def _offset(self, seq):
+        return HEADER_SIZE + (seq % self.capacity) * RECORD.size
+
+    def recover(self, committed):
+        """
+        Resume after `committed`, the last sequence number the database holds.
+        Returns how many readings were written after it; they are drained by
+        the next read() (those lost to an overflow count as dropped there).
+        """
+        head = committed + 1
+        records = memoryview(self._map)[HEADER_SIZE:self.size]
+        for slot, rec in enumerate(RECORD.iter_unpack(records)):
+            # widen the stored low 32 bits to the sequence number just after `committed`
+            seq = committed + ((rec[0] - committed) & _SEQ_MASK)
+            if seq >= head and seq - committed <= _SEQ_MASK // 2 and seq % self.capacity == slot:
+                head = seq + 1
+        records.release()
+        self.committed = committed
+        self.head = head
+        return head - committed - 1
+
+    def append(self, ts_us, sensor_id, action_id, value, value2=0.0):
+        """Store one reading; returns the number of readings now waiting for a commit."""
+        with self._lock:
+            seq = self.head
+            RECORD.pack_into(self._map, self._offset(seq), seq & _SEQ_MASK, ts_us, sensor_id, action_id, value, value2)
+            self.head = seq + 1
+            return seq - self.committed
+
+    def pending(self):
+        return self.head - self.committed - 1
+
+    def read(self, limit):
+        """
+        Return (records, dropped, last): up to `limit` uncommitted readings as
+        (seq, ts_us, sensor_id, action_id, value, value2) tuples, oldest first,
+        how many of the examined slots were overwritten while the ring was
+        full, and the last sequence number examined.
+        """
+        start = self.committed + 1
+        end = min(self.head, start + limit)
+        records = []
+        dropped = 0
+        m = self._map
+        for seq in range(start, end):
+            rec = RECORD.unpack_from(m, self._offset(seq))
+            if rec[0] != seq & _SEQ_MASK:
+                dropped += 1  # overwritten by a newer reading while the ring was full
+                continue
+            records.append((seq,) + rec[1:])
+        return records, dropped, end - 1
+
+    def mark_committed(self, seq):
+        self.committed = max(self.committed, seq)
+
+    def sync(self):
+        """Flush the mapping to disk (no-op for the in-memory ring)."""
+        if self.persistent:
+            self._map.flush()
+
+    def close(self):
+        self.sync()
+        self._map.close()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -2,22 +2,11 @@
 // Fetch and update sensors
 // -------------------------
 
-async function fetchSensorData() {
-  try {
-    const response = await fetch('/api/sensors');
-    const data = await response.json();
-
-    if (data.success) {
-      updateDHTDisplay(data.dht);
-      updateRainDisplay(data.rain);
-      updateSoundDisplay(data.sound);
-      updateAlertDisplay(data.alert);
-    } else {
-      console.error('Error fetching sensor data:', data.error);
-    }
-  } catch (error) {
-    console.error('Network error:', error);
-  }
+function updateAllDisplays(data) {
+  updateDHTDisplay(data.dht);
+  updateRainDisplay(data.rain);
+  updateSoundDisplay(data.sound);
+  updateAlertDisplay(data.alert);
 }
 
 // -------------------------
@@ -102,29 +91,105 @@ function updateAlertDisplay(alert) {
 // Chart helpers
 // -------------------------
 
-function formatTimeLabel(isoTs) {
-  const d = new Date(isoTs);
-  if (isNaN(d)) return isoTs;
+// Number of points kept on each history chart
+const HISTORY_POINTS = 10;
+
+// Accepts an ISO string or epoch milliseconds
+function formatTimeLabel(ts) {
+  const d = new Date(ts);
+  if (isNaN(d)) return ts;
   return d.toLocaleTimeString();
 }
 
+// Live points are spaced at least MIN_BUCKET_MS and at most MAX_BUCKET_MS
+// apart on a chart. The cap keeps a chart seeded from sparse rows (rain runs
+// spanning hours) moving: a live point never waits longer than this.
+const MIN_BUCKET_MS = 1000;
+const MAX_BUCKET_MS = 5000;
+
+// chart -> { ts: epoch ms of every point, bucketMs, combine, samples }.
+// The charts are seeded from stored rows, which are sparser than the 1 Hz
+// live samples; live samples are folded into buckets of the seeded spacing
+// (within the limits above) instead of adding a point per sample.
+const chartSeries = new WeakMap();
+
+function toEpochMs(ts) {
+  return typeof ts === 'number' ? ts : new Date(ts).getTime();
+}
+
+// Remember the seeded timestamps of a new chart and derive its bucket size.
+// combine(current, value, samples) folds a live value into the last bucket.
+function trackSeries(chart, ts, combine) {
+  const times = ts.map(toEpochMs);
+  const span = times.length > 1 ? (times[times.length - 1] - times[0]) / (times.length - 1) : 0;
+  const bucketMs = Math.min(MAX_BUCKET_MS, Math.max(MIN_BUCKET_MS, span));
+  chartSeries.set(chart, { ts: times, bucketMs, combine, samples: 1 });
+}
+
+// Drop points beyond HISTORY_POINTS, oldest first
+function trimChart(chart) {
+  const labels = chart.data.labels;
+  const excess = labels.length - HISTORY_POINTS;
+  if (excess > 0) {
+    labels.splice(0, excess);
+    chart.data.datasets[0].data.splice(0, excess);
+    const series = chartSeries.get(chart);
+    if (series) series.ts.splice(0, excess);
+  }
+}
+
+// Append points given as parallel ts/value arrays (the ?shape=columns format)
+// to an existing chart in place. The label and data arrays act as a
+// fixed-size ring buffer of HISTORY_POINTS entries.
+function appendChartColumns(chart, ts, values) {
+  if (!chart || ts.length === 0) return;
+  const labels = chart.data.labels;
+  const data = chart.data.datasets[0].data;
+  const series = chartSeries.get(chart);
+  for (let i = 0; i < ts.length; i++) {
+    labels.push(formatTimeLabel(ts[i]));
+    data.push(Number(values[i]));
+    if (series) series.ts.push(toEpochMs(ts[i]));
+  }
+  if (series) series.samples = 1;
+  trimChart(chart);
+  chart.update('none');
+}
+
+// Add one live sample: folded into the last point while it is less than a
+// bucket newer than that point's start, otherwise it opens a new bucket
+// (a new point labelled with the sample's time)
+function addLivePoint(chart, ts, value) {
+  const series = chart && chartSeries.get(chart);
+  if (!series) return;
+  const t = toEpochMs(ts);
+  const data = chart.data.datasets[0].data;
+  const last = series.ts.length - 1;
+  if (last >= 0 && t - series.ts[last] < series.bucketMs) {
+    series.samples += 1;
+    data[last] = series.combine(data[last], Number(value), series.samples);
+    chart.update('none');
+    return;
+  }
+  appendChartColumns(chart, [t], [value]);
+}
+
+// Bucket combiners: rain counts if it fell at any time in the bucket, sound
+// intensity is averaged
+const combineMax = (current, value) => Math.max(current, value);
+const combineMean = (current, value, samples) => current + (value - current) / samples;
+
 // -------------------------
 // Raindrop history chart
 // -------------------------
 
 let raindropChart = null;
-
-async function fetchRaindrops(n = 10) {
-  const res = await fetch(`/api/raindrops?n=${n}`);
-  if (!res.ok) throw new Error("Failed to fetch raindrops");
-  const json = await res.json();
-  if (!json.success) throw new Error(json.error || "API returned failure");
-  return json.rows || [];
-}
+let lastRaindropId = null;
+// ts of the newest rain point on the chart: the open run's end moves on
+let lastRaindropTs = null;
 
 function buildRaindropChart(labels, values) {
   const ctx = document.getElementById('raindropChart').getContext('2d');
-  if (raindropChart) raindropChart.destroy();
 
   raindropChart = new Chart(ctx, {
     type: 'line',
@@ -166,17 +231,7 @@ function buildRaindropChart(labels, values) {
       }
     }
   });
-}
-
-async function refreshRaindropChart() {
-  try {
-    const rows = await fetchRaindrops(10);
-    const labels = rows.map(r => formatTimeLabel(r.ts));
-    const values = rows.map(r => Number(r.value));
-    buildRaindropChart(labels, values);
-  } catch (err) {
-    console.error("Could not update raindrop chart:", err);
-  }
+  return raindropChart;
 }
 
 // -------------------------
@@ -184,18 +239,10 @@ async function refreshRaindropChart() {
 // -------------------------
 
 let soundHistoryChart = null;
-
-async function fetchSounds(n = 10) {
-  const res = await fetch(`/api/sounds?n=${n}`);
-  if (!res.ok) throw new Error("Failed to fetch sounds");
-  const json = await res.json();
-  if (!json.success) throw new Error(json.error || "API returned failure");
-  return json.rows || [];
-}
+let lastSoundId = null;
 
 function buildSoundHistoryChart(labels, values) {
   const ctx = document.getElementById('soundHistoryChart').getContext('2d');
-  if (soundHistoryChart) soundHistoryChart.destroy();
 
   soundHistoryChart = new Chart(ctx, {
     type: 'line',
@@ -237,16 +284,120 @@ function buildSoundHistoryChart(labels, values) {
       }
     }
   });
+  return soundHistoryChart;
+}
+
+// -------------------------
+// Combined dashboard refresh
+// -------------------------
+
+// Shape /api/dashboard's flat "live" fields like an /api/sensors snapshot,
+// building the status text here instead of shipping it with every response
+function liveToSnapshot(live) {
+  return {
+    dht: { temperature: live.temperature, humidity: live.humidity, cached: live.dht_cached },
+    rain: {
+      rain_detected: live.rain,
+      value: live.rain_value,
+      status: live.rain ? '🌧️ Rain detected' : '☀️ Sunny'
+    },
+    sound: {
+      sound_detected: live.sound,
+      percent: live.sound_percent,
+      status: live.sound_percent == null ? 'No data' : `${Math.round(live.sound_percent)}%`
+    },
+    alert: { alert_active: live.alert }
+  };
+}
+
+// Build a chart from its first series, afterwards append only the new rows
+function applySeries(chart, build, series, combine) {
+  if (chart) {
+    appendChartColumns(chart, series.ts, series.value);
+  } else {
+    trackSeries(build(series.ts.map(formatTimeLabel), series.value), series.ts, combine);
+  }
 }
 
-async function refreshSoundHistoryChart() {
+// One request for the live readings and both history charts; after the
+// first call only rows newer than the last seen ids are fetched
+async function refreshDashboard() {
   try {
-    const rows = await fetchSounds(10);
-    const labels = rows.map(r => formatTimeLabel(r.ts));
-    const values = rows.map(r => Number(r.value));
-    buildSoundHistoryChart(labels, values);
+    const params = new URLSearchParams({ n: HISTORY_POINTS });
+    if (raindropChart && lastRaindropId != null) {
+      params.set('rain_since', lastRaindropId);
+      if (lastRaindropTs != null) params.set('rain_since_ts', lastRaindropTs);
+    }
+    if (soundHistoryChart && lastSoundId != null) params.set('sound_since', lastSoundId);
+    const res = await fetch(`/api/dashboard?${params}`);
+    if (!res.ok) throw new Error(`Dashboard request failed: ${res.status}`);
+    const json = await res.json();
+    if (!json.success) throw new Error(json.error || "API returned failure");
+
+    updateAllDisplays(liveToSnapshot(json.live));
+    applySeries(raindropChart, buildRaindropChart, json.rain, combineMax);
+    applySeries(soundHistoryChart, buildSoundHistoryChart, json.sound, combineMean);
+    lastRaindropId = json.rain.last_id;
+    if (json.rain.ts.length) lastRaindropTs = json.rain.ts[json.rain.ts.length - 1];
+    lastSoundId = json.sound.last_id;
   } catch (err) {
-    console.error("Could not update sound history chart:", err);
+    console.error("Could not refresh dashboard:", err);
+  }
+}
+
+// -------------------------
+// Live updates
+// -------------------------
+
+// sampled_at of the last rain/sound reading added to the charts
+let lastRainSample = null;
+let lastSoundSample = null;
+
+function handleSnapshot(data) {
+  updateAllDisplays(data);
+
+  const rain = data.rain;
+  if (rain && rain.value != null && rain.sampled_at !== lastRainSample) {
+    lastRainSample = rain.sampled_at;
+    addLivePoint(raindropChart, rain.sampled_at, rain.value);
+  }
+  const sound = data.sound;
+  if (sound && sound.percent != null && sound.sampled_at !== lastSoundSample) {
+    lastSoundSample = sound.sampled_at;
+    addLivePoint(soundHistoryChart, sound.sampled_at, sound.percent);
+  }
+}
+
+// Subscribe to /api/stream: the server pushes each new snapshot once to all
+// open dashboards, so there is no per-tab polling.
+function subscribeToStream() {
+  const source = new EventSource('/api/stream');
+  source.onmessage = (event) => {
+    try {
+      handleSnapshot(JSON.parse(event.data));
+    } catch (err) {
+      console.error('Bad stream event:', err);
+    }
+  };
+  source.onerror = () => {
+    if (source.readyState === EventSource.CLOSED) {
+      // The server refused the stream (503 once too many dashboards are
+      // open): EventSource gives up for good, so poll instead
+      console.warn('Sensor stream unavailable, polling instead');
+      startPolling();
+      return;
+    }
+    // EventSource reconnects on its own; nothing to do but log it
+    console.warn('Sensor stream interrupted, reconnecting...');
+  };
+}
+
+// Poll every 5 seconds, fetching only the history rows added since the
+// previous poll
+let pollTimer = null;
+function startPolling() {
+  if (pollTimer === null) {
+    pollTimer = setInterval(refreshDashboard, 5000);
   }
 }
 
@@ -254,16 +405,15 @@ async function refreshSoundHistoryChart() {
 // Initialize on page load
 // -------------------------
 
-document.addEventListener('DOMContentLoaded', () => {
-  // Initial fetch - all at once
-  fetchSensorData();
-  refreshRaindropChart();
-  refreshSoundHistoryChart();
-
-  // Auto-refresh timers - synchronized
-  setInterval(() => {
-    fetchSensorData();
-    refreshRaindropChart();
-    refreshSoundHistoryChart();
-  }, 5000); // All fetch at same 5-second interval
+document.addEventListener('DOMContentLoaded', async () => {
+  // Initial fetch: live readings and both charts in one request
+  await refreshDashboard();
+
+  if (window.EventSource) {
+    subscribeToStream();
+    return;
+  }
+
+  // Fallback for browsers without EventSource
+  startPolling();
 });
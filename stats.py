@@ -0,0 +1,232 @@
+"""
+Streaming sliding-window statistics per sensor, in constant memory.
+
+Each stream keeps, for every window in WINDOWS, a ring of SLOTS sub-window
+sketches and their running total. A reading updates the current slot and the
+total; when a slot falls out of the window it is subtracted from the total and
+reused. The window therefore slides in steps of window / SLOTS and reading it
+never scans old data.
+
+A Sketch is a fixed-bin histogram over the stream's value range plus count,
+sum, sum of squares, min and max. Sketches with the same range merge and
+subtract by adding bin counts, which is what makes the ring work; quantiles
+are interpolated within a bin, so their error is at most one bin width
+((hi - lo) / bins), and min/max stay exact.
+
+The sampler feeds the streams; soundsensor reads the low quantile of the raw
+ADC level as its silence baseline. In serve.py worker mode /api/stats answers
+from the summary the owner publishes in the snapshot every PUBLISH_INTERVAL.
+"""
+import threading
+import time
+from array import array
+
+# Window name -> length in seconds
+WINDOWS = {"1m": 60, "5m": 300, "15m": 900, "1h": 3600, "6h": 6 * 3600, "24h": 24 * 3600}
+SLOTS = 12
+
+# Stream -> (lowest value, highest value, bins); values outside the range land in the edge bins
+STREAMS = {
+    "sound": (0.0, 100.0, 200),
+    "sound_raw": (0.0, 256.0, 256),
+    "rain": (0.0, 1.0, 2),
+    "temperature": (-20.0, 60.0, 160),
+    "humidity": (0.0, 100.0, 200),
+}
+
+# Quantiles reported by summary()
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+# Seconds between summaries published in the shared snapshot
+PUBLISH_INTERVAL = 5.0
+
+
+class Sketch:
+    """Mergeable fixed-bin histogram with moments and exact min/max."""
+
+    __slots__ = ("lo", "hi", "scale", "count", "total", "total_sq", "min", "max", "bins")
+
+    def __init__(self, lo, hi, bins):
+        self.lo = lo
+        self.hi = hi
+        self.scale = bins / (hi - lo)
+        self.bins = array("i", bytes(4 * bins))
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = None
+        self.max = None
+        if any(self.bins):
+            self.bins = array("i", bytes(4 * len(self.bins)))
+
+    def add(self, value):
+        i = int((value - self.lo) * self.scale)
+        n = len(self.bins)
+        self.bins[0 if i < 0 else n - 1 if i >= n else i] += 1
+        self.count += 1
+        self.total += value
+        self.total_sq += value * value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for i, n in enumerate(other.bins):
+            if n:
+                self.bins[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def subtract(self, other):
+        """Remove a sketch previously merged in; min and max are left as they are."""
+        for i, n in enumerate(other.bins):
+            if n:
+                self.bins[i] -= n
+        self.count -= other.count
+        if self.count:
+            self.total -= other.total
+            self.total_sq -= other.total_sq
+        else:
+            self.total = self.total_sq = 0.0
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def variance(self):
+        if not self.count:
+            return None
+        mean = self.total / self.count
+        return max(0.0, self.total_sq / self.count - mean * mean)
+
+    def quantile(self, q, lo=None, hi=None):
+        """Approximate q-quantile, clamped to [lo, hi] (the exact min/max when known)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        width = 1.0 / self.scale
+        for i, n in enumerate(self.bins):
+            if n and seen + n >= rank:
+                value = self.lo + (i + (rank - seen) / n) * width
+                break
+            seen += n
+        else:
+            value = self.hi
+        lo = self.lo if lo is None else lo
+        hi = self.hi if hi is None else hi
+        return min(hi, max(lo, value))
+
+
+class _Window:
+    """Ring of SLOTS sketches covering `seconds`, with their running total."""
+
+    def __init__(self, seconds, lo, hi, bins):
+        self.slot_seconds = seconds / SLOTS
+        self.slots = [Sketch(lo, hi, bins) for _ in range(SLOTS)]
+        self.slot_ids = [None] * SLOTS
+        self.total = Sketch(lo, hi, bins)
+        self.current = None
+
+    def advance(self, now):
+        slot_id = int(now // self.slot_seconds)
+        if slot_id == self.current:
+            return
+        self.current = slot_id
+        for i, held in enumerate(self.slot_ids):
+            if held is not None and held <= slot_id - SLOTS:
+                self.total.subtract(self.slots[i])
+                self.slots[i].reset()
+                self.slot_ids[i] = None
+        i = slot_id % SLOTS
+        if self.slot_ids[i] is None:
+            self.slot_ids[i] = slot_id
+
+    def add(self, value, now):
+        self.advance(now)
+        self.slots[self.current % SLOTS].add(value)
+        self.total.add(value)
+
+    def extremes(self):
+        """Exact min and max over the live slots (the total cannot un-merge them)."""
+        live = [s for s in self.slots if s.count]
+        if not live:
+            return None, None
+        return min(s.min for s in live), max(s.max for s in live)
+
+
+class _Stream:
+    def __init__(self, lo, hi, bins):
+        self.lock = threading.Lock()
+        self.windows = {name: _Window(seconds, lo, hi, bins) for name, seconds in WINDOWS.items()}
+
+
+_streams = {name: _Stream(*spec) for name, spec in STREAMS.items()}
+
+
+def observe(stream, value, now=None):
+    """Add one reading to every window of `stream`. None values are ignored."""
+    if value is None:
+        return
+    now = time.monotonic() if now is None else now
+    s = _streams[stream]
+    with s.lock:
+        for window in s.windows.values():
+            window.add(value, now)
+
+
+def quantile(stream, window, q, now=None):
+    """q-quantile of `stream` over `window` (a WINDOWS key), or None without data."""
+    s = _streams[stream]
+    w = s.windows[window]
+    with s.lock:
+        w.advance(time.monotonic() if now is None else now)
+        return w.total.quantile(q, *w.extremes())
+
+
+def count(stream, window, now=None):
+    s = _streams[stream]
+    w = s.windows[window]
+    with s.lock:
+        w.advance(time.monotonic() if now is None else now)
+        return w.total.count
+
+
+def summary(stream, window, now=None):
+    """Count, mean, standard deviation, min/max and QUANTILES of `stream` over `window`."""
+    s = _streams[stream]
+    w = s.windows[window]
+    with s.lock:
+        w.advance(time.monotonic() if now is None else now)
+        total = w.total
+        lo, hi = w.extremes()
+        variance = total.variance()
+        return {
+            "count": total.count,
+            "mean": None if not total.count else round(total.mean(), 4),
+            "std": None if variance is None else round(variance ** 0.5, 4),
+            "min": lo,
+            "max": hi,
+            "quantiles": {f"p{round(q * 100)}": None if not total.count else round(total.quantile(q, lo, hi), 4)
+                          for q in QUANTILES},
+            "resolution": round((total.hi - total.lo) / len(total.bins), 4),
+        }
+
+
+def summaries(now=None):
+    """summary() of every stream and window: {stream: {window: summary}}."""
+    now = time.monotonic() if now is None else now
+    return {stream: {window: summary(stream, window, now) for window in WINDOWS} for stream in STREAMS}
+
+
+def reset():
+    for name, spec in STREAMS.items():
+        _streams[name] = _Stream(*spec)
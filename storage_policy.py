@@ -0,0 +1,62 @@
+"""
+Per-sensor storage policies: decide which readings become raw history rows.
+
+Every reading still feeds the rollups, but raw rows are only written when
+they carry information:
+
+    deadband  store when the value moved by at least `deadband` since the last
+              stored row (no faster than `min_interval`), or when `max_interval`
+              seconds passed without a row.
+    change    run-length storage for binary signals: a row is started on each
+              state change and its end_ts follows every reading while the
+              state holds, so the open run always reaches the latest sample.
+              The writer folds the extends of one group commit into a single
+              UPDATE, so this costs one statement per commit, not per reading.
+
+decide() returns one of the actions understood by the database writer:
+"start" (first row after startup), "insert", "extend" or "rollup" (aggregate only).
+"""
+import threading
+
+POLICIES = {
+    "sound": {"mode": "deadband", "deadband": 2.0, "min_interval": 1.0, "max_interval": 60.0},
+    "rain": {"mode": "change"},
+}
+
+# sensor -> (last stored value, datetime of last write)
+_last = {}
+_lock = threading.Lock()
+
+
+def decide(sensor, value, ts):
+    """Return the storage action for a reading of `sensor` taken at `ts` (naive UTC datetime)."""
+    policy = POLICIES.get(sensor)
+    if policy is None:
+        return "insert"
+    with _lock:
+        last = _last.get(sensor)
+        if last is None:
+            _last[sensor] = (value, ts)
+            return "start"
+        last_value, last_ts = last
+        elapsed = (ts - last_ts).total_seconds()
+
+        if policy["mode"] == "change":
+            _last[sensor] = (value, ts)
+            return "insert" if value != last_value else "extend"
+
+        if elapsed >= policy["max_interval"] or (
+            abs(value - last_value) >= policy["deadband"] and elapsed >= policy["min_interval"]
+        ):
+            _last[sensor] = (value, ts)
+            return "insert"
+        return "rollup"
+
+
+def reset(sensor=None):
+    """Forget the last stored value so the next reading is stored unconditionally."""
+    with _lock:
+        if sensor is None:
+            _last.clear()
+        else:
+            _last.pop(sensor, None)
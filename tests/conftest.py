@@ -0,0 +1,41 @@
+"""
+Shared fixtures. Tests run on the simulated backend (hal.SimBackend) against
+a scratch database per test, so no Raspberry Pi or existing sensors.db is needed.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SENSOR_BACKEND", "sim")
+# app modules read these at import time; the db fixture repoints them per test
+os.environ.setdefault("SENSORS_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="sensors-test-"), "sensors.db"))
+
+import pytest
+
+import app as webapp
+import database
+import storage_policy
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """The database module on a fresh file in tmp_path, closed again afterwards."""
+    database.close()
+    path = str(tmp_path / "sensors.db")
+    monkeypatch.setattr(database, "DB_PATH", path)
+    monkeypatch.setattr(database, "SPILL_PATH", path + "-spill")
+    monkeypatch.setattr(database, "_schema_ready", False)
+    database._table_versions.clear()
+    storage_policy.reset()
+    database.init_db()
+    yield database
+    database.close()
+    storage_policy.reset()
+
+
+@pytest.fixture
+def client(db):
+    """Test client of app.py on the scratch database; test modules seed their own rows through `db`."""
+    webapp._history_cache.clear()
+    return webapp.app.test_client()
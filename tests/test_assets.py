@@ -0,0 +1,54 @@
+"""Fingerprinted asset build and its caching headers."""
+import pytest
+
+import assets
+
+
+@pytest.fixture
+def built(tmp_path, monkeypatch):
+    static = tmp_path / "static"
+    (static / "css").mkdir(parents=True)
+    (static / "images").mkdir()
+    (static / "images" / "bg.svg").write_text("<svg xmlns='http://www.w3.org/2000/svg'/>")
+    (static / "css" / "style.css").write_text("body { background: url('../images/bg.svg'); }\n" * 20)
+    dist = static / "dist"
+    monkeypatch.setattr(assets, "STATIC_DIR", str(static))
+    monkeypatch.setattr(assets, "DIST_DIR", str(dist))
+    monkeypatch.setattr(assets, "MANIFEST_PATH", str(dist / "manifest.json"))
+    monkeypatch.setattr(assets, "_manifest_mtime", None)
+    return assets.build(verbose=False)
+
+
+def test_css_points_at_fingerprinted_files(built):
+    css = built["files"]["css/style.css"]
+    image = built["files"]["images/bg.svg"]
+    assert css != "css/style.css" and image != "images/bg.svg"
+    text = open(f"{assets.DIST_DIR}/{css}").read()
+    assert f"url('../{image}')" in text
+    assert not assets.is_stale()
+
+
+def test_only_fingerprinted_files_are_immutable(built, client):
+    css = built["files"]["css/style.css"]
+    response = client.get(f"/assets/{css}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == assets.IMMUTABLE_MAX_AGE
+
+    manifest = client.get("/assets/manifest.json")
+    assert manifest.status_code == 200
+    assert not manifest.cache_control.immutable
+    assert manifest.cache_control.max_age is None
+    assert manifest.cache_control.no_cache
+
+
+def test_stale_build_is_reported_and_ignored(built, monkeypatch):
+    assert assets.check_build()
+    assert assets.manifest()["files"]["css/style.css"] == built["files"]["css/style.css"]
+
+    with open(f"{assets.STATIC_DIR}/css/style.css", "a") as f:
+        f.write("p { color: red; }\n")
+    monkeypatch.setattr(assets, "_manifest_mtime", None)  # as after a restart
+    assert not assets.check_build()
+    assert assets.manifest() is None
@@ -0,0 +1,113 @@
+"""/api/dashboard: live values plus columnar rain/sound history, deltas, 304s and MessagePack."""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as webapp
+import sampler
+
+START = datetime(2026, 1, 1, 12, 0, 0)
+EPOCH_MS = int((START - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+def _snapshot(sound_percent=41.7, version=1):
+    return sampler.Snapshot(
+        dht={"temperature": 21.0, "humidity": 48.0, "cached": False},
+        rain={"rain_detected": False, "value": 0.0, "sampled_at": "2026-01-01T12:00:05Z"},
+        sound={"sound_detected": False, "percent": sound_percent, "sampled_at": "2026-01-01T12:00:05Z"},
+        alert={"alert_active": False}, status=None, updated_at=1767268805.0 + version, version=version)
+
+
+@pytest.fixture(autouse=True)
+def readings(db, monkeypatch):
+    monkeypatch.setattr(webapp, "snapshot_source", sampler)
+    monkeypatch.setattr(sampler, "_snapshot", _snapshot())
+    for i, value in enumerate([0, 0, 1, 1]):
+        db.insert_raindrop(value, START + timedelta(seconds=i))
+    for i in range(3):
+        db.insert_sound(10.0 * (i + 1), START + timedelta(seconds=i))
+    assert db.flush()
+
+
+def test_columnar_shape(client):
+    body = client.get("/api/dashboard").get_json()
+    assert body["live"] == {"temperature": 21.0, "humidity": 48.0, "dht_cached": False, "rain": False,
+                            "rain_value": 0.0, "sound": False, "sound_percent": 42.0, "alert": False}
+    # two runs, each drawn as its start and end point
+    assert body["rain"]["ts"] == [EPOCH_MS, EPOCH_MS + 2000, EPOCH_MS + 2000, EPOCH_MS + 3000]
+    assert body["rain"]["value"] == [0.0, 0.0, 1.0, 1.0]
+    assert body["sound"]["ts"] == [EPOCH_MS, EPOCH_MS + 1000, EPOCH_MS + 2000]
+    assert body["sound"]["value"] == [10.0, 20.0, 30.0]
+    assert body["rain"]["last_id"] and body["sound"]["last_id"]
+
+    iso = client.get("/api/dashboard?ts=iso&n=2").get_json()
+    assert iso["sound"]["ts"] == ["2026-01-01T12:00:01Z", "2026-01-01T12:00:02Z"]
+    assert client.get("/api/dashboard?ts=unix").status_code == 400
+
+
+def test_deltas_include_the_moving_end_of_the_open_run(client, db):
+    first = client.get("/api/dashboard").get_json()
+    rain_id, rain_ts, sound_id = first["rain"]["last_id"], first["rain"]["ts"][-1], first["sound"]["last_id"]
+    query = f"rain_since={rain_id}&rain_since_ts={rain_ts}&sound_since={sound_id}"
+
+    assert client.get(f"/api/dashboard?{query}").get_json()["rain"]["ts"] == []
+
+    # the open rain run grows by two seconds, and one new sound row arrives
+    for i in (4, 5):
+        db.insert_raindrop(1, START + timedelta(seconds=i))
+    db.insert_sound(90.0, START + timedelta(seconds=5))
+    assert db.flush()
+    delta = client.get(f"/api/dashboard?{query}").get_json()
+    assert delta["rain"] == {"last_id": rain_id, "ts": [EPOCH_MS + 5000], "value": [1.0]}
+    assert delta["sound"]["ts"] == [EPOCH_MS + 5000]
+    assert delta["sound"]["value"] == [90.0]
+    assert delta["sound"]["last_id"] > sound_id
+
+    assert client.get("/api/dashboard?rain_since_ts=soon").status_code == 400
+
+
+def test_repeat_poll_is_304_until_a_displayed_value_changes(client, monkeypatch):
+    first = client.get("/api/dashboard")
+    etag = first.headers["ETag"]
+
+    # new sampler ticks that do not change what the dashboard shows
+    monkeypatch.setattr(sampler, "_snapshot", _snapshot(sound_percent=41.9, version=7))
+    again = client.get("/api/dashboard", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+
+    monkeypatch.setattr(sampler, "_snapshot", _snapshot(sound_percent=55.0, version=8))
+    changed = client.get("/api/dashboard", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.get_json()["live"]["sound_percent"] == 55.0
+
+
+class _FakeMsgpack:
+    @staticmethod
+    def packb(body):
+        return b"MSGPACK" + json.dumps(body).encode()
+
+
+def test_msgpack_negotiation(client, monkeypatch):
+    monkeypatch.setattr(webapp, "msgpack", _FakeMsgpack)
+    packed = client.get("/api/dashboard", headers={"Accept": "application/msgpack"})
+    assert packed.mimetype == "application/msgpack"
+    assert json.loads(packed.data[len(b"MSGPACK"):])["sound"]["value"] == [10.0, 20.0, 30.0]
+
+    plain = client.get("/api/dashboard", headers={"Accept": "application/json"})
+    assert plain.mimetype == "application/json"
+    # one URL, two representations: caches must key on Accept, and the ETags differ
+    assert "Accept" in packed.headers["Vary"]
+    assert packed.headers["ETag"] != plain.headers["ETag"]
+
+    # without the package MessagePack requests fall back to JSON
+    monkeypatch.setattr(webapp, "msgpack", None)
+    fallback = client.get("/api/dashboard", headers={"Accept": "application/msgpack"})
+    assert fallback.mimetype == "application/json"
+
+
+def test_real_msgpack_round_trip(client):
+    msgpack = pytest.importorskip("msgpack")
+    packed = client.get("/api/dashboard", headers={"Accept": "application/msgpack"})
+    assert msgpack.unpackb(packed.data) == client.get("/api/dashboard").get_json()
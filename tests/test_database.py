@@ -0,0 +1,61 @@
+"""Pooled WAL connections and the group-committing write-behind queue."""
+import time
+
+import pytest
+
+
+@pytest.fixture
+def commits(db, monkeypatch):
+    """Sizes of the batches the writer commits, with a batch of 5 and no timed drains."""
+    monkeypatch.setattr(db, "BATCH_SIZE", 5)
+    monkeypatch.setattr(db, "FLUSH_INTERVAL_MS", 60000)
+    sizes = []
+    commit = db._commit_batch
+
+    def counted(batch, spill_seq=None):
+        sizes.append(len(batch))
+        return commit(batch, spill_seq)
+
+    monkeypatch.setattr(db, "_commit_batch", counted)
+    return sizes
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_connections_use_wal_and_the_configured_sync_level(db):
+    with db._reader() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == db.BUSY_TIMEOUT_MS
+    # a returned connection is reused, not reopened
+    with db._reader() as again:
+        assert again is conn
+
+
+def test_readings_are_group_committed(db, commits):
+    for i in range(4):
+        db.insert_raindrop(i % 2)
+    time.sleep(0.1)
+    assert commits == []  # below BATCH_SIZE and the interval is far away
+
+    db.insert_raindrop(0)
+    assert _wait_for(lambda: commits == [5])
+    with db._reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM raindrops").fetchone()[0] == 5  # 0/1 alternate: a run each
+
+    db.insert_raindrop(1)
+    db.insert_raindrop(0)
+    assert db.flush()
+    assert commits == [5, 2]
+
+
+def test_close_commits_what_is_queued(db, commits):
+    db.insert_raindrop(1)
+    db.close()
+    assert commits == [1]
+    assert [r["value"] for r in db.get_last_raindrops(10)] == [1.0]
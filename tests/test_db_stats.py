@@ -0,0 +1,13 @@
+"""/api/db/stats: database figures everywhere, retention status only where retention runs."""
+import pytest
+
+import app as webapp
+
+
+@pytest.mark.parametrize("owner", [True, False])
+def test_retention_status_only_in_the_owner(client, monkeypatch, owner):
+    monkeypatch.setattr(webapp, "owns_hardware", owner)
+    body = client.get("/api/db/stats").get_json()
+    assert body["success"]
+    assert "sound_readings" in str(body["db"])
+    assert (body["retention"] is not None) == owner
@@ -0,0 +1,54 @@
+"""Delta fetches on /api/sounds and /api/raindrops: ?since_id= returns only the newer rows."""
+from datetime import datetime, timedelta
+
+START = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def _sounds(db, values, offset=0):
+    # callers pass values that jump past the storage deadband, so each one is kept as a row
+    for i, value in enumerate(values):
+        db.insert_sound(value, START + timedelta(seconds=offset + i))
+    assert db.flush()
+
+
+def test_sounds_since_id(client, db):
+    _sounds(db, [0.0, 50.0, 0.0, 50.0])
+    full = client.get("/api/sounds?n=3").get_json()
+    ids = [r["id"] for r in full["rows"]]
+    assert len(ids) == 3 and ids == sorted(ids) and full["last_id"] == ids[-1]
+
+    empty = client.get(f"/api/sounds?n=3&since_id={ids[-1]}").get_json()
+    assert empty["rows"] == [] and empty["last_id"] == ids[-1]
+
+    _sounds(db, [0.0, 90.0], offset=10)
+    delta = client.get(f"/api/sounds?n=3&since_id={ids[-1]}").get_json()
+    assert [r["value"] for r in delta["rows"]] == [0.0, 90.0]
+    assert [r["id"] for r in delta["rows"]][0] > ids[-1] and delta["last_id"] == delta["rows"][-1]["id"]
+
+
+def test_since_id_is_capped_at_n(client, db):
+    _sounds(db, [0.0, 50.0] * 5)
+    delta = client.get("/api/sounds?n=3&since_id=0&ts=epoch_ms&shape=columns").get_json()
+    columns = delta["columns"]
+    assert columns["value"] == [50.0, 0.0, 50.0]  # the newest n, oldest first
+    assert all(isinstance(ts, int) for ts in columns["ts"])
+    assert delta["last_id"] == columns["id"][-1]
+
+
+def test_raindrops_since_id_returns_new_runs(client, db):
+    for i, value in enumerate([0, 0, 1]):
+        db.insert_raindrop(value, START + timedelta(seconds=i))
+    assert db.flush()
+    last_id = client.get("/api/raindrops?n=10").get_json()["last_id"]
+
+    db.insert_raindrop(0, START + timedelta(seconds=3))
+    assert db.flush()
+    delta = client.get(f"/api/raindrops?n=10&since_id={last_id}").get_json()
+    assert [r["value"] for r in delta["rows"]] == [0.0]
+    assert delta["last_id"] == last_id + 1
+
+
+def test_bad_since_id_is_ignored(client, db):
+    _sounds(db, [0.0, 50.0])
+    assert client.get("/api/sounds?n=5&since_id=abc").get_json()["rows"] == \
+        client.get("/api/sounds?n=5").get_json()["rows"]
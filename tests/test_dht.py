@@ -0,0 +1,88 @@
+"""DHT11 worker path: cached reads, staleness metadata, success ratio and fallback counting."""
+import time
+from collections import deque
+
+import pytest
+
+import dht
+import hal
+
+
+class _Sensor(hal.SimBackend):
+    """Backend whose DHT reads return the queued results (True = valid 21 °C / 40 %)."""
+
+    def __init__(self):
+        super().__init__()
+        self.results = deque()
+
+    def read_dht(self, pin):
+        valid = self.results.popleft()
+        return hal.DHTResult(valid, 21 if valid else 0, 40 if valid else 0)
+
+
+@pytest.fixture
+def sensor(monkeypatch):
+    backend = _Sensor()
+    monkeypatch.setattr(hal, "_backend", backend)
+    monkeypatch.setattr(dht, "last_valid_reading",
+                        {"temperature": None, "humidity": None, "error": "Waiting for first reading...", "attempts": 0})
+    monkeypatch.setattr(dht, "_outcomes", deque(maxlen=dht.STATS_WINDOW))
+    monkeypatch.setattr(dht, "_stats", {"reads": 0, "failures": 0, "consecutive_failures": 0})
+    monkeypatch.setattr(dht, "_sampled_at", None)
+    monkeypatch.setattr(dht, "_last_attempt", None)
+    return backend
+
+
+def _sample(sensor, monkeypatch, valid):
+    sensor.results.append(valid)
+    monkeypatch.setattr(dht, "_last_attempt", None)  # skip the MIN_INTERVAL wait
+    return dht.sample_dht()
+
+
+def _fallbacks():
+    return {reason: dht._fallbacks.value(reason) for reason in ("restored", "read_failed", "no_data")}
+
+
+def test_fallbacks_count_failed_reads_not_api_calls(sensor, monkeypatch):
+    before = _fallbacks()
+    _sample(sensor, monkeypatch, False)
+    _sample(sensor, monkeypatch, True)
+    _sample(sensor, monkeypatch, False)
+    for _ in range(50):
+        dht.read_dht()  # what /api/dht does: no hardware read, no count
+    after = _fallbacks()
+    assert after["no_data"] - before["no_data"] == 1
+    assert after["read_failed"] - before["read_failed"] == 1
+    assert after["restored"] == before["restored"]
+
+
+def test_reads_closer_than_min_interval_serve_the_cache(sensor, monkeypatch):
+    first = _sample(sensor, monkeypatch, True)
+    again = dht.sample_dht()  # no result queued: a hardware read would raise
+    assert again["temperature"] == first["temperature"] == 21
+    assert not again["cached"] and again["reads"] == 1
+
+
+def test_staleness_metadata_and_success_ratio(sensor, monkeypatch):
+    for valid in (True, False, False, True, False):
+        data = _sample(sensor, monkeypatch, valid)
+    assert data["cached"] and data["temperature"] == 21
+    assert data["success_ratio"] == 0.4
+    assert (data["reads"], data["failures"]) == (5, 3)
+
+    monkeypatch.setattr(dht, "_sampled_at", time.time() - 3.0)
+    data = dht.read_dht()
+    assert 3000 <= data["age_ms"] < 4000
+    assert data["sampled_at"].endswith("Z")
+
+
+def test_failures_back_off_from_the_minimum_interval(sensor, monkeypatch):
+    assert dht.next_interval() == dht.MIN_INTERVAL
+    intervals = []
+    for _ in range(8):
+        _sample(sensor, monkeypatch, False)
+        intervals.append(dht.next_interval())
+    assert intervals[0] == dht.MIN_INTERVAL  # too few reads to judge: a few quick retries
+    assert intervals == sorted(intervals) and intervals[-1] == dht.MAX_INTERVAL
+    _sample(sensor, monkeypatch, True)
+    assert dht.next_interval() == dht.MIN_INTERVAL
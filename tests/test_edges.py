@@ -0,0 +1,85 @@
+"""Edge-callback counting: events, duty cycle and the window, and the alert rule reading them."""
+import pytest
+
+import alerts
+import edges
+import hal
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return 1000.0 + self.now
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(edges, "time", clock)
+    m = edges.EdgeMonitor(13, active_low=True, window=5.0)
+    m._level = hal.HIGH  # what start() reads before registering the callback
+
+    def edge(t, level):
+        clock.now = t
+        m._on_edge(13, level)
+
+    m.edge = edge
+    m.clock = clock
+    return m
+
+
+def test_events_and_duty_cycle(monitor):
+    monitor.edge(1.0, hal.LOW)
+    monitor.edge(1.001, hal.LOW)  # bounce: the level did not change
+    monitor.edge(2.0, hal.HIGH)
+    monitor.edge(3.0, hal.LOW)
+    monitor.edge(3.5, hal.HIGH)
+    monitor.clock.now = 4.0
+    stats = monitor.stats()
+    assert stats["events"] == 2 and stats["total_events"] == 2
+    assert stats["duty_cycle"] == pytest.approx(1.5 / 5.0)
+    assert not stats["active"]
+    assert stats["last_event"] == pytest.approx(1003.0)
+
+
+def test_old_edges_leave_the_window(monitor):
+    monitor.edge(1.0, hal.LOW)
+    monitor.edge(2.0, hal.HIGH)
+    monitor.edge(3.0, hal.LOW)
+    monitor.clock.now = 7.5
+    stats = monitor.stats()
+    # the 1.0-2.0 activation is gone; the pin is still active since 3.0
+    assert stats["events"] == 1 and stats["total_events"] == 2
+    assert stats["active"] and stats["duty_cycle"] == pytest.approx(4.5 / 5.0)
+    assert monitor.stats(window=1.0)["events"] == 0
+
+
+def test_start_registers_with_the_backend(monkeypatch):
+    backend = hal.SimBackend(edge_redraw_probability=0.0)
+    monkeypatch.setattr(hal, "_backend", backend)
+    backend.setup_input(13, label="rain")
+    m = edges.EdgeMonitor(13)
+    assert m.start() and m.running
+    assert not edges.EdgeMonitor(13).start()  # the pin already has a callback
+    m.stop()
+    assert not m.running and 13 not in backend._watchers
+
+
+def test_alert_counts_activity_between_polls(db):
+    # both pins read idle right now, but each was active inside the window
+    quiet = {"active": False, "events": 1, "duty_cycle": 0.2}
+    readings = {"rain": {"rain_detected": False, "edges": quiet},
+                "sound": {"sound_detected": False, "edges": quiet}}
+    alerts.reset()
+    try:
+        alerts.evaluate(readings, now=0.0)
+        summary = alerts.evaluate(readings, now=1.0)
+        assert "rain_and_sound" in summary["active_rules"]
+        assert summary["rain_events"] == summary["sound_events"] == 1
+    finally:
+        alerts.reset()
@@ -0,0 +1,69 @@
+"""History ETags: stable while a table is unchanged, identical in every process."""
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+import database
+
+
+def _fill(db):
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    for i in range(20):
+        db.insert_sound(float(i * 10), start + timedelta(seconds=i * 2))
+    assert db.flush()
+
+
+def _version_in_subprocess(path, table):
+    code = ("import database, sys; database.DB_PATH = sys.argv[1]; "
+            "print(database.table_version(sys.argv[2])[0])")
+    return subprocess.run([sys.executable, "-c", code, path, table], check=True, capture_output=True,
+                          text=True, cwd=os.path.dirname(os.path.abspath(database.__file__))).stdout.strip()
+
+
+def test_304_when_only_other_data_was_written(client, db):
+    _fill(db)
+    first = client.get("/api/sounds?n=10")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    # rollup-only and other-table commits do not touch sound_readings
+    for i in range(3):
+        db.record_sample("temperature", 20.0 + i)
+        db.insert_raindrop(i % 2)
+        assert db.flush()
+    again = client.get("/api/sounds?n=10", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+    db.insert_sound(99.0)
+    assert db.flush()
+    changed = client.get("/api/sounds?n=10", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_version_is_the_same_in_every_process(db):
+    _fill(db)
+    owner = db.table_version("sound_readings")[0]
+    # the owner keeps writing, but only rollups
+    db.record_sample("humidity", 50.0)
+    assert db.flush()
+    workers = {_version_in_subprocess(db.DB_PATH, "sound_readings") for _ in range(2)}
+    assert workers == {owner}
+
+
+def test_read_only_process_follows_data_version(db):
+    _fill(db)
+    before = db.table_version("sound_readings")
+    db.close()  # no writer thread: the data_version branch is used
+    assert db.table_version("sound_readings") == before
+    conn = db._connect()
+    conn.execute("INSERT INTO rollup_1m (sensor, bucket, count, sum, min, max) VALUES ('x', 0, 1, 1, 1, 1)")
+    conn.commit()
+    assert db.table_version("sound_readings") == before
+    conn.execute("INSERT INTO sound_readings (value, ts) VALUES (1.0, '2026-01-01 13:00:00')")
+    conn.commit()
+    conn.close()
+    assert db.table_version("sound_readings")[0] != before[0]
@@ -0,0 +1,49 @@
+"""History export: the bin format round-trips and agrees with csv/ndjson."""
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import export
+
+START = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture(autouse=True)
+def dht_rows(db, monkeypatch):
+    monkeypatch.setattr(export, "BATCH_SIZE", 3)  # several blocks per export
+    for i in range(8):
+        db.insert_dht(20.0 + i / 2, 40.0 + i, START + timedelta(seconds=30 * i))
+    assert db.flush()
+
+
+def test_bin_round_trip(client):
+    response = client.get("/api/export/dht?format=bin")
+    assert response.status_code == 200
+    assert response.mimetype == "application/octet-stream"
+    header, columns = export.read_binary(response.data)
+    assert header == {"sensor": "dht", "columns": ["temperature", "humidity"]}
+    epoch_ms = int((START - datetime(1970, 1, 1)).total_seconds() * 1000)
+    assert columns["ts"] == [epoch_ms + 30_000 * i for i in range(8)]
+    assert columns["temperature"] == [20.0 + i / 2 for i in range(8)]
+    assert columns["humidity"] == [40.0 + i for i in range(8)]
+
+
+def test_formats_agree(client):
+    _, binary = export.read_binary(client.get("/api/export/dht?format=bin").data)
+    rows = list(csv.DictReader(io.StringIO(client.get("/api/export/dht?format=csv&ts=epoch_ms").get_data(as_text=True))))
+    lines = client.get("/api/export/dht?format=ndjson&ts=epoch_ms").get_data(as_text=True).splitlines()
+    objects = [json.loads(line) for line in lines if line]
+    assert [int(r["ts"]) for r in rows] == [o["ts"] for o in objects] == binary["ts"]
+    assert [float(r["temperature"]) for r in rows] == [o["temperature"] for o in objects] == binary["temperature"]
+
+
+def test_empty_range_and_bad_input(client):
+    header, columns = export.read_binary(client.get("/api/export/sound?format=bin").data)
+    assert header["columns"] == ["value"] and columns == {"ts": [], "value": []}
+    assert client.get("/api/export/dht?format=xml").status_code == 400
+    assert client.get("/api/export/nope").status_code == 404
+    with pytest.raises(ValueError):
+        export.read_binary(b"nope")
@@ -0,0 +1,53 @@
+"""Simulated backend: seeded, per-stream deterministic readings and its knobs."""
+import pytest
+
+import hal
+
+FAST = {"gpio_latency": 0, "dht_latency": 0, "i2c_latency": 0}
+
+
+def _dht(backend, n=20):
+    return [(r.is_valid(), r.temperature, r.humidity) for r in (backend.read_dht(4) for _ in range(n))]
+
+
+def test_same_seed_same_readings():
+    a, b = hal.SimBackend(**FAST), hal.SimBackend(**FAST)
+    assert _dht(a) == _dht(b)
+    for backend in (a, b):
+        backend.setup_input(17, label="rain")
+    assert [a.input(17) for _ in range(50)] == [b.input(17) for _ in range(50)]
+    assert a.open_smbus(1).read_i2c_block_data(0x48, 0x44, 32) == b.open_smbus(1).read_i2c_block_data(0x48, 0x44, 32)
+
+    assert _dht(hal.SimBackend(seed=99, **FAST)) != _dht(hal.SimBackend(**FAST))
+
+
+def test_streams_do_not_depend_on_interleaving():
+    alone = _dht(hal.SimBackend(**FAST))
+    mixed = hal.SimBackend(**FAST)
+    mixed.setup_input(17, label="rain")
+    bus = mixed.open_smbus(1)
+    readings = []
+    for _ in range(20):
+        mixed.input(17)
+        bus.read_byte(0x48)
+        readings.extend(_dht(mixed, 1))
+    assert readings == alone
+
+
+def test_failure_rates_and_env_overrides(monkeypatch):
+    assert not any(valid for valid, _, _ in _dht(hal.SimBackend(dht_failure_rate=1.0, **FAST)))
+    monkeypatch.setenv("SENSOR_SIM_DHT_FAILURE_RATE", "0")
+    backend = hal.SimBackend(**FAST)
+    assert backend.config["dht_failure_rate"] == 0.0
+    assert all(valid for valid, _, _ in _dht(backend))
+
+    bus = hal.SimBackend(i2c_failure_rate=1.0, **FAST).open_smbus(1)
+    with pytest.raises(OSError):
+        bus.read_byte(0x48)
+
+
+def test_unknown_backend_name(monkeypatch):
+    monkeypatch.setattr(hal, "_backend", None)
+    monkeypatch.setenv("SENSOR_BACKEND", "arduino")
+    with pytest.raises(ValueError):
+        hal.get_backend()
@@ -0,0 +1,33 @@
+"""/api/history/<sensor> and its /api/dht/history alias."""
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def dht_rows(db):
+    start = datetime.utcnow() - timedelta(minutes=10)
+    for i in range(5):
+        db.insert_dht(20.0 + i, 50.0 + i, start + timedelta(minutes=i))
+    assert db.flush()
+
+
+@pytest.mark.parametrize("query", ["", "?limit=3", "?points=10&ts=epoch_ms", "?shape=columns", "?resolution=1m"])
+def test_dht_alias_matches_history(client, query):
+    alias = client.get(f"/api/dht/history{query}")
+    generic = client.get(f"/api/history/dht{query}")
+    assert alias.status_code == generic.status_code == 200
+    assert alias.get_json() == generic.get_json()
+    assert alias.get_json()["sensor"] == "dht"
+
+
+def test_raw_dht_rows(client):
+    body = client.get("/api/dht/history?limit=2").get_json()
+    assert body["resolution"] == "raw"
+    assert [(r["temperature"], r["humidity"]) for r in body["rows"]] == [(23.0, 53.0), (24.0, 54.0)]
+
+
+def test_bad_arguments(client):
+    assert client.get("/api/dht/history?resolution=5s").status_code == 400
+    assert client.get("/api/dht/history?from=yesterday-ish").status_code == 400
+    assert client.get("/api/history/nope").status_code == 404
@@ -0,0 +1,49 @@
+"""read_history() output matches the per-row Python formatting get_last_sounds() used to do."""
+import sqlite3
+from datetime import datetime, timedelta
+
+
+def _old_get_last_sounds(path, limit):
+    """The original implementation: PARSE_DECLTYPES rows, reversed and formatted one by one."""
+    conn = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES)
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute("SELECT id, value, ts FROM sound_readings ORDER BY ts DESC LIMIT ?", (limit,)).fetchall()
+    conn.close()
+    out = []
+    for r in reversed(rows):
+        ts = r["ts"]
+        if isinstance(ts, datetime):
+            ts_iso = ts.isoformat() + "Z"
+        else:
+            s = str(ts) if ts is not None else ""
+            ts_iso = s.replace(" ", "T") + "Z" if s and "T" not in s else s
+        out.append({"id": r["id"], "value": r["value"], "ts": ts_iso})
+    return out
+
+
+def _fill(db):
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    for i in range(6):
+        # whole seconds and fractional ones; values jump past the storage deadband
+        db.insert_sound(float(i % 2 * 50), start + timedelta(seconds=i, microseconds=250000 * (i % 3)))
+    assert db.flush()
+    # a legacy row stamped by the column default (CURRENT_TIMESTAMP)
+    db.run_on_writer(lambda conn: conn.execute("INSERT INTO sound_readings (value) VALUES (7.0)"),
+                     tables=("sound_readings",))
+
+
+def test_rows_match_the_old_formatting(db):
+    _fill(db)
+    for limit in (1, 4, 10):
+        assert db.get_last_sounds(limit) == _old_get_last_sounds(db.DB_PATH, limit)
+
+
+def test_columns_and_epoch_ms_carry_the_same_rows(db):
+    _fill(db)
+    rows = db.get_last_sounds(10)
+    columns = db.get_last_sounds(10, columnar=True)
+    assert columns == {key: [r[key] for r in rows] for key in ("ts", "id", "value")}
+
+    epoch = db.get_last_sounds(10, time_format="epoch_ms", columnar=True)["ts"]
+    parsed = [datetime.fromisoformat(ts.rstrip("Z")) for ts in columns["ts"]]
+    assert epoch == [round((ts - datetime(1970, 1, 1)).total_seconds() * 1000) for ts in parsed]
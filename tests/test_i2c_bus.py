@@ -0,0 +1,93 @@
+"""I2C bus manager: coalesced requests, retries after a reopen, and multi-channel PCF8591 blocks."""
+import threading
+import time
+
+import pytest
+
+import hal
+import i2c_bus
+import soundsensor
+
+
+class _Channels(hal.SimBackend):
+    """PCF8591 whose input N always converts to 10 + 50 * N."""
+
+    def __init__(self):
+        super().__init__(i2c_latency=0)
+
+    def _adc_sample(self, channel):
+        return 10 + 50 * channel
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(hal, "_backend", _Channels())
+    bus = i2c_bus.BusManager(1)
+    yield bus
+    bus.stop()
+
+
+def test_queued_requests_with_one_key_share_a_transaction(manager):
+    release = threading.Event()
+    manager.request(0x48, None, lambda bus: None)  # start the thread
+    blocker = threading.Thread(target=manager.request, args=(0x10, None, lambda bus: release.wait(5)))
+    blocker.start()
+
+    calls = []
+    results = []
+
+    def read(bus):
+        calls.append(1)
+        return bus.read_byte(0x48)
+
+    readers = [threading.Thread(target=lambda: results.append(manager.request(0x48, "adc", read)))
+               for _ in range(3)]
+    for t in readers:
+        t.start()
+    deadline = time.monotonic() + 5
+    # the blocker holds the bus until all three are queued
+    while manager.stats()["devices"]["0x48"]["coalesced"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for t in readers + [blocker]:
+        t.join(5)
+    assert len(calls) == 1 and len(results) == 3 and len(set(results)) == 1
+    assert manager.stats()["devices"]["0x48"]["coalesced"] == 2
+
+
+def test_failed_request_is_retried_on_a_reopened_bus(manager, monkeypatch):
+    monkeypatch.setattr(i2c_bus, "REOPEN_DELAY", 0)
+    handles = []
+
+    def flaky(bus):
+        handles.append(bus)
+        if len(handles) == 1:
+            raise OSError(5, "Input/output error")
+        return 42
+
+    assert manager.request(0x48, None, flaky) == 42
+    assert handles[0] is not handles[1] and handles[0].closed
+    device = manager.stats()["devices"]["0x48"]
+    assert (device["transactions"], device["errors"], device["retries"]) == (2, 1, 1)
+    assert manager.stats()["reopens"] == 1
+
+
+def test_one_block_carries_every_channel(manager, monkeypatch):
+    monkeypatch.setattr(soundsensor, "_manager", lambda: manager)
+    monkeypatch.setattr(soundsensor, "PCF8591_CHANNELS", {0: "sound", 1: "light"})
+    monkeypatch.setattr(soundsensor, "BLOCK_SIZE", 29)
+    monkeypatch.setattr(soundsensor, "WINDOW_SIZE", 7)
+    monkeypatch.setattr(soundsensor, "_ring", bytearray(soundsensor.RING_SIZE))
+    monkeypatch.setattr(soundsensor, "_ring_pos", 0)
+    monkeypatch.setattr(soundsensor, "_features", None)
+    monkeypatch.setattr(soundsensor, "_window_since", 0)
+    monkeypatch.setattr(soundsensor, "_window_started", None)
+    monkeypatch.setattr(soundsensor, "_channel_sums", {})
+    monkeypatch.setattr(soundsensor, "_channel_levels", {})
+
+    block = manager.request(soundsensor.PCF8591_I2C_ADDR, None, soundsensor._read_block)
+    soundsensor._on_block(block)
+    assert manager.stats()["devices"]["0x48"]["transactions"] == 1
+    # 28 fresh bytes: 7 interleaved conversions of each of the four inputs
+    assert soundsensor._features["samples"] == 7 and soundsensor._features["mean"] == 10
+    assert soundsensor.analog_levels() == {"light": {"raw": 60.0, "voltage": round(60 / 255 * soundsensor.VREF, 3)}}
@@ -0,0 +1,76 @@
+"""Metrics registry rendered in the Prometheus text format, in each SENSORS_METRICS mode."""
+import re
+
+import pytest
+
+import metrics
+
+# name{labels} value, as the text exposition format (0.0.4) expects
+SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_]\w*="[^"]*",?)*\})? \S+$')
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(metrics, "_registry", [])
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    monkeypatch.setattr(metrics, "BUCKETED", True)
+    return metrics
+
+
+def test_counter_and_gauge_text(registry):
+    reads = registry.counter("sensor_reads_total", "Reads by result.", ("result",))
+    reads.inc("ok")
+    reads.inc("ok")
+    reads.inc("failed", amount=3)
+    registry.gauge("queue_depth", "Waiting writes.", lambda: 4)
+    registry.gauge("unknown", "Not available.", lambda: None)
+    registry.gauge("broken", "Raises.", lambda: 1 / 0)
+    assert registry.render() == (
+        "# HELP sensor_reads_total Reads by result.\n"
+        "# TYPE sensor_reads_total counter\n"
+        'sensor_reads_total{result="failed"} 3\n'
+        'sensor_reads_total{result="ok"} 2\n'
+        "# HELP queue_depth Waiting writes.\n"
+        "# TYPE queue_depth gauge\n"
+        "queue_depth 4\n"
+    )
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    latency = registry.histogram("read_seconds", "Read latency.", buckets=(0.01, 0.1))
+    for value in (0.005, 0.05, 0.05, 3.0):
+        latency.observe(value)
+    assert registry.render().splitlines()[2:] == [
+        'read_seconds_bucket{le="0.01"} 1',
+        'read_seconds_bucket{le="0.1"} 3',
+        'read_seconds_bucket{le="+Inf"} 4',
+        "read_seconds_count 4",
+        "read_seconds_sum 3.105000",
+    ]
+
+
+def test_basic_and_off_modes(registry, monkeypatch):
+    latency = registry.histogram("read_seconds", "Read latency.", ("sensor",))
+    monkeypatch.setattr(metrics, "BUCKETED", False)
+    latency.observe(0.2, "dht")
+    assert registry.render().splitlines()[2:] == ['read_seconds_count{sensor="dht"} 1',
+                                                  'read_seconds_sum{sensor="dht"} 0.200000']
+
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    latency.observe(0.2, "dht")
+    with latency.time("dht"):
+        pass
+    assert latency.count("dht") == 1
+    assert registry.render() == ""
+
+
+def test_api_metrics_is_valid_exposition_text(client):
+    client.get("/api/sensors")
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert response.mimetype_params["version"] == "0.0.4"
+    lines = response.get_data(as_text=True).splitlines()
+    assert any(line.startswith("http_request_seconds_bucket{") for line in lines)
+    for line in lines:
+        assert line.startswith(("# HELP ", "# TYPE ")) or SAMPLE_LINE.match(line), line
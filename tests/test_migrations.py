@@ -0,0 +1,79 @@
+"""Schema migrations: a pre-migration sensors.db is upgraded in place, once."""
+import sqlite3
+
+import pytest
+
+import database
+
+
+@pytest.fixture
+def legacy_path(tmp_path, monkeypatch):
+    """A database file as the original app created it (user_version 0), not yet opened by database.py."""
+    database.close()
+    path = str(tmp_path / "sensors.db")
+    monkeypatch.setattr(database, "DB_PATH", path)
+    monkeypatch.setattr(database, "SPILL_PATH", path + "-spill")
+    monkeypatch.setattr(database, "_schema_ready", False)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE raindrops (id INTEGER PRIMARY KEY AUTOINCREMENT, value REAL NOT NULL,
+                                ts DATETIME DEFAULT CURRENT_TIMESTAMP);
+        CREATE TABLE sound_readings (id INTEGER PRIMARY KEY AUTOINCREMENT, value REAL NOT NULL,
+                                     ts DATETIME DEFAULT CURRENT_TIMESTAMP);
+        INSERT INTO raindrops (value, ts) VALUES (0.0, '2026-01-01 10:00:00'), (1.0, '2026-01-01 10:00:05');
+        INSERT INTO sound_readings (value, ts) VALUES (42.0, '2026-01-01 10:00:00');
+    """)
+    conn.commit()
+    conn.close()
+    yield path
+    database.close()
+
+
+def _schema(path):
+    conn = sqlite3.connect(path)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        rain_columns = [r[1] for r in conn.execute("PRAGMA table_info(raindrops)")]
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        return version, tables, indexes, rain_columns, auto_vacuum
+    finally:
+        conn.close()
+
+
+def test_legacy_database_is_upgraded_with_its_rows(legacy_path):
+    database.init_db()
+    version, tables, indexes, rain_columns, auto_vacuum = _schema(legacy_path)
+    assert version == len(database.MIGRATIONS)
+    assert {"dht_readings", "alert_events", "spill_state"} <= tables
+    assert {"idx_raindrops_ts", "idx_sound_readings_ts", "idx_dht_readings_ts"} <= indexes
+    assert "end_ts" in rain_columns
+    assert auto_vacuum == 2  # INCREMENTAL
+
+    # existing rows survive and read back through the current code
+    rows = database.get_last_raindrops(10)
+    assert [r["value"] for r in rows] == [0.0, 1.0]
+    assert [r["value"] for r in database.get_last_sounds(10)] == [42.0]
+
+
+def test_migrations_run_once(legacy_path):
+    database.init_db()
+    database.insert_dht(21.0, 40.0)
+    assert database.flush()
+    database.close()
+
+    database._schema_ready = False
+    database.init_db()
+    assert _schema(legacy_path)[0] == len(database.MIGRATIONS)
+    assert database.get_last_dht()["temperature"] == 21.0
+
+
+def test_partially_migrated_database_resumes(legacy_path):
+    conn = sqlite3.connect(legacy_path)
+    conn.executescript(database.MIGRATIONS[0])
+    conn.execute("PRAGMA user_version=1")
+    conn.commit()
+    conn.close()
+    database.init_db()
+    assert _schema(legacy_path)[0] == len(database.MIGRATIONS)
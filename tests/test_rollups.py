@@ -0,0 +1,56 @@
+"""Rollup aggregates and the resolution chosen for a history window."""
+from datetime import datetime, timedelta
+
+import pytest
+
+import rollups
+
+START = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def sound(db):
+    for seconds, value in ((5, 10.0), (10, 20.0), (50, 30.0), (70, 50.0)):
+        db.insert_sound(value, START + timedelta(seconds=seconds))
+    assert db.flush()
+    return db
+
+
+def _buckets(db, sensor, resolution):
+    with db._reader() as conn:
+        rows = rollups.query(conn, sensor, resolution, START, START + timedelta(days=1), time_format="epoch_ms")
+    return [(r["ts"], r["count"], r["value"], r["min"], r["max"]) for r in rows]
+
+
+def test_buckets_hold_count_mean_min_max(sound):
+    epoch = int(rollups.to_epoch(START)) * 1000
+    assert _buckets(sound, "sound", "1m") == [(epoch, 3, 20.0, 10.0, 30.0), (epoch + 60000, 1, 50.0, 50.0, 50.0)]
+    assert _buckets(sound, "sound", "1h") == [(epoch, 4, 27.5, 10.0, 50.0)]
+    assert _buckets(sound, "sound", "1d") == [(epoch - 12 * 3600 * 1000, 4, 27.5, 10.0, 50.0)]
+
+
+def test_batches_merge_into_existing_buckets(sound):
+    sound.insert_sound(0.0, START + timedelta(seconds=20))
+    assert sound.flush()
+    (_, count, mean, low, high), _ = _buckets(sound, "sound", "1m")
+    assert (count, mean, low, high) == (4, 15.0, 0.0, 30.0)
+
+
+@pytest.mark.parametrize("window, points, has_raw, expected", [
+    (600, 1000, True, "raw"),
+    (600, 300, True, "1m"),
+    (600, 300, False, "1m"),
+    (86400, 300, True, "1h"),
+    (7 * 86400, 300, True, "1h"),
+    (30 * 86400, 300, True, "1d"),
+    (365 * 86400, 300, True, "1d"),  # nothing fits: the coarsest
+])
+def test_choose_resolution(window, points, has_raw, expected):
+    assert rollups.choose_resolution(window, points, has_raw) == expected
+
+
+def test_api_picks_the_resolution_for_the_window(client):
+    body = client.get("/api/history/sound?from=-7d&points=300").get_json()
+    assert body["success"] and body["resolution"] == "1h"
+    body = client.get("/api/history/sound?from=-7d&points=300&resolution=1m").get_json()
+    assert body["resolution"] == "1m"
@@ -0,0 +1,67 @@
+"""Run-length rain history: the open run must reach the latest reading."""
+from datetime import datetime, timedelta
+
+
+def _rain(db, values, start):
+    for i, value in enumerate(values):
+        db.insert_raindrop(value, start + timedelta(seconds=i))
+    assert db.flush()
+
+
+def test_open_run_reaches_latest_sample(db):
+    now = datetime.utcnow().replace(microsecond=0)
+    start = now - timedelta(seconds=599)
+    _rain(db, [0] * 350 + [1] * 250, start)
+
+    rows = db.get_last_raindrops(10)
+    assert rows[-1]["value"] == 1.0
+    assert rows[-1]["ts"] == now.isoformat() + "Z"
+
+    # a range starting inside the open run still finds it
+    recent = db.read_history("raindrops", start=now - timedelta(minutes=2), end=now)
+    assert [r["value"] for r in recent] == [1.0, 1.0]
+
+
+def test_extends_are_folded_into_one_row_update(db):
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    _rain(db, [1, 1, 1, 0, 0, 0, 0], start)
+    with db._reader() as conn:
+        rows = conn.execute("SELECT value, ts, end_ts FROM raindrops ORDER BY id").fetchall()
+    assert [(r[0], str(r[1]), str(r[2])) for r in rows] == [
+        (1.0, "2026-01-01 12:00:00", "2026-01-01 12:00:03"),
+        (0.0, "2026-01-01 12:00:03", "2026-01-01 12:00:06"),
+    ]
+
+
+def test_delta_with_since_ts_delivers_run_extension_once(db):
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    _rain(db, [0, 0, 1, 1], start)
+    first = db.get_last_raindrops(10, time_format="epoch_ms", columnar=True)
+    last_id, last_ts = first["id"][-1], first["ts"][-1]
+
+    _rain(db, [1, 1, 1], start + timedelta(seconds=4))
+    delta = db.get_last_raindrops(10, since_id=last_id, since_ts=last_ts, time_format="epoch_ms", columnar=True)
+    assert delta["id"] == [last_id]
+    assert delta["ts"] == [last_ts + 3000]
+
+    again = db.get_last_raindrops(10, since_id=last_id, since_ts=delta["ts"][-1], time_format="epoch_ms", columnar=True)
+    assert again["id"] == []
+
+    # without since_ts the delta stays as before: new runs only
+    assert db.get_last_raindrops(10, since_id=last_id, columnar=True)["id"] == []
+
+
+def test_range_after_a_gap_skips_the_finished_run(db):
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    _rain(db, [1, 1, 1], start)
+    with db._reader() as conn:
+        plan = " ".join(r[3] for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM raindrops WHERE ts < ? ORDER BY ts DESC LIMIT 1", (start,)))
+    assert "idx_raindrops_ts" in plan
+
+    # the run ended at 12:00:02: a range from 12:00:05 has nothing in progress
+    rows = db.read_history("raindrops", start=start + timedelta(seconds=5), end=start + timedelta(hours=1))
+    assert rows == []
+    # from 12:00:01 the run is still in progress
+    rows = db.read_history("raindrops", start=start + timedelta(seconds=1), end=start + timedelta(hours=1))
+    assert [r["value"] for r in rows] == [1.0, 1.0]
@@ -0,0 +1,138 @@
+"""Sampler workers: snapshot publication, degraded status on failing jobs, rate-limited warnings, alerts."""
+import threading
+import time
+
+import pytest
+
+import alerts
+import buzzer
+import hal
+import sampler
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    monkeypatch.setattr(sampler, "FAILURES_TO_DEGRADE", 3)
+    monkeypatch.setattr(sampler, "MAX_FAILURE_BACKOFF", 0.01)
+    monkeypatch.setattr(sampler, "_status", {"probe": {"state": "stopped", "detail": None, "init_ms": None}})
+    threads = []
+
+    def run(job, runs):
+        done = threading.Event()
+        calls = []
+
+        def counted():
+            calls.append(1)
+            if len(calls) >= runs:
+                sampler._stop_event.set()
+                done.set()
+            job(len(calls))
+
+        sampler._stop_event.clear()
+        t = threading.Thread(target=sampler._run, args=("probe", lambda: None, counted, 0.001))
+        t.start()
+        threads.append(t)
+        assert done.wait(5)
+        t.join(5)
+        return sampler.status()["probe"]
+
+    yield run
+    sampler._stop_event.clear()
+
+
+def test_consecutive_failures_degrade_and_recovery_restores(worker, capsys):
+    def job(n):
+        if n <= 5:
+            raise RuntimeError("No module named 'RPi'")
+
+    status = worker(job, 7)
+    assert status["state"] == "ready"
+    out = capsys.readouterr().out
+    assert out.count("probe sampler failed") == 1  # rate-limited
+    assert "recovered after 5 failures" in out
+
+
+def test_failing_job_reports_degraded(worker):
+    def job(n):
+        raise RuntimeError("No module named 'RPi'")
+
+    status = worker(job, 4)
+    assert status["state"] == "degraded"
+    assert "No module named 'RPi'" in status["detail"]
+
+
+def test_dht_without_backend_is_degraded(db, monkeypatch):
+    monkeypatch.setattr(hal, "_backend", None)
+    monkeypatch.setenv("SENSOR_BACKEND", "pi")
+    assert "GPIO backend unavailable" in sampler._init_dht()
+
+
+def test_start_drives_the_buzzer_low(monkeypatch):
+    backend = hal.SimBackend()
+    monkeypatch.setattr(hal, "_backend", backend)
+    monkeypatch.setattr(buzzer, "_pin_ready", False)
+    alerts.start()
+    assert backend._outputs[buzzer.BUZZER_PIN] == hal.LOW
+    # a pin left HIGH (e.g. by a crashed run) is driven LOW again
+    backend._outputs[buzzer.BUZZER_PIN] = hal.HIGH
+    alerts.start()
+    assert backend._outputs[buzzer.BUZZER_PIN] == hal.LOW
+
+
+def test_high_temperature_ignores_cached_readings(db):
+    hot = {"temperature": 40.0, "humidity": 50.0}
+    alerts.reset()
+    try:
+        # a warm-started or cached value never starts the debounce
+        for now in (0.0, 20.0, 100.0):
+            alerts.evaluate({"dht": dict(hot, cached=True)}, now=now)
+        assert "high_temperature" not in alerts.evaluate({"dht": dict(hot, cached=True)}, now=200.0)["active_rules"]
+
+        alerts.evaluate({"dht": dict(hot, cached=False)}, now=300.0)
+        assert "high_temperature" in alerts.evaluate({"dht": dict(hot, cached=False)}, now=311.0)["active_rules"]
+    finally:
+        alerts.reset()
+
+
+def test_publish_swaps_in_a_new_snapshot(monkeypatch):
+    empty = sampler.Snapshot(dht=None, rain=None, sound=None, alert=None, status=None, updated_at=None, version=7)
+    monkeypatch.setattr(sampler, "_snapshot", empty)
+    with sampler._publish_lock:
+        sampler._publish(rain={"value": 1})
+    published = sampler.get_snapshot()
+    assert published is not empty and empty.rain is None  # the old snapshot is never mutated
+    assert published.version == 8 and published.rain == {"value": 1} and published.updated_at is not None
+
+    body = sampler.snapshot_to_dict(published, now=published.updated_at + 1.5)
+    assert body["rain"] == {"value": 1} and body["age_ms"] == 1500
+
+
+def test_wait_for_update_wakes_on_publish(monkeypatch):
+    monkeypatch.setattr(sampler, "_snapshot", sampler._snapshot._replace(version=0))
+
+    def publish():
+        with sampler._publish_lock:
+            sampler._publish(sound={"percent": 5})
+
+    publisher = threading.Timer(0.05, publish)
+    publisher.start()
+    assert sampler.wait_for_update(0, timeout=5).sound == {"percent": 5}
+    publisher.join()
+    # nothing new: returns the same snapshot once the timeout passes
+    assert sampler.wait_for_update(1, timeout=0.01).version == 1
+
+
+def test_api_sensors_never_reads_hardware(client, monkeypatch):
+    def no_hardware(*args, **kwargs):
+        raise AssertionError("request path touched a sensor")
+
+    monkeypatch.setattr(sampler.dht, "sample_dht", no_hardware)
+    monkeypatch.setattr(sampler, "read_raindrop", no_hardware)
+    monkeypatch.setattr(sampler, "read_sound", no_hardware)
+    monkeypatch.setattr(hal, "_backend", None)
+    snap = sampler.Snapshot(dht={"temperature": 21.0}, rain={"value": 0}, sound={"percent": 12}, alert=None,
+                            status=None, updated_at=time.time(), version=3)
+    monkeypatch.setattr(sampler, "_snapshot", snap)
+    body = client.get("/api/sensors").get_json()
+    assert body["success"] and body["dht"] == {"temperature": 21.0} and body["sound"] == {"percent": 12}
+    assert 0 <= body["age_ms"] < 5000
@@ -0,0 +1,61 @@
+"""Live chart updates in static/js/script.js, run under node with a stubbed Chart and DOM."""
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "js", "script.js")
+
+pytestmark = pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+
+HARNESS = """
+const fs = require('fs');
+global.document = { addEventListener() {}, getElementById() { return { getContext() { return {}; } }; } };
+global.window = {};
+global.Chart = class { constructor(ctx, cfg) { this.data = cfg.data; } update() {} };
+eval(fs.readFileSync(process.argv[1], 'utf8') + process.argv[2]);
+"""
+
+
+def _run(scenario):
+    out = subprocess.run(["node", "-e", HARNESS, SCRIPT, scenario], check=True, capture_output=True, text=True)
+    return json.loads(out.stdout)
+
+
+def test_sparse_rain_history_keeps_moving():
+    # ten run boundaries a few hours apart, one brief shower among them
+    result = _run("""
+        const t0 = Date.UTC(2026, 0, 1);
+        const ts = [...Array(10).keys()].map(i => t0 + i * 3 * 3600 * 1000);
+        applySeries(null, buildRaindropChart, { ts, value: ts.map((_, i) => i === 9 ? 1 : 0) }, combineMax);
+        const live = ts[9] + 60 * 1000;
+        for (let s = 0; s < 7200; s++) addLivePoint(raindropChart, live + s * 1000, 0);
+        const series = chartSeries.get(raindropChart);
+        console.log(JSON.stringify({ bucketMs: series.bucketMs, ts: series.ts.map(t => t - live),
+                                     data: raindropChart.data.datasets[0].data,
+                                     labels: raindropChart.data.labels.length }));
+    """)
+    assert result["bucketMs"] == 5000
+    # the chart has moved on to the last ten 5 s buckets of dry live samples
+    assert result["ts"] == [7200_000 - 5000 * (10 - i) for i in range(10)]
+    assert result["data"] == [0] * 10
+    assert result["labels"] == 10
+
+
+def test_dense_sound_history_folds_live_samples():
+    result = _run("""
+        const t0 = Date.UTC(2026, 0, 1);
+        const ts = [...Array(10).keys()].map(i => t0 + i * 2000);
+        applySeries(null, buildSoundHistoryChart, { ts, value: ts.map(() => 10) }, combineMean);
+        for (let s = 1; s <= 4; s++) addLivePoint(soundHistoryChart, new Date(ts[9] + 1000 + s * 500).toISOString(), 50);
+        const series = chartSeries.get(soundHistoryChart);
+        console.log(JSON.stringify({ bucketMs: series.bucketMs, ts: series.ts.slice(-2).map(t => t - ts[9]),
+                                     data: soundHistoryChart.data.datasets[0].data.slice(-2) }));
+    """)
+    assert result["bucketMs"] == 2000
+    # +1.5 s folds into the last seeded point (mean of 10 and 50); +2.0 s opens
+    # a new bucket that +2.5 s and +3.0 s fold into
+    assert result["ts"] == [0, 2000]
+    assert result["data"] == [30, 50]
@@ -0,0 +1,92 @@
+"""Seqlock snapshot file shared by serve.py's owner process and its HTTP workers."""
+import struct
+import threading
+
+import pytest
+
+import app as webapp
+import shared_state
+from sampler import Snapshot
+
+
+def _snap(version, value):
+    return Snapshot(dht=None, rain={"value": value}, sound={"value": value}, alert=None, status=None,
+                    updated_at=1000.0 + version, version=version)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "snapshot")
+
+
+def test_round_trip(path):
+    writer = shared_state.SnapshotWriter(path)
+    reader = shared_state.SnapshotReader(path)
+    writer.write(_snap(3, 7), stats={"sound": {"1m": {"count": 2}}})
+    snap = reader.get_snapshot()
+    assert snap == _snap(3, 7)
+    assert reader.get_stats() == {"sound": {"1m": {"count": 2}}}
+    # an unchanged sequence returns the cached snapshot without decoding again
+    assert reader.get_snapshot() is snap
+    writer.close()
+
+
+def test_reader_before_the_owner_published(path):
+    reader = shared_state.SnapshotReader(path)
+    assert reader.get_snapshot().version == 0
+    shared_state.SnapshotWriter(path).close()  # file exists, nothing written yet
+    assert reader.get_snapshot().version == 0
+
+
+def test_half_written_snapshot_is_never_read(path):
+    writer = shared_state.SnapshotWriter(path)
+    reader = shared_state.SnapshotReader(path)
+    writer.write(_snap(1, 1))
+    assert reader.get_snapshot().version == 1
+    # the writer stops between bumping the sequence and finishing the payload
+    struct.pack_into("<Q", writer._map, 0, writer._seq + 1)
+    struct.pack_into("<QI", writer._map, 8, 2, 5)
+    assert reader.get_snapshot().version == 1
+    # a new owner starting over a file left mid-write resumes at an even sequence
+    assert shared_state.SnapshotWriter(path)._seq % 2 == 0
+    writer.close()
+
+
+def test_concurrent_reads_see_whole_snapshots(path):
+    writer = shared_state.SnapshotWriter(path)
+    reader = shared_state.SnapshotReader(path)
+    writer.write(_snap(1, 1))
+    done = threading.Event()
+
+    def publish():
+        for version in range(2, 3000):
+            writer.write(_snap(version, version))
+        done.set()
+
+    t = threading.Thread(target=publish)
+    t.start()
+    seen = 0
+    while not done.is_set():
+        snap = reader.get_snapshot()
+        assert snap.rain == snap.sound == {"value": snap.version}
+        seen += 1
+    t.join()
+    assert seen and reader.get_snapshot().version == 2999
+    writer.close()
+
+
+def test_oversized_snapshot_is_rejected(path):
+    writer = shared_state.SnapshotWriter(path)
+    with pytest.raises(ValueError):
+        writer.write(_snap(1, "x" * shared_state.SIZE))
+    writer.close()
+
+
+def test_worker_serves_the_shared_snapshot(client, path, monkeypatch):
+    writer = shared_state.SnapshotWriter(path)
+    writer.write(_snap(5, 42))
+    monkeypatch.setattr(webapp, "snapshot_source", shared_state.SnapshotReader(path))
+    monkeypatch.setattr(webapp, "owns_hardware", False)
+    body = client.get("/api/sensors").get_json()
+    assert body["rain"] == {"value": 42}
+    writer.close()
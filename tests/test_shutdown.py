@@ -0,0 +1,26 @@
+"""Shutdown must not create a hardware backend, and must close the database whatever GPIO does."""
+import hal
+import app as webapp
+
+
+def test_cleanup_if_started_does_not_create_a_backend(monkeypatch):
+    monkeypatch.setattr(hal, "_backend", None)
+    monkeypatch.setenv("SENSOR_BACKEND", "pi")  # creating it would import RPi.GPIO
+    hal.cleanup_if_started()
+    assert hal._backend is None
+
+
+class _BrokenBackend(hal.SimBackend):
+    def cleanup(self):
+        raise ModuleNotFoundError("No module named 'RPi'")
+
+
+def test_stop_survives_a_failing_gpio_cleanup(db, monkeypatch):
+    monkeypatch.setattr(hal, "_backend", _BrokenBackend())
+    monkeypatch.setattr(webapp, "_started", True)
+    monkeypatch.setattr(webapp, "owns_hardware", True)
+    closed = []
+    monkeypatch.setattr(webapp.database, "close", lambda: closed.append(True))
+    webapp.stop()
+    assert closed
+    assert not webapp._started
@@ -0,0 +1,66 @@
+"""Streamed sound acquisition: window features, the ring buffer and read_sound() serving them."""
+import math
+
+import pytest
+
+import soundsensor
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    """Fresh acquisition state, one channel, a pinned baseline of 128 and small windows."""
+    monkeypatch.setattr(soundsensor, "BASELINE_AUTO", False)
+    monkeypatch.setattr(soundsensor, "_baseline", 128.0)
+    monkeypatch.setattr(soundsensor, "_exceed_cache", (None, None))
+    monkeypatch.setattr(soundsensor, "PCF8591_CHANNELS", {soundsensor.PCF8591_CHANNEL: "sound"})
+    monkeypatch.setattr(soundsensor, "RING_SIZE", 64)
+    monkeypatch.setattr(soundsensor, "WINDOW_SIZE", 16)
+    monkeypatch.setattr(soundsensor, "_ring", bytearray(64))
+    monkeypatch.setattr(soundsensor, "_ring_pos", 0)
+    monkeypatch.setattr(soundsensor, "_features", None)
+    monkeypatch.setattr(soundsensor, "_window_since", 0)
+    monkeypatch.setattr(soundsensor, "_window_started", None)
+    monkeypatch.setattr(soundsensor, "_channel_sums", {})
+    monkeypatch.setattr(soundsensor, "_channel_levels", {})
+    return soundsensor
+
+
+def test_window_features_match_a_plain_loop(stream):
+    window = bytes([128, 130, 126, 200, 128, 90, 255, 128])
+    features = stream.window_features(window)
+    mean = sum(window) / len(window)
+    assert features["mean"] == pytest.approx(mean)
+    assert features["rms"] == pytest.approx(math.sqrt(sum((v - mean) ** 2 for v in window) / len(window)))
+    assert features["peak"] == 255
+    # threshold: 15 % of the range above the 128 baseline, i.e. >= 147.05
+    assert features["exceed_count"] == 2
+    assert features["samples"] == 8
+
+
+def test_blocks_publish_a_window_every_window_size_samples(stream):
+    stream._on_block([0] + [128] * 10)  # first byte: the stale conversion
+    assert stream._features is None
+    stream._on_block([0] + [138] * 10)
+    features = stream._features
+    assert features["samples"] == 16 and features["peak"] == 138
+    assert features["mean"] == pytest.approx((6 * 128 + 10 * 138) / 16)
+
+
+def test_last_window_reads_across_the_ring_end(stream):
+    for value in range(1, 8):
+        stream._on_block([0] + [value] * 10)  # 70 samples: the ring wrapped at 64
+    assert stream._ring_pos == 70
+    assert stream._last_window() == bytes([6] * 6 + [7] * 10)
+
+
+def test_read_sound_serves_the_latest_window(stream, monkeypatch):
+    def no_on_demand_read(*args, **kwargs):
+        raise AssertionError("sampled on demand despite a fresh window")
+
+    monkeypatch.setattr(stream, "read_pcf8591_channel", no_on_demand_read)
+    monkeypatch.setattr(stream, "setup_sound_sensor", lambda: True)
+    stream._on_block([0] + [128] * 8 + [200] * 8)
+    result = stream.read_sound()
+    assert result["raw"] == pytest.approx(164.0)
+    assert result["peak"] == 200 and result["exceed_count"] == 8
+    assert result["sound_detected"] and result["rms"] == pytest.approx(36.0)
@@ -0,0 +1,78 @@
+"""Spill ring: readings survive a crash before their commit and are replayed exactly once."""
+from datetime import datetime
+
+import pytest
+
+import database
+import spill
+
+
+def _us(dt):
+    return int((dt - datetime(1970, 1, 1)).total_seconds() * 1_000_000)
+
+
+def test_recover_finds_uncommitted_records(tmp_path):
+    path = str(tmp_path / "ring")
+    ring = spill.SpillRing(path, capacity=8)
+    for i in range(5):
+        ring.append(1_000_000 * i, 1, 1, float(i))
+    ring.close()  # crash: nothing was committed
+
+    ring = spill.SpillRing(path, capacity=8)
+    assert ring.recover(2) == 3
+    records, dropped, last = ring.read(10)
+    assert [r[0] for r in records] == [3, 4, 5]
+    assert [r[4] for r in records] == [2.0, 3.0, 4.0]
+    assert (dropped, last) == (0, 5)
+    ring.close()
+
+
+def test_full_ring_counts_overwritten_readings(tmp_path):
+    ring = spill.SpillRing(str(tmp_path / "ring"), capacity=4)
+    for i in range(6):
+        ring.append(i, 1, 1, float(i))
+    records, dropped, last = ring.read(10)
+    assert dropped == 2
+    assert [r[4] for r in records] == [2.0, 3.0, 4.0, 5.0]
+    assert last == 6
+    ring.close()
+
+
+def test_second_owner_falls_back_to_memory(tmp_path):
+    path = str(tmp_path / "ring")
+    owner = spill.SpillRing(path, capacity=4)
+    other = spill.SpillRing(path, capacity=4)
+    assert owner.persistent and not other.persistent
+    other.close()
+    owner.close()
+
+
+def test_database_replays_spilled_readings_once(db):
+    database.close()
+    # readings a crashed process appended but never committed
+    ring = spill.SpillRing(database.SPILL_PATH)
+    sound = database.SPILL_SENSORS.index("sound")
+    insert = database.SPILL_ACTIONS.index("insert")
+    for i in range(3):
+        ring.append(_us(datetime(2026, 1, 1, 12, 0, i)), sound, insert, 10.0 * (i + 1))
+    ring.close()
+
+    database.insert_sound(99.0, datetime(2026, 1, 1, 12, 1, 0))  # starts the writer
+    assert database.flush()
+    assert [r["value"] for r in database.get_last_sounds(10)] == [10.0, 20.0, 30.0, 99.0]
+
+    # the committed sequence number is stored with the rows: a restart replays nothing
+    database.close()
+    database.insert_sound(50.0, datetime(2026, 1, 1, 12, 2, 0))
+    assert database.flush()
+    assert [r["value"] for r in database.get_last_sounds(10)] == [10.0, 20.0, 30.0, 99.0, 50.0]
+
+
+def test_ring_is_synced_before_each_commit(db, monkeypatch):
+    order = []
+    monkeypatch.setattr(spill.SpillRing, "sync", lambda self: order.append("sync"))
+    commit = database._commit_batch
+    monkeypatch.setattr(database, "_commit_batch", lambda *args: order.append("commit") or commit(*args))
+    database.insert_sound(10.0, datetime(2026, 1, 1, 12, 0, 0))
+    assert database.flush()
+    assert order[:2] == ["sync", "commit"]
@@ -0,0 +1,69 @@
+"""Sliding-window sketches: merge/subtract, window expiry and /api/stats."""
+import random
+
+import pytest
+
+import stats
+
+
+def _sketch(values, lo=0.0, hi=100.0, bins=200):
+    sketch = stats.Sketch(lo, hi, bins)
+    for v in values:
+        sketch.add(v)
+    return sketch
+
+
+def test_merge_equals_one_sketch_of_all_values():
+    rng = random.Random(7)
+    a_values = [rng.uniform(0, 100) for _ in range(500)]
+    b_values = [rng.gauss(60, 10) for _ in range(300)]
+    merged = _sketch(a_values)
+    merged.merge(_sketch(b_values))
+    whole = _sketch(a_values + b_values)
+    assert list(merged.bins) == list(whole.bins)
+    assert merged.count == whole.count == 800
+    assert merged.min == whole.min and merged.max == whole.max
+    assert merged.mean() == pytest.approx(whole.mean())
+    assert merged.variance() == pytest.approx(whole.variance())
+    for q in stats.QUANTILES:
+        assert merged.quantile(q) == pytest.approx(whole.quantile(q))
+
+
+def test_subtract_undoes_merge():
+    base = _sketch([10, 20, 30])
+    other = _sketch([40, 50])
+    base.merge(other)
+    base.subtract(other)
+    assert list(base.bins) == list(_sketch([10, 20, 30]).bins)
+    assert base.count == 3
+    assert base.mean() == pytest.approx(20)
+
+
+def test_quantile_error_is_within_one_bin():
+    values = [i / 10 for i in range(1000)]  # 0.0 .. 99.9
+    sketch = _sketch(values)
+    width = 100.0 / 200
+    for q in stats.QUANTILES:
+        exact = sorted(values)[int(q * len(values)) - 1]
+        assert abs(sketch.quantile(q) - exact) <= width
+
+
+def test_window_forgets_old_slots():
+    stats.reset()
+    try:
+        stats.observe("sound", 10.0, now=0.0)
+        stats.observe("sound", 90.0, now=30.0)
+        assert stats.count("sound", "1m", now=30.0) == 2
+        # 1m window, 5 s slots: the reading at t=0 is gone after a minute
+        summary = stats.summary("sound", "1m", now=62.0)
+        assert summary["count"] == 1
+        assert summary["min"] == summary["max"] == 90.0
+        assert stats.count("sound", "5m", now=62.0) == 2
+    finally:
+        stats.reset()
+
+
+def test_api_stats_unknown_sensor_is_404(client):
+    assert client.get("/api/stats/nope").status_code == 404
+    assert client.get("/api/stats/sound?window=2m").status_code == 400
+    assert client.get("/api/stats/sound").status_code == 200
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import storage_policy
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    storage_policy.reset()
+    yield
+    storage_policy.reset()
+
+
+def at(seconds):
+    return T0 + timedelta(seconds=seconds)
+
+
+def test_change_mode_starts_then_extends_every_reading():
+    assert storage_policy.decide("rain", 0, at(0)) == "start"
+    assert [storage_policy.decide("rain", 0, at(s)) for s in (1, 2, 400)] == ["extend"] * 3
+    assert storage_policy.decide("rain", 1, at(401)) == "insert"
+    assert storage_policy.decide("rain", 1, at(402)) == "extend"
+
+
+def test_deadband_mode():
+    assert storage_policy.decide("sound", 10.0, at(0)) == "start"
+    # inside the deadband: rollup only
+    assert storage_policy.decide("sound", 11.0, at(5)) == "rollup"
+    assert storage_policy.decide("sound", 20.0, at(6)) == "insert"
+    # outside it, but faster than min_interval after the last stored row
+    assert storage_policy.decide("sound", 30.0, at(6.5)) == "rollup"
+    # max_interval forces a row even without change
+    assert storage_policy.decide("sound", 20.0, at(66)) == "insert"
+
+
+def test_unknown_sensor_always_inserts():
+    assert storage_policy.decide("light", 1.0, at(0)) == "insert"
+    assert storage_policy.decide("light", 1.0, at(0)) == "insert"
+
+
+def test_reset_restarts_sensor():
+    storage_policy.decide("rain", 1, at(0))
+    storage_policy.reset("rain")
+    assert storage_policy.decide("rain", 1, at(1)) == "start"
@@ -0,0 +1,34 @@
+"""/api/stream holds a server thread per client, so it is capped per process."""
+import pytest
+
+import app as webapp
+
+
+@pytest.fixture(autouse=True)
+def one_stream(monkeypatch):
+    monkeypatch.setattr(webapp, "MAX_STREAMS", 1)
+
+
+def test_streams_past_the_cap_get_503(client):
+    first = client.get("/api/stream")
+    assert first.status_code == 200
+    assert first.mimetype == "text/event-stream"
+    try:
+        second = client.get("/api/stream")
+        assert second.status_code == 503
+        assert second.headers["Retry-After"]
+        assert second.get_json()["success"] is False
+        # the other endpoints are unaffected
+        assert client.get("/api/sensors").status_code == 200
+    finally:
+        first.close()
+
+
+def test_closing_a_stream_frees_its_slot(client):
+    client.get("/api/stream").close()
+    assert webapp._streams_open == 0
+    again = client.get("/api/stream")
+    assert again.status_code == 200
+    again.close()
+    again.close()  # releasing twice must not free a second slot
+    assert webapp._streams_open == 0